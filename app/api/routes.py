@@ -1,51 +1,78 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, Response, request, jsonify, render_template, stream_with_context
 from app.database.manager import DatabaseManager
 from app.rag.manager import RAGManager
+from app.rag.memory import ConversationMemory
+from app.rag.partitions import normalize_filters
 from app.config import settings
 from app.utils.logger import logger
 from app.utils.middleware import handle_errors
-import markdown
-import bleach
+from app.utils.formatting import MessageFormatter
+from app.utils.health import HealthMonitor
+from app.utils.warmup import ComponentUnavailable, LazyComponent
+import hashlib
+import json
+import time
+from typing import Optional
 
 api = Blueprint('api', __name__)
-db_manager = DatabaseManager(settings.DB_URL)
-rag_manager = RAGManager(settings)
-
-class MessageFormatter:
-    ALLOWED_TAGS = [
-        'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'hr',
-        'ul', 'ol', 'li', 'strong', 'em', 'code', 'pre',
-        'table', 'thead', 'tbody', 'tr', 'th', 'td',
-        'div', 'span', 'a'
-    ]
-    ALLOWED_ATTRIBUTES = {
-        '*': ['class'],
-        'a': ['href', 'title', 'target'],
-        'code': ['class'],
-        'pre': ['class']
-    }
-
-    @classmethod
-    def format_message(cls, content: str) -> str:
-        """Format message content with proper HTML"""
-        # Convert markdown to HTML
-        html_content = markdown.markdown(content, extensions=['fenced_code', 'tables'])
-        
-        # Clean HTML
-        clean_html = bleach.clean(
-            html_content,
-            tags=cls.ALLOWED_TAGS,
-            attributes=cls.ALLOWED_ATTRIBUTES
-        )
-        
-        return clean_html
+
+# Built on first use, or up front by warmup() so the server can bind before they are ready
+db_component = LazyComponent(
+    "database",
+    lambda: DatabaseManager(
+        settings.DB_URL,
+        write_behind=settings.DB_WRITE_BEHIND,
+        flush_interval=settings.DB_FLUSH_INTERVAL_MS / 1000,
+        flush_max_batch=settings.DB_FLUSH_MAX_BATCH,
+        sqlite_wal=settings.DB_SQLITE_WAL
+    ),
+    retry_after=settings.WARMUP_RETRY_AFTER_SECONDS
+)
+rag_component = LazyComponent("rag", lambda: RAGManager(settings),
+                              retry_after=settings.WARMUP_RETRY_AFTER_SECONDS)
+memory_component = LazyComponent(
+    "memory",
+    lambda: ConversationMemory(
+        db_component.get(),
+        rag_component.get().summarize,
+        turns=settings.MEMORY_TURNS,
+        batch_size=settings.MEMORY_SUMMARY_BATCH
+    ),
+    retry_after=settings.WARMUP_RETRY_AFTER_SECONDS
+)
+
+# Lightweight probes, run on a schedule so polling /health never touches the LLM;
+# they report a component that is not built yet instead of starting its build
+health_monitor = HealthMonitor(interval=settings.HEALTH_CHECK_INTERVAL_SECONDS)
+health_monitor.register("database", lambda: db_component.peek().ping())
+health_monitor.register("index", lambda: rag_component.peek().index_status())
+health_monitor.register(
+    "ollama",
+    lambda: rag_component.peek().model_status(timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+)
+
+def warmup():
+    """Start building the database and RAG components, and the health probes, in background threads"""
+    db_component.start()
+    rag_component.start()
+    health_monitor.start()
+
+def get_db_manager() -> DatabaseManager:
+    return db_component.get()
+
+def get_rag_manager() -> RAGManager:
+    """The RAG manager; in degraded mode a request made while it warms up gets a 503"""
+    return rag_component.get(wait=not settings.SERVE_DEGRADED)
+
+def get_memory() -> Optional[ConversationMemory]:
+    return memory_component.get() if settings.MEMORY_ENABLED else None
 
 @api.route('/conversation', methods=['POST'])
 @handle_errors
 def create_conversation():
     data = request.json
     title = data.get('title') if data else None
-    conversation = db_manager.create_conversation(title)
+    conversation = get_db_manager().create_conversation(title)
     return jsonify(conversation)
 
 @api.route('/conversation/<int:conversation_id>/chat', methods=['POST'])
@@ -56,72 +83,227 @@ def chat(conversation_id):
         return jsonify({"error": "No message provided"}), 400
     
     user_message = data['message']
+    try:
+        filters = normalize_filters(data.get('filters'))
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({"error": f"Invalid filters: {e}"}), 400
     
-    # Save user message
-    db_manager.add_message(conversation_id, "user", user_message)
+    rag_manager = get_rag_manager()
+    memory = get_memory()
     
-    # Get RAG response
-    response = rag_manager.query(user_message)
+    # Earlier turns, read before this message is stored
+    history = memory.history(conversation_id) if memory else ""
+    turn, _ = get_db_manager().conversation_version(conversation_id)
     
-    # Format the response
+    # Get RAG response; a full queue or timeout raises before anything is stored
+    response = rag_manager.query(user_message, filters=filters, conversation_id=conversation_id,
+                                 history=history, turn=turn)
+    
+    # Save user message once it has been answered
+    get_db_manager().add_message(conversation_id, "user", user_message,
+                                 html=MessageFormatter.format_message(user_message))
+    
+    # Format the response once; the stored HTML is served on every later fetch
     formatted_response = MessageFormatter.format_message(response)
     
     # Save assistant response
-    db_manager.add_message(conversation_id, "assistant", response)
+    get_db_manager().add_message(conversation_id, "assistant", response, html=formatted_response)
+    if memory:
+        memory.schedule_update(conversation_id)
     
     return jsonify({
         "response": response,
         "html": formatted_response
     })
 
+@api.route('/conversation/<int:conversation_id>/chat/stream', methods=['POST'])
+@handle_errors
+def chat_stream(conversation_id):
+    """Stream the assistant's answer as Server-Sent Events while it is generated"""
+    data = request.json
+    if not data or 'message' not in data:
+        return jsonify({"error": "No message provided"}), 400
+    
+    user_message = data['message']
+    try:
+        filters = normalize_filters(data.get('filters'))
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({"error": f"Invalid filters: {e}"}), 400
+    
+    rag_manager = get_rag_manager()
+    memory = get_memory()
+    
+    # Earlier turns, read before this message is stored
+    history = memory.history(conversation_id) if memory else ""
+    turn, _ = get_db_manager().conversation_version(conversation_id)
+    
+    # Retrieve and wait for a generation slot before the 200 goes out, so a
+    # full queue is answered with 503 and Retry-After like the non-streaming route
+    stream = rag_manager.stream_query(user_message, filters=filters, conversation_id=conversation_id,
+                                      history=history, turn=turn)
+    close_stream = getattr(stream, 'close', lambda: None)
+    
+    # Save user message
+    try:
+        get_db_manager().add_message(conversation_id, "user", user_message,
+                                     html=MessageFormatter.format_message(user_message))
+    except Exception:
+        close_stream()
+        raise
+    
+    def generate():
+        tokens = []
+        try:
+            for token in stream:
+                tokens.append(token)
+                yield sse_event("token", {"token": token})
+            
+            response = rag_manager.format_response("".join(tokens))
+            
+            # Save the complete assistant response once generation finishes
+            html = MessageFormatter.format_message(response)
+            get_db_manager().add_message(conversation_id, "assistant", response, html=html)
+            if memory:
+                memory.schedule_update(conversation_id)
+            
+            yield sse_event("done", {
+                "response": response,
+                "html": html
+            })
+        except Exception as e:
+            logger.error(f"Error in chat_stream: {str(e)}")
+            yield sse_event("error", {"error": str(e)})
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Give the slot back even if the client goes away before the stream starts
+    response.call_on_close(close_stream)
+    return response
+
+def sse_event(event: str, payload: dict) -> str:
+    """Serialize a payload as a Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
 @api.route('/conversation/<int:conversation_id>', methods=['GET'])
 @handle_errors
 def get_conversation(conversation_id):
-    messages = db_manager.get_conversation(conversation_id)
+    """A page of messages: ?limit=, ?before=<cursor> for older, ?since=<cursor> for new ones"""
+    try:
+        limit = page_limit(settings.MESSAGE_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Unchanged conversation: answer 304 before loading or rendering any message
+    etag = conversation_etag(conversation_id, limit)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     
-    # Format messages for display
+    try:
+        page = get_db_manager().get_conversation(
+            conversation_id,
+            limit=limit,
+            before=request.args.get('before'),
+            since=request.args.get('since')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Stored HTML, or the memoized rendering for messages written without it
     formatted_messages = []
-    for msg in messages:
-        
-        # print(msg)
+    for msg in page["messages"]:
         formatted_messages.append({
             "role": msg["role"],
-            "content": MessageFormatter.format_message(msg["content"]),
+            "content": msg["html"] or MessageFormatter.format_stored(msg["uuid"], msg["content"]),
             "timestamp": msg["timestamp"]
         })
     
-    return jsonify({"conversation": formatted_messages, "conversationId": conversation_id})
+    response = jsonify({
+        "conversation": formatted_messages,
+        "conversationId": conversation_id,
+        "hasMore": page["has_more"],
+        "before": page["before"],
+        "since": page["since"]
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def conversation_etag(conversation_id: int, limit: int) -> str:
+    """Validator for a page of a conversation: its message count and newest id plus the page parameters"""
+    count, last_id = get_db_manager().conversation_version(conversation_id)
+    key = json.dumps([conversation_id, count, last_id, limit, request.args.get('before'), request.args.get('since')])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
 
 @api.route('/conversations', methods=['GET'])
 @handle_errors
 def get_conversations():
-    conversations = db_manager.get_conversations()
-    return jsonify({"conversations": conversations})
+    """Newest conversations first: ?limit=, ?cursor=<next_cursor> for the next page"""
+    try:
+        page = get_db_manager().get_conversations(
+            limit=page_limit(settings.CONVERSATION_PAGE_SIZE),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"conversations": page["conversations"], "next_cursor": page["next_cursor"]})
 
-@api.route('/health', methods=['GET'])
+def page_limit(default: int) -> int:
+    """Validated ?limit= query parameter, capped at MAX_PAGE_SIZE"""
+    limit = request.args.get('limit', default, type=int)
+    if limit is None or limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, settings.MAX_PAGE_SIZE)
+
+@api.route('/metrics', methods=['GET'])
 @handle_errors
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        "status": "healthy",
-        "components": {
-            "database": check_database_health(),
-            "rag": check_rag_health()
-        }
-    })
+def metrics():
+    """Cache and performance counters"""
+    return jsonify(get_rag_manager().metrics())
 
-def check_database_health():
-    try:
-        db_manager.get_conversations()
-        return "healthy"
-    except Exception as e:
-        logger.error(f"Database health check failed: {str(e)}")
-        return "unhealthy"
+@api.route('/health/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({"status": "alive"})
+
+@api.route('/health/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once warm, or once the database is up when serving degraded"""
+    components = {"database": db_component.status(), "rag": rag_component.status()}
+    if db_component.ready and rag_component.ready:
+        return jsonify({"status": "ready", "components": components})
+    if settings.SERVE_DEGRADED and db_component.ready:
+        return jsonify({"status": "degraded", "components": components})
+    response = jsonify({"status": "warming", "components": components})
+    response.headers['Retry-After'] = str(settings.WARMUP_RETRY_AFTER_SECONDS)
+    return response, 503
+
+@api.route('/health', methods=['GET'])
+def health_check():
+    """Cached component health; ?deep=1 also runs an end-to-end query"""
+    components = health_monitor.snapshot()
+    if request.args.get('deep') in ('1', 'true'):
+        components["end_to_end"] = check_end_to_end()
+    status = HealthMonitor.overall(components)
+    return jsonify({"status": status, "components": components}), 503 if status == "unhealthy" else 200
 
-def check_rag_health():
+def check_end_to_end():
+    """Deep check: answer a query through retrieval and generation"""
+    start = time.perf_counter()
     try:
-        rag_manager.query("test query")
-        return "healthy"
+        # Lowest priority so a deep check never jumps ahead of users; past the
+        # caches and the planner so it really reaches retrieval and Ollama
+        rag_component.peek().query("test query", priority=10, use_cache=False)
+        result = {"status": "healthy"}
+    except ComponentUnavailable as e:
+        result = {"status": e.state}
     except Exception as e:
-        logger.error(f"RAG health check failed: {str(e)}")
-        return "unhealthy"
\ No newline at end of file
+        logger.error(f"End-to-end health check failed: {str(e)}")
+        result = {"status": "unhealthy", "error": str(e)}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
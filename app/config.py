@@ -6,29 +6,101 @@ class Settings(BaseSettings):
     # Directories
     DATA_DIR: Path = Path("./data")
     CHROMA_DIR: Path = Path("./chroma_db")
+    DATA_CACHE_DIR: Path = Path("./data_cache")
+    NUMPY_INDEX_DIR: Path = Path("./numpy_index")
 
     # Database Configuration
     DB_URL: str = "sqlite:///conversations.db"
+    DB_SQLITE_WAL: bool = True
+    DB_WRITE_BEHIND: bool = False  # queue messages and commit them in batches
+    DB_FLUSH_INTERVAL_MS: int = 50
+    DB_FLUSH_MAX_BATCH: int = 256
+    CONVERSATION_PAGE_SIZE: int = 50
+    MESSAGE_PAGE_SIZE: int = 100
+    MAX_PAGE_SIZE: int = 500
+    HTML_CACHE_MAX_ENTRIES: int = 4096
 
     # Model Configuration
+    OLLAMA_BASE_URL: str = "http://localhost:11434"
+    OLLAMA_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    OLLAMA_READ_TIMEOUT_SECONDS: float = 120.0
+    OLLAMA_MAX_RETRIES: int = 2
+    OLLAMA_RETRY_BACKOFF_SECONDS: float = 0.5
+    OLLAMA_POOL_SIZE: int = 16
     LLM_MODEL: str = "llama3.2:1b"
     EMBEDDING_MODEL: str = "mxbai-embed-large"
     LLM_TEMPERATURE: float = 0.7
     LLM_TOP_P: float = 0.9
     LLM_TOP_K: int = 10
     LLM_REPEAT_PENALTY: float = 1.1
+    LLM_NUM_CTX: int = 2048  # model context window, shared by prompt and answer
+    LLM_NUM_PREDICT: int = 512  # answer tokens reserved out of the window
+    OLLAMA_KEEP_ALIVE: str = "30m"  # keep the model, and its prompt cache, loaded between requests
+    LLM_CONTEXT_REUSE: bool = True  # continue each conversation from Ollama's returned context
+    LLM_CONTEXT_REUSE_MAX_TOKENS: Optional[int] = None  # start over past this; default half of LLM_NUM_CTX
+    LLM_CONTEXT_CACHE_SIZE: int = 256  # conversations whose context is kept per process
     LLM_STOP_SEQUENCES: List[str] = [
         "\nHuman:", "\nAssistant:", "Question:", "Context:", "Claude:", "If the human"
     ]
+    LLM_MAX_CONCURRENCY: int = 2  # generations in flight per process
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # query embeddings in flight per process
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 30.0  # wait for a slot before answering 503
+    LLM_QUEUE_MAX_DEPTH: int = 64  # queued generations before new ones are turned away
+
+    # Embedding Pipeline
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_CONCURRENCY: int = 4
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: Path = Path("./embedding_cache.sqlite3")
+    EMBEDDING_CACHE_MAX_MB: int = 512
 
     # Application Settings
     FLASK_ENV: Optional[str] = "development"
     DEBUG: bool = True
+    HOST: str = "0.0.0.0"
+    PORT: int = 5001
+    SERVER_WORKERS: int = 2  # production (gunicorn) worker processes
+    SERVER_THREADS: int = 16  # request threads per worker
+    SERVER_TIMEOUT_SECONDS: int = 300  # long enough for a streamed generation
+    WARMUP_IN_BACKGROUND: bool = True
+    SERVE_DEGRADED: bool = True  # answer 503 + Retry-After for chat until the RAG system is warm
+    WARMUP_RETRY_AFTER_SECONDS: int = 5
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 2.0
 
     # RAG Settings
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 50
     TOP_K: int = 5
+    CONTEXT_MAX_TOKENS: Optional[int] = None  # cap on retrieved context; default is what fits in LLM_NUM_CTX
+    VECTOR_BACKEND: str = "chroma"  # "chroma" or "numpy"
+    VECTOR_QUANTIZATION: str = "float32"  # numpy backend: "float32", "float16" or "int8"
+    HYBRID_RETRIEVAL_ENABLED: bool = True
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    RRF_K: int = 60
+    KEYWORD_ONLY_RATIO: float = 0.5
+    INDEX_MANIFEST_FILE: str = "index_manifest.json"
+    INDEX_BATCH_SIZE: int = 256
+    INGEST_CHUNK_SIZE: int = 50000
+    DATA_CACHE_ENABLED: bool = True
+    STRUCTURED_QUERIES_ENABLED: bool = True
+
+    # Conversation Memory
+    MEMORY_ENABLED: bool = True
+    MEMORY_TURNS: int = 4  # user/assistant turns kept verbatim in the prompt
+    MEMORY_SUMMARY_BATCH: int = 20  # messages folded into the summary per update
+    MEMORY_SUMMARY_MAX_TOKENS: int = 200
+
+    # Answer Caching
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_SHARED_PATH: Optional[Path] = None
+    RESPONSE_CACHE_SHARED_MAX_ENTRIES: int = 10000
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 512
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
 
     # Prompts
     SYSTEM_PROMPT: str = (
@@ -44,6 +116,7 @@ class Settings(BaseSettings):
         "4. If information is not in the context, say so clearly.\n"
         "5. Format lists and data clearly.\n\n"
         "Context: {context}\n"
+        "{history}"
         "Question: {question}\n\nAnswer:"
     )
     FINANCIAL_PROMPT: str = (
@@ -53,7 +126,7 @@ class Settings(BaseSettings):
         "- Include quarter and year references.\n"
         "- Present percentage changes when relevant.\n"
         "- Format numbers with proper currency symbols.\n\n"
-        "Context: {context}\nQuestion: {question}\nAnswer:"
+        "Context: {context}\n{history}Question: {question}\nAnswer:"
     )
     EMPLOYEE_PROMPT: str = (
         "Provide employee information with the following details:\n\n"
@@ -62,7 +135,7 @@ class Settings(BaseSettings):
         "- Department and location.\n"
         "- Salary and hire date.\n"
         "- Reporting structure (if applicable).\n\n"
-        "Context: {context}\nQuestion: {question}\nAnswer:"
+        "Context: {context}\n{history}Question: {question}\nAnswer:"
     )
     DEPARTMENT_PROMPT: str = (
         "Present department information including:\n\n"
@@ -71,7 +144,15 @@ class Settings(BaseSettings):
         "- Budget allocation.\n"
         "- Team size and structure.\n"
         "- Key performance metrics.\n\n"
-        "Context: {context}\nQuestion: {question}\nAnswer:"
+        "Context: {context}\n{history}Question: {question}\nAnswer:"
+    )
+    SUMMARY_PROMPT: str = (
+        "Update the running summary of a conversation between a user and an assistant "
+        "about company data.\n\n"
+        "Current summary: {summary}\n\n"
+        "New messages:\n{transcript}\n\n"
+        "Write the updated summary in at most five sentences. Keep names, figures and "
+        "open questions.\nSummary:"
     )
 
     # Environment Configuration
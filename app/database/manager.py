@@ -1,17 +1,90 @@
-from sqlalchemy import create_engine
+from sqlalchemy import and_, create_engine, event, func, inspect, or_, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Dict
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from .models import Base, Conversation, Message
+import atexit
+import base64
+import json
+from .models import Base, Conversation, Message, generate_uuid
+from .writer import MessageWriter
 from app.utils.logger import logger
 
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque keyset cursor for a (timestamp, id) position"""
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def create_schema(db_url: str) -> None:
+    """Create any missing tables, leaving existing tables and their rows alone"""
+    engine = create_engine(db_url)
+    try:
+        upgrade_schema(engine)
+    finally:
+        engine.dispose()
+
+def upgrade_schema(engine) -> None:
+    """Create missing tables, then add the columns and indexes that older databases lack
+    
+    `create_all` skips tables that already exist, so a database written by an
+    earlier version gets its new nullable columns with ALTER TABLE ADD COLUMN
+    and its new indexes with CREATE INDEX IF NOT EXISTS.
+    """
+    Base.metadata.create_all(engine)
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            columns = {column['name'] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                logger.info(f"Adding column {table.name}.{column.name}")
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
 class DatabaseManager:
-    def __init__(self, db_url: str):
+    def __init__(self, db_url: str, write_behind: bool = False, flush_interval: float = 0.05,
+                 flush_max_batch: int = 256, sqlite_wal: bool = True):
         self.engine = create_engine(db_url)
-        Base.metadata.drop_all(self.engine)
-        Base.metadata.create_all(self.engine)
+        if sqlite_wal and self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", self._enable_wal)
+        # Never drop: every server worker opens the same database.
+        upgrade_schema(self.engine)
         self.Session = sessionmaker(bind=self.engine)
+        
+        # Optional write-behind queue; drained on interpreter exit
+        self.writer = None
+        if write_behind:
+            self.writer = MessageWriter(self.engine, flush_interval=flush_interval, max_batch=flush_max_batch)
+            atexit.register(self.close)
+    
+    @staticmethod
+    def _enable_wal(dbapi_connection, connection_record):
+        """WAL lets readers run alongside the writer; NORMAL sync fsyncs only at checkpoints"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+    
+    def close(self) -> None:
+        """Flush queued messages and release pooled connections"""
+        if self.writer is not None:
+            self.writer.close()
+        self.engine.dispose()
+    
+    def ping(self) -> None:
+        """Run a trivial query on a pooled connection"""
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
     
     def create_conversation(self, title: str = None) -> Dict:
         try:
@@ -34,61 +107,205 @@ class DatabaseManager:
             logger.error(f"Error creating conversation: {str(e)}")
             raise
     
-    def add_message(self, conversation_id: int, role: str, content: str) -> None:
+    def add_message(self, conversation_id: int, role: str, content: str, html: Optional[str] = None) -> str:
+        """Store a message, with its pre-rendered HTML if given, and return its uuid"""
         try:
+            message_uuid = generate_uuid()
+            if self.writer is not None:
+                # Stamp now so queued messages keep their order once written
+                self.writer.submit({
+                    "message_uuid": message_uuid,
+                    "conversation_id": conversation_id,
+                    "timestamp": datetime.utcnow(),
+                    "role": role,
+                    "content": content,
+                    "html": html
+                })
+                return message_uuid
+            
             session = self.Session()
             message = Message(
+                message_uuid=message_uuid,
                 conversation_id=conversation_id,
                 role=role,
-                content=content
+                content=content,
+                html=html
             )
             session.add(message)
             session.commit()
             session.close()
+            return message_uuid
         except Exception as e:
             logger.error(f"Error adding message: {str(e)}")
             raise
     
-    def get_conversation(self, conversation_id: int) -> List[Dict]:
+    def get_conversation(self, conversation_id: int, limit: int = 100, before: Optional[str] = None,
+                         since: Optional[str] = None) -> Dict:
+        """Page through a conversation's messages in chronological order
+        
+        Without a cursor the latest `limit` messages are returned. `before`
+        pages back to older messages and `since` returns only messages newer
+        than the cursor (a delta fetch). The result carries a `before` cursor
+        when older messages remain and a `since` cursor for the next delta.
+        """
         try:
+            # Read your own writes: wait for queued messages to land
+            if self.writer is not None:
+                self.writer.flush()
             session = self.Session()
+            query = session.query(Message).filter(Message.conversation_id == conversation_id)
+            
+            if since is not None:
+                timestamp, message_id = decode_cursor(since)
+                query = query.filter(or_(
+                    Message.timestamp > timestamp,
+                    and_(Message.timestamp == timestamp, Message.id > message_id)
+                ))
+                messages = query.order_by(Message.timestamp, Message.id).limit(limit + 1).all()
+                has_more = len(messages) > limit
+                messages = messages[:limit]
+            else:
+                if before is not None:
+                    timestamp, message_id = decode_cursor(before)
+                    query = query.filter(or_(
+                        Message.timestamp < timestamp,
+                        and_(Message.timestamp == timestamp, Message.id < message_id)
+                    ))
+                messages = query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit + 1).all()
+                has_more = len(messages) > limit
+                messages = list(reversed(messages[:limit]))
+            
+            result = {
+                "messages": [
+                    {
+                        "uuid": msg.message_uuid,
+                        "role": msg.role,
+                        "content": msg.content,
+                        "html": msg.html,
+                        "timestamp": msg.timestamp.isoformat()
+                    }
+                    for msg in messages
+                ],
+                "has_more": has_more,
+                "before": encode_cursor(messages[0].timestamp, messages[0].id) if messages and since is None and has_more else None,
+                "since": encode_cursor(messages[-1].timestamp, messages[-1].id) if messages else since
+            }
+            session.close()
+            return result
+        except Exception as e:
+            logger.error(f"Error retrieving conversation: {str(e)}")
+            raise
+    
+    def conversation_version(self, conversation_id: int) -> Tuple[int, Optional[int]]:
+        """Message count and newest id; messages are immutable, so this changes iff the conversation does"""
+        try:
+            if self.writer is not None:
+                self.writer.flush()
+            session = self.Session()
+            count, last_id = session.query(func.count(Message.id), func.max(Message.id)).filter(
+                Message.conversation_id == conversation_id
+            ).one()
+            session.close()
+            return count, last_id
+        except Exception as e:
+            logger.error(f"Error reading conversation version: {str(e)}")
+            raise
+    
+    def get_memory(self, conversation_id: int, recent: int) -> Dict:
+        """Rolling summary of a conversation plus its latest `recent` messages, oldest first"""
+        try:
+            if self.writer is not None:
+                self.writer.flush()
+            session = self.Session()
+            conv = session.get(Conversation, conversation_id)
             messages = session.query(Message).filter(
                 Message.conversation_id == conversation_id
-            ).order_by(Message.timestamp).all()
+            ).order_by(Message.timestamp.desc(), Message.id.desc()).limit(recent).all() if recent > 0 else []
             
-            result = [
-                {
-                    "uuid": msg.message_uuid,
-                    "role": msg.role,
-                    "content": msg.content,
-                    "timestamp": msg.timestamp.isoformat()
-                }
-                for msg in messages
+            result = {
+                "summary": conv.summary if conv else None,
+                "summary_through": conv.summary_through if conv else None,
+                "recent": [
+                    {"id": msg.id, "role": msg.role, "content": msg.content}
+                    for msg in reversed(messages)
+                ]
+            }
+            session.close()
+            return result
+        except Exception as e:
+            logger.error(f"Error retrieving conversation memory: {str(e)}")
+            raise
+    
+    def get_unsummarized(self, conversation_id: int, keep_recent: int, limit: int = 20) -> List[Dict]:
+        """Messages newer than the summary but outside the latest `keep_recent`, oldest first"""
+        try:
+            if self.writer is not None:
+                self.writer.flush()
+            session = self.Session()
+            conv = session.get(Conversation, conversation_id)
+            recent_ids = [
+                row.id for row in session.query(Message.id).filter(
+                    Message.conversation_id == conversation_id
+                ).order_by(Message.timestamp.desc(), Message.id.desc()).limit(keep_recent)
             ]
+            query = session.query(Message).filter(Message.conversation_id == conversation_id)
+            if conv is not None and conv.summary_through is not None:
+                query = query.filter(Message.id > conv.summary_through)
+            if recent_ids:
+                query = query.filter(Message.id.notin_(recent_ids))
+            messages = query.order_by(Message.timestamp, Message.id).limit(limit).all()
+            
+            result = [{"id": msg.id, "role": msg.role, "content": msg.content} for msg in messages]
             session.close()
             return result
         except Exception as e:
-            logger.error(f"Error retrieving conversation: {str(e)}")
+            logger.error(f"Error retrieving unsummarized messages: {str(e)}")
+            raise
+    
+    def update_summary(self, conversation_id: int, summary: str, through_message_id: int) -> None:
+        try:
+            session = self.Session()
+            conv = session.get(Conversation, conversation_id)
+            if conv is not None:
+                conv.summary = summary
+                conv.summary_through = through_message_id
+                session.commit()
+            session.close()
+        except Exception as e:
+            logger.error(f"Error updating conversation summary: {str(e)}")
             raise
     
-    def get_conversations(self) -> List[Dict]:
+    def get_conversations(self, limit: int = 50, cursor: Optional[str] = None) -> Dict:
+        """Newest conversations first, `limit` at a time, continuing after `cursor`"""
         try:
             session = self.Session()
-            conversations = session.query(Conversation).order_by(
-                Conversation.start_time.desc()
-            ).all()
+            query = session.query(Conversation)
+            if cursor is not None:
+                start_time, conversation_id = decode_cursor(cursor)
+                query = query.filter(or_(
+                    Conversation.start_time < start_time,
+                    and_(Conversation.start_time == start_time, Conversation.id < conversation_id)
+                ))
+            conversations = query.order_by(
+                Conversation.start_time.desc(), Conversation.id.desc()
+            ).limit(limit + 1).all()
+            has_more = len(conversations) > limit
+            conversations = conversations[:limit]
             
-            result = [
-                {
-                    "id": conv.id,
-                    "uuid": conv.uuid,
-                    "title": conv.title,
-                    "start_time": conv.start_time.isoformat()
-                }
-                for conv in conversations
-            ]
+            result = {
+                "conversations": [
+                    {
+                        "id": conv.id,
+                        "uuid": conv.uuid,
+                        "title": conv.title,
+                        "start_time": conv.start_time.isoformat()
+                    }
+                    for conv in conversations
+                ],
+                "next_cursor": encode_cursor(conversations[-1].start_time, conversations[-1].id) if has_more else None
+            }
             session.close()
             return result
         except Exception as e:
             logger.error(f"Error retrieving conversations: {str(e)}")
-            raise
\ No newline at end of file
+            raise
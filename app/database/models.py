@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 import uuid
@@ -16,11 +16,18 @@ class Conversation(Base):
     start_time = Column(DateTime, default=datetime.utcnow, nullable=False)
     end_time = Column(DateTime)
     title = Column(String(200), nullable=False)
+    summary = Column(Text)  # rolling summary of turns older than the memory window
+    summary_through = Column(Integer)  # id of the newest message folded into the summary
     messages = relationship(
         "Message",
         back_populates="conversation",
         cascade="all, delete-orphan"
     )
+    
+    # Keyset pagination walks (start_time, id) newest first
+    __table_args__ = (
+        Index('ix_conversations_start_time_id', 'start_time', 'id'),
+    )
 
 class Message(Base):
     __tablename__ = 'messages'
@@ -31,4 +38,10 @@ class Message(Base):
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     role = Column(String(50), nullable=False)
     content = Column(Text, nullable=False)
-    conversation = relationship("Conversation", back_populates="messages")
\ No newline at end of file
+    html = Column(Text)  # sanitized rendering, stored when the message is written
+    conversation = relationship("Conversation", back_populates="messages")
+    
+    # History pages and delta fetches seek on (conversation_id, timestamp, id)
+    __table_args__ = (
+        Index('ix_messages_conversation_timestamp_id', 'conversation_id', 'timestamp', 'id'),
+    )
\ No newline at end of file
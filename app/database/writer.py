@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from .models import Message
+from app.utils.logger import logger
+
+
+class MessageWriter:
+    """Write-behind queue persisting messages in batched transactions.
+
+    `submit()` returns as soon as the message is queued. A background thread
+    collects whatever arrives within `flush_interval` seconds (up to
+    `max_batch` rows) and inserts it with a single commit, so concurrent turns
+    share one fsync instead of paying for one each.
+    """
+
+    def __init__(self, engine: Engine, flush_interval: float = 0.05, max_batch: int = 256,
+                 max_queue: int = 10000):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._closed = False
+        self._counters = {"written": 0, "batches": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row: Dict) -> None:
+        """Queue a message row; blocks only when the queue is full."""
+        if self._closed:
+            raise RuntimeError("message writer is closed")
+        with self._idle:
+            self._pending += 1
+        self._queue.put(row)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every message queued so far is written."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Stop accepting messages and drain the queue."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._pending:
+            logger.warning(f"Message writer closed with {self._pending} unwritten messages")
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._counters, "pending": self._pending}
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            row = self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            self._write(batch)
+        # Drain anything queued behind the stop marker
+        rest = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is not None:
+                rest.append(row)
+        for start in range(0, len(rest), self.max_batch):
+            self._write(rest[start:start + self.max_batch])
+
+    def _write(self, batch: List[Dict]) -> None:
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(Message), batch)
+            self._counters["batches"] += 1
+            self._counters["written"] += len(batch)
+        except Exception as e:
+            # Fall back to row-by-row so one bad message does not lose the batch
+            logger.error(f"Error writing batch of {len(batch)} messages: {str(e)}")
+            for row in batch:
+                try:
+                    with self.engine.begin() as conn:
+                        conn.execute(insert(Message), [row])
+                    self._counters["written"] += 1
+                except Exception as row_error:
+                    self._counters["failed"] += 1
+                    logger.error(f"Dropping message {row.get('message_uuid')}: {str(row_error)}")
+        finally:
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
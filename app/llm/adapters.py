@@ -0,0 +1,83 @@
+from typing import Any, Dict, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from app.llm.client import OllamaClient
+
+
+class OllamaLLM(LLM):
+    """LangChain LLM backed by the shared OllamaClient.
+
+    Besides `options`, calls accept `system` (sent as Ollama's system prompt),
+    `context` (token state to continue from), `conversation_id`, `next_turn`
+    and `instructions`; with a `context_store`, the context each generation
+    returns is kept for that conversation's turn `next_turn`, under the
+    `instructions` key.
+    """
+
+    client: Any
+    model: str
+    options: Dict[str, Any] = {}
+    keep_alive: Optional[str] = None
+    context_store: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-pooled"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "options": self.options}
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        response = self.client.generate(self.model, prompt, options=self._options(stop, kwargs),
+                                        **self._extra(kwargs))
+        self._remember(kwargs, response)
+        return response["response"]
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        for chunk in self.client.stream_generate(self.model, prompt, options=self._options(stop, kwargs),
+                                                 **self._extra(kwargs)):
+            if chunk.get("done"):
+                self._remember(kwargs, chunk)
+            text = chunk.get("response", "")
+            if not text:
+                continue
+            generation = GenerationChunk(text=text)
+            if run_manager is not None:
+                run_manager.on_llm_new_token(text, chunk=generation)
+            yield generation
+
+    def _options(self, stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        options = {**self.options, "stop": stop} if stop else self.options
+        return {**options, **kwargs.get("options", {})}
+
+    def _extra(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        extra = {"system": kwargs.get("system"), "context": kwargs.get("context"), "keep_alive": self.keep_alive}
+        return {key: value for key, value in extra.items() if value}
+
+    def _remember(self, kwargs: Dict[str, Any], response: Dict[str, Any]) -> None:
+        conversation_id = kwargs.get("conversation_id")
+        if self.context_store is None or conversation_id is None:
+            return
+        self.context_store.record(len(kwargs.get("context") or []), response.get("prompt_eval_count"))
+        if response.get("context") and kwargs.get("next_turn") is not None:
+            self.context_store.put(conversation_id, response["context"], kwargs["next_turn"],
+                                   kwargs.get("instructions"))
+
+
+class OllamaEmbeddingModel(Embeddings):
+    """LangChain embeddings backed by the shared OllamaClient, one request per batch."""
+
+    def __init__(self, client: OllamaClient, model: str):
+        self.client = client
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed(self.model, texts) if texts else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed(self.model, [text])[0]
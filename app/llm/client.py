@@ -0,0 +1,185 @@
+import hashlib
+import json
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app.utils.logger import logger
+
+# Upstream answers worth retrying: overloaded or restarting.
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in flight
+    wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Dict[str, Any]] = {}
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["done"].set()
+
+
+class OllamaClient:
+    """Shared HTTP client for the Ollama API.
+
+    One keep-alive connection pool per process, connect/read timeouts on every
+    call, bounded retries with exponential backoff for connection failures and
+    overload responses, and single-flight coalescing of identical non-streaming
+    generate and embed requests.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:11434", connect_timeout: float = 3.0,
+                 read_timeout: float = 120.0, max_retries: int = 2, backoff: float = 0.5,
+                 pool_size: int = 16):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._flight = SingleFlight()
+        self._counters = {"requests": 0, "retries": 0, "errors": 0}
+        self._counters_lock = threading.Lock()
+
+    def generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                 **extra: Any) -> Dict[str, Any]:
+        """Non-streaming completion; returns Ollama's final response object."""
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": options or {}, **extra}
+        return self._coalesced("/api/generate", payload)
+
+    def stream_generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                        **extra: Any) -> Iterator[Dict[str, Any]]:
+        """Streaming completion yielding Ollama's NDJSON chunks.
+
+        Retries only happen before the first byte, so a partial answer is never repeated.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True, "options": options or {}, **extra}
+        response = self._request("POST", "/api/generate", json=payload, stream=True)
+        try:
+            for line in response.iter_lines():
+                if line:
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise RuntimeError(f"Ollama error: {chunk['error']}")
+                    yield chunk
+        finally:
+            response.close()
+
+    def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts with one request."""
+        try:
+            return self._coalesced("/api/embed", {"model": model, "input": texts})["embeddings"]
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+        # Servers older than /api/embed only embed one prompt per request.
+        return [
+            self._coalesced("/api/embeddings", {"model": model, "prompt": text})["embedding"]
+            for text in texts
+        ]
+
+    def tags(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Models available on the server."""
+        response = self._request("GET", "/api/tags", timeout=timeout)
+        return response.json()
+
+    def stats(self) -> Dict[str, int]:
+        with self._counters_lock:
+            return {**self._counters, "coalesced": self._flight.coalesced}
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _coalesced(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        key = hashlib.sha256(json.dumps([path, payload], sort_keys=True).encode("utf-8")).hexdigest()
+        return self._flight.do(key, lambda: self._request("POST", path, json=payload).json())
+
+    def _request(self, method: str, path: str, timeout: Optional[float] = None,
+                 **kwargs: Any) -> requests.Response:
+        url = f"{self.base_url}{path}"
+        timeout = (min(timeout, self.timeout[0]), timeout) if timeout else self.timeout
+        for attempt in range(self.max_retries + 1):
+            self._count("requests")
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                # Only connection failures are retried; after a read timeout the
+                # server may still be generating, so repeating would double the work.
+                if not isinstance(e, requests.ConnectionError) or attempt == self.max_retries:
+                    self._count("errors")
+                    raise
+                self._wait(attempt, f"{method} {path} failed: {e}")
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                response.close()
+                self._wait(attempt, f"{method} {path} returned {response.status_code}")
+                continue
+            if not response.ok:
+                self._count("errors")
+                try:
+                    detail = response.json().get("error", response.text)
+                except ValueError:
+                    detail = response.text
+                error = requests.HTTPError(f"{response.status_code} from Ollama {path}: {detail}", response=response)
+                response.close()
+                raise error
+            return response
+
+    def _wait(self, attempt: int, reason: str) -> None:
+        self._count("retries")
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+        logger.warning(f"{reason}; retrying in {delay:.2f}s")
+        time.sleep(delay)
+
+    def _count(self, name: str) -> None:
+        with self._counters_lock:
+            self._counters[name] += 1
+
+
+_clients: Dict[Tuple, OllamaClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: str = "http://localhost:11434", **kwargs: Any) -> OllamaClient:
+    """The process-wide client for a server, so every caller shares its connection pool."""
+    key = (base_url.rstrip("/"), tuple(sorted(kwargs.items())))
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = OllamaClient(base_url, **kwargs)
+        return _clients[key]
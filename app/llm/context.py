@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class ContextStore:
+    """Ollama `context` token state per conversation, for reuse on the next turn.
+
+    Passing the previous turn's `context` back to /api/generate lets the
+    server continue from tokens it has already evaluated instead of
+    re-processing the instructions and earlier turns. Each context is stored
+    with the turn it can continue: the number of messages the conversation
+    will hold once the question and answer it covers are saved. It is also
+    stored with a key for the instructions it was started with. If the
+    conversation has moved on without this process, e.g. a turn answered by
+    another server worker, or the next turn needs other instructions, the
+    context is stale and is dropped. Contexts
+    longer than `max_tokens` are dropped too, so the next turn starts over
+    from a fresh, bounded prompt. At most `max_conversations` are kept, least
+    recently used first out.
+    """
+
+    def __init__(self, max_conversations: int = 256, max_tokens: int = 1024):
+        self.max_conversations = max_conversations
+        self.max_tokens = max_tokens
+        self._contexts: "OrderedDict[Hashable, Tuple[int, Hashable, List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"turns": 0, "reused_turns": 0, "reused_tokens": 0, "evaluated_tokens": 0,
+                          "resets": 0, "stale": 0}
+
+    def get(self, conversation_id: Hashable, turn: int, instructions: Hashable = None) -> Optional[List[int]]:
+        """The stored context if it continues from `turn` messages under `instructions`, else None."""
+        with self._lock:
+            entry = self._contexts.get(conversation_id)
+            if entry is None:
+                return None
+            stored_turn, stored_instructions, context = entry
+            if stored_turn != turn or stored_instructions != instructions:
+                del self._contexts[conversation_id]
+                self._counters["stale"] += 1
+                return None
+            if len(context) > self.max_tokens:
+                del self._contexts[conversation_id]
+                self._counters["resets"] += 1
+                return None
+            self._contexts.move_to_end(conversation_id)
+            return context
+
+    def put(self, conversation_id: Hashable, context: List[int], turn: int, instructions: Hashable = None) -> None:
+        """Keep `context` for the turn that starts once the conversation holds `turn` messages."""
+        with self._lock:
+            self._contexts[conversation_id] = (turn, instructions, context)
+            self._contexts.move_to_end(conversation_id)
+            while len(self._contexts) > self.max_conversations:
+                self._contexts.popitem(last=False)
+
+    def discard(self, conversation_id: Hashable) -> None:
+        """Forget a conversation's context, e.g. after a turn answered without the model."""
+        with self._lock:
+            self._contexts.pop(conversation_id, None)
+
+    def record(self, reused_tokens: int, evaluated_tokens: Optional[int]) -> None:
+        """Count one generation: context tokens passed in and prompt tokens the server evaluated."""
+        with self._lock:
+            self._counters["turns"] += 1
+            if reused_tokens:
+                self._counters["reused_turns"] += 1
+                self._counters["reused_tokens"] += reused_tokens
+            self._counters["evaluated_tokens"] += evaluated_tokens or 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            conversations = len(self._contexts)
+        turns = counters["turns"]
+        total = counters["reused_tokens"] + counters["evaluated_tokens"]
+        return {
+            **counters,
+            "conversations": conversations,
+            "reuse_rate": round(counters["reused_turns"] / turns, 4) if turns else 0.0,
+            "token_reuse_rate": round(counters["reused_tokens"] / total, 4) if total else 0.0,
+        }
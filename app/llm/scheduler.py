@@ -0,0 +1,181 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Hashable, Iterator, Optional
+from app.utils.metrics import LatencyTracker
+from app.utils.warmup import ComponentUnavailable
+
+
+class _Waiter:
+    __slots__ = ("key", "priority", "enqueued", "granted", "event")
+
+    def __init__(self, key: Hashable, priority: int):
+        self.key = key
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+        self.granted = False
+        self.event = threading.Event()
+
+
+class Lease:
+    """A held generation slot; `release()` may be called more than once."""
+
+    def __init__(self, scheduler: "GenerationScheduler"):
+        self._scheduler = scheduler
+        self._start = time.perf_counter()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._scheduler.timings.record("service", time.perf_counter() - self._start)
+        self._scheduler._release()
+
+
+class LeasedIterator:
+    """Iterator that holds a Lease until it is exhausted, fails or is closed.
+
+    Close it when the consumer may stop early (e.g. a client disconnecting
+    from a streamed response), including before the first item.
+    """
+
+    def __init__(self, iterator: Iterator[Any], lease: Lease):
+        self._iterator = iterator
+        self._lease = lease
+
+    def __iter__(self) -> "LeasedIterator":
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self._lease.release()
+            raise
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._iterator, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._lease.release()
+
+
+class GenerationScheduler:
+    """Admission control in front of the LLM.
+
+    At most `max_concurrency` generations run at once. Waiting requests sit in
+    a bounded queue ordered by priority (lower runs first) and, within a
+    priority, round-robin across conversations, so one busy conversation
+    cannot starve the others. Requests are rejected with ComponentUnavailable
+    when the queue is full or the wait exceeds `timeout`.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 64, timeout: float = 30.0,
+                 retry_after: int = 5):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.timings = LatencyTracker()
+        self._lock = threading.Lock()
+        # priority -> conversation -> FIFO of waiters; conversation order is the rotation
+        self._queues: Dict[int, "OrderedDict[Hashable, Deque[_Waiter]]"] = {}
+        self._depth = 0
+        self._in_flight = 0
+        self._anonymous = itertools.count()
+        self._counters = {"admitted": 0, "completed": 0, "rejected": 0, "timed_out": 0}
+
+    @contextmanager
+    def slot(self, conversation_id: Optional[Any] = None, priority: int = 0):
+        """Hold a generation slot for the duration of the block."""
+        lease = self.acquire(conversation_id, priority)
+        try:
+            yield
+        finally:
+            lease.release()
+
+    def acquire(self, conversation_id: Optional[Any] = None, priority: int = 0) -> "Lease":
+        """Wait for a generation slot and return a Lease that gives it back.
+
+        For callers whose generation outlives the call that admits it, such as
+        a streamed response; everyone else should use `slot()`.
+        """
+        waiter = self._acquire(conversation_id, priority)
+        self.timings.record("queue_wait", time.perf_counter() - waiter.enqueued)
+        return Lease(self)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "queue_depth": self._depth,
+                "queued_conversations": sum(len(conversations) for conversations in self._queues.values()),
+                **self._counters,
+            }
+        return {**stats, "latency": self.timings.summary()}
+
+    def _acquire(self, conversation_id: Optional[Any], priority: int) -> _Waiter:
+        # Requests without a conversation each get their own turn in the rotation.
+        key = conversation_id if conversation_id is not None else ("anonymous", next(self._anonymous))
+        waiter = _Waiter(key, priority)
+        with self._lock:
+            if self._in_flight < self.max_concurrency and self._depth == 0:
+                self._in_flight += 1
+                self._counters["admitted"] += 1
+                waiter.granted = True
+                return waiter
+            if self._depth >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise ComponentUnavailable("llm", "saturated", self.retry_after, "generation queue is full")
+            conversations = self._queues.setdefault(priority, OrderedDict())
+            conversations.setdefault(key, deque()).append(waiter)
+            self._depth += 1
+
+        if waiter.event.wait(self.timeout):
+            return waiter
+        with self._lock:
+            if waiter.granted:
+                return waiter
+            self._remove(waiter)
+            self._counters["timed_out"] += 1
+        raise ComponentUnavailable("llm", "saturated", self.retry_after, "timed out waiting for a generation slot")
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._counters["completed"] += 1
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the next waiters; caller holds the lock."""
+        while self._in_flight < self.max_concurrency and self._depth:
+            priority = min(p for p, conversations in self._queues.items() if conversations)
+            conversations = self._queues[priority]
+            key, waiters = next(iter(conversations.items()))
+            waiter = waiters.popleft()
+            # Rotate: the conversation goes to the back of the line if it has more waiting.
+            del conversations[key]
+            if waiters:
+                conversations[key] = waiters
+            self._depth -= 1
+            self._in_flight += 1
+            self._counters["admitted"] += 1
+            waiter.granted = True
+            waiter.event.set()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        conversations = self._queues.get(waiter.priority, {})
+        waiters = conversations.get(waiter.key)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            self._depth -= 1
+            if not waiters:
+                del conversations[waiter.key]
@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+import numpy as np
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+WORDS = ("the", "team", "revenue", "grew", "quarter", "budget", "salary", "department",
+         "employee", "profit", "expenses", "report", "increase", "total", "average", "data")
+
+
+def stub_embedding(text: str, dim: int = 256) -> List[float]:
+    """Deterministic bag-of-words hashing embedding, so similar texts land close together."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class StubOllamaServer:
+    """Minimal Ollama-compatible HTTP server for tests and benchmarks.
+
+    Serves /api/tags, /api/generate (streaming and not), /api/embed and
+    /api/embeddings with deterministic output. `first_token_delay` and
+    `token_delay` simulate generation latency, `prompt_token_delay` the cost
+    of evaluating each new prompt token and `embed_delay` embedding latency.
+    Like Ollama, generate returns a `context` that, passed back, spares the
+    tokens it holds from being evaluated again; `prompt_eval_count` reports
+    the tokens that were. Request counts per endpoint are kept in `requests`.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, models: Optional[List[str]] = None,
+                 first_token_delay: float = 0.0, token_delay: float = 0.0, embed_delay: float = 0.0,
+                 prompt_token_delay: float = 0.0, tokens: int = 32, dim: int = 256):
+        self.models = models or ["llama3.2:1b", "mxbai-embed-large:latest"]
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.embed_delay = embed_delay
+        self.prompt_token_delay = prompt_token_delay
+        self.tokens = tokens
+        self.dim = dim
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ollama-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def answer_tokens(self, prompt: str, count: int) -> List[str]:
+        seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:4], "little")
+        return [WORDS[(seed + i * 7) % len(WORDS)] + " " for i in range(count)]
+
+    @staticmethod
+    def tokenize(text: str) -> List[int]:
+        return [
+            int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest(), "little")
+            for word in text.split()
+        ]
+
+    def _count(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] += 1
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_GET(self):
+                stub._count(self.path)
+                if self.path == "/api/tags":
+                    self._json({"models": [{"name": name} for name in stub.models]})
+                else:
+                    self._json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                stub._count(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/api/generate":
+                    self._generate(body)
+                elif self.path == "/api/embed":
+                    texts = body.get("input", [])
+                    texts = [texts] if isinstance(texts, str) else texts
+                    time.sleep(stub.embed_delay)
+                    self._json({"model": body.get("model"),
+                                "embeddings": [stub_embedding(text, stub.dim) for text in texts]})
+                elif self.path == "/api/embeddings":
+                    time.sleep(stub.embed_delay)
+                    self._json({"embedding": stub_embedding(body.get("prompt", ""), stub.dim)})
+                else:
+                    self._json({"error": "not found"}, status=404)
+
+            def _generate(self, body: Dict[str, Any]) -> None:
+                # The answer ends on its own after `tokens`, or earlier if num_predict says so.
+                count = min(int(body.get("options", {}).get("num_predict", stub.tokens)), stub.tokens)
+                tokens = stub.answer_tokens(body.get("prompt", ""), count)
+                prompt_tokens = stub.tokenize(f"{body.get('system', '')} {body.get('prompt', '')}")
+                final = {
+                    "model": body.get("model"),
+                    "done": True,
+                    "prompt_eval_count": len(prompt_tokens),
+                    "eval_count": len(tokens),
+                    "context": list(body.get("context") or []) + prompt_tokens + stub.tokenize("".join(tokens)),
+                }
+                time.sleep(stub.first_token_delay + stub.prompt_token_delay * len(prompt_tokens))
+                if not body.get("stream", True):
+                    time.sleep(stub.token_delay * len(tokens))
+                    self._json({**final, "response": "".join(tokens)})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(stub.token_delay)
+                    self._chunk({"model": body.get("model"), "response": token, "done": False})
+                self._chunk({**final, "response": ""})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _json(self, payload: Dict[str, Any], status: int = 200) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run an Ollama-compatible stub server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--first-token-delay", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--embed-delay", type=float, default=0.0)
+    parser.add_argument("--prompt-token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubOllamaServer(args.host, args.port, first_token_delay=args.first_token_delay,
+                              token_delay=args.token_delay, embed_delay=args.embed_delay,
+                              prompt_token_delay=args.prompt_token_delay)
+    print(f"Ollama stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from itertools import count
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.utils.logger import logger
+
+
+class SemanticCache:
+    """LRU/TTL cache of answers keyed by question embeddings.
+
+    A lookup returns the answer of the most similar cached question when its
+    cosine similarity is at least `threshold`. Entries belong to a version
+    (dataset fingerprint plus LLM settings); a new version clears the cache.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._ids = count()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def lookup(self, vector: List[float], version: str) -> Optional[str]:
+        """Return the cached answer for a semantically equivalent question, if any."""
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+            if not self._entries:
+                self._counters["misses"] += 1
+                return None
+
+            keys = list(self._entries.keys())
+            matrix = np.vstack([self._entries[key]["vector"] for key in keys])
+            scores = matrix @ self._normalize(vector)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self._counters["misses"] += 1
+                return None
+
+            key = keys[best]
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            logger.info(f"Semantic cache hit (similarity {scores[best]:.3f}).")
+            return self._entries[key]["answer"]
+
+    def store(self, vector: List[float], answer: str, version: str) -> None:
+        """Cache an answer, evicting the least recently used entry when full."""
+        with self._lock:
+            self._check_version(version)
+            self._entries[next(self._ids)] = {
+                "vector": self._normalize(vector),
+                "answer": answer,
+                "created": time.monotonic(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss/eviction counters and the overall hit rate."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _check_version(self, version: str) -> None:
+        if version != self.version:
+            if self._entries:
+                logger.info("Data or LLM settings changed; clearing semantic cache.")
+            self._entries.clear()
+            self.version = version
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry["created"] < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+
+class ResponseCache:
+    """Exact-match answer cache with a bounded in-memory LRU and an optional shared SQLite tier.
+
+    The SQLite tier lets several worker processes reuse each other's answers.
+    `stats()` reports overall hits and misses plus hit and eviction counters
+    for each tier; a lookup reaches the shared tier only on a local miss.
+    """
+
+    def __init__(self, max_entries: int = 1024, shared_path: Optional[Path] = None,
+                 shared_max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.shared_max_entries = shared_max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"local_hits": 0, "local_evictions": 0, "shared_hits": 0, "shared_evictions": 0,
+                          "misses": 0}
+        self._conn = None
+        if shared_path is not None:
+            Path(shared_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(shared_path), check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " answer TEXT NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_created ON responses (created)")
+            self._conn.commit()
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation."""
+        question = re.sub(r"\s+", " ", question.strip().lower())
+        return question.rstrip("?!. ")
+
+    @classmethod
+    def make_key(cls, question: str, model: str, temperature: float, top_p: float, top_k: int,
+                 prompt_type: str, data_version: str, filters: Optional[Dict] = None,
+                 history: str = "") -> str:
+        key = json.dumps([cls.normalize(question), model, temperature, top_p, top_k, prompt_type, data_version,
+                          filters or {}, history], sort_keys=True)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached answer, promoting shared-tier hits into memory."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._counters["local_hits"] += 1
+                return self._entries[key]
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT answer FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._counters["shared_hits"] += 1
+                    self._put_local(key, row[0])
+                    return row[0]
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, answer: str) -> None:
+        with self._lock:
+            self._put_local(key, answer)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, answer, created) VALUES (?, ?, ?)",
+                    (key, answer, time.time()),
+                )
+                overflow = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.shared_max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY created LIMIT ?)",
+                        (overflow,),
+                    )
+                    self._counters["shared_evictions"] += overflow
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Overall hit rate, and hits, evictions, entries and hit rate per tier."""
+        with self._lock:
+            counters = dict(self._counters)
+            local_entries = len(self._entries)
+            shared_entries = (
+                self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self._conn is not None else None
+            )
+        local_hits, shared_hits, misses = counters["local_hits"], counters["shared_hits"], counters["misses"]
+        lookups = local_hits + shared_hits + misses
+        stats = {
+            "hits": local_hits + shared_hits,
+            "misses": misses,
+            "hit_rate": self._rate(local_hits + shared_hits, lookups),
+            "local": {
+                "hits": local_hits,
+                "evictions": counters["local_evictions"],
+                "entries": local_entries,
+                "hit_rate": self._rate(local_hits, lookups),
+            },
+            "shared": None,
+        }
+        if self._conn is not None:
+            stats["shared"] = {
+                "hits": shared_hits,
+                "evictions": counters["shared_evictions"],
+                "entries": shared_entries,
+                "hit_rate": self._rate(shared_hits, shared_hits + misses),
+            }
+        return stats
+
+    @staticmethod
+    def _rate(hits: int, lookups: int) -> float:
+        return round(hits / lookups, 4) if lookups else 0.0
+
+    def _put_local(self, key: str, answer: str) -> None:
+        self._entries[key] = answer
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["local_evictions"] += 1
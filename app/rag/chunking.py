@@ -0,0 +1,106 @@
+import math
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+WORD_PATTERN = re.compile(r"\S+")
+CHUNK_SEPARATOR = "#"
+
+# Llama-family tokenizers average roughly four characters per token on English text.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate, good enough for budgeting a prompt."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_text(text: str, chunk_size: int, overlap: int = 0) -> List[str]:
+    """Split text into chunks of at most `chunk_size` characters on word boundaries.
+
+    Consecutive chunks share up to `overlap` characters of whole words. A
+    single word longer than `chunk_size` becomes a chunk of its own.
+    """
+    if len(text) <= chunk_size:
+        return [text]
+    spans = [match.span() for match in WORD_PATTERN.finditer(text)]
+    chunks = []
+    i = 0
+    while i < len(spans):
+        start = spans[i][0]
+        j = i
+        while j + 1 < len(spans) and spans[j + 1][1] - start <= chunk_size:
+            j += 1
+        chunks.append(text[start:spans[j][1]])
+        if j + 1 >= len(spans):
+            break
+        # Start the next chunk at the earliest word that ends within the overlap.
+        k = j + 1
+        while k - 1 > i and spans[j][1] - spans[k - 1][0] <= overlap:
+            k -= 1
+        i = k
+    return chunks
+
+
+def chunk_documents(documents: Iterable[Tuple[str, str, Dict]], chunk_size: int,
+                    overlap: int = 0) -> Iterator[Tuple[str, str, Dict]]:
+    """Split `(doc_id, text, metadata)` triples into chunk triples.
+
+    Documents that fit in one chunk pass through unchanged, so their ids and
+    embeddings stay stable; longer ones yield `doc_id#n` chunks carrying the
+    parent's metadata plus `parent_id` and their position.
+    """
+    for doc_id, text, metadata in documents:
+        chunks = split_text(text, chunk_size, overlap)
+        if len(chunks) == 1:
+            yield doc_id, text, metadata
+            continue
+        for n, chunk in enumerate(chunks):
+            yield f"{doc_id}{CHUNK_SEPARATOR}{n}", chunk, {**metadata, "parent_id": doc_id, "chunk": n}
+
+
+def parent_of(doc_id: str) -> Optional[str]:
+    """The document a chunk id was cut from, or None for a document stored whole."""
+    parent, separator, _ = doc_id.rpartition(CHUNK_SEPARATOR)
+    return parent if separator else None
+
+
+def _overlap(previous: str, text: str, max_overlap: int) -> int:
+    """Length of the longest run of whole words ending `previous` and starting `text`."""
+    for size in range(min(max_overlap, len(previous), len(text)), 0, -1):
+        if not previous.endswith(text[:size]):
+            continue
+        if (size == len(text) or text[size].isspace()) and (size == len(previous) or previous[-size - 1].isspace()):
+            return size
+    return 0
+
+
+def pack_context(hits: Sequence[Tuple[str, float, Optional[str]]], budget: int,
+                 max_overlap: int = 0) -> List[str]:
+    """Choose retrieved chunks for the prompt, best first, within a token budget.
+
+    `hits` are `(text, score, parent_id)` triples. Duplicates and chunks
+    contained in one already chosen are dropped, and the overlap a chunk
+    shares with a chosen neighbour from the same document is trimmed so it is
+    only paid for once. Chunks that do not fit are skipped in favour of
+    smaller, lower-scored ones.
+    """
+    packed: List[Tuple[str, Optional[str]]] = []
+    used = 0
+    for text, _, parent in sorted(hits, key=lambda hit: hit[1], reverse=True):
+        text = text.strip()
+        if not text or any(text in chosen for chosen, _ in packed):
+            continue
+        siblings = [chosen for chosen, chosen_parent in packed if parent is not None and chosen_parent == parent]
+        if max_overlap and siblings:
+            # Neighbours may be chosen in either order, so trim both ends.
+            head = max(_overlap(chosen, text, max_overlap) for chosen in siblings)
+            tail = max(_overlap(text, chosen, max_overlap) for chosen in siblings)
+            text = text[head:len(text) - tail].strip()
+            if not text:
+                continue
+        cost = estimate_tokens(text) + 1  # + the newline joining it to the rest
+        if used + cost > budget:
+            continue
+        packed.append((text, parent))
+        used += cost
+    return [text for text, _ in packed]
@@ -0,0 +1,190 @@
+import sqlite3
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from langchain_core.embeddings import Embeddings
+from app.rag.index import content_hash
+from app.utils.concurrency import ConcurrencyLimiter
+from app.utils.logger import logger
+
+
+class EmbeddingCache:
+    """SQLite-backed store of embedding vectors keyed by (model, text hash)."""
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._entries, self._size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+        self._evictions = 0
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for whichever of `hashes` are present."""
+        hashes = list(hashes)
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        [(time.time(), model, row[0]) for row in rows],
+                    )
+            self._conn.commit()
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        """Store vectors and evict the least recently used ones past the size limit."""
+        now = time.time()
+        rows = [
+            (model, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text_hash, vector in vectors.items()
+        ]
+        with self._lock:
+            # Replaced rows give back their old bytes and are not new entries.
+            replaced = self._stored_sizes(model, list(vectors))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._entries += len(rows) - len(replaced)
+            self._size += sum(len(row[2]) for row in rows) - sum(replaced.values())
+            if self._size > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": self._entries, "bytes": self._size, "max_bytes": self.max_bytes,
+                    "evictions": self._evictions}
+
+    def _stored_sizes(self, model: str, hashes: List[str]) -> Dict[str, int]:
+        """Byte sizes of the vectors already stored for whichever of `hashes` are present."""
+        sizes: Dict[str, int] = {}
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            sizes.update(self._conn.execute(
+                f"SELECT text_hash, LENGTH(vector) FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *chunk],
+            ).fetchall())
+        return sizes
+
+    def _evict(self) -> None:
+        """Drop least recently used vectors until the cache is back under 90% of its limit."""
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        while self._size > target:
+            rows = self._conn.execute(
+                "SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", [(row[0],) for row in rows])
+            self._size -= sum(row[1] for row in rows)
+            self._entries -= len(rows)
+            evicted += len(rows)
+        self._evictions += evicted
+        logger.info(f"Evicted {evicted} vectors from the embedding cache.")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that batches requests concurrently and caches vectors on disk."""
+
+    def __init__(self, base: Embeddings, model: str, cache: Optional[EmbeddingCache] = None,
+                 batch_size: int = 32, max_concurrency: int = 4,
+                 limiter: Optional[ConcurrencyLimiter] = None):
+        self.base = base
+        self.limiter = limiter
+        self.model = model
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="embed"
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, sending only cache misses upstream in concurrent batches."""
+        try:
+            hashes = [content_hash(text) for text in texts]
+            vectors: Dict[str, List[float]] = {}
+            if self.cache is not None:
+                vectors.update(self.cache.get_many(self.model, set(hashes)))
+
+            missing: Dict[str, str] = {}
+            for text_hash, text in zip(hashes, texts):
+                if text_hash not in vectors:
+                    missing.setdefault(text_hash, text)
+
+            if missing:
+                computed = self._embed_batches(list(missing.keys()), list(missing.values()))
+                vectors.update(computed)
+                if self.cache is not None:
+                    self.cache.put_many(self.model, computed)
+
+            return [vectors[text_hash] for text_hash in hashes]
+        except Exception as e:
+            logger.error(f"Error embedding documents: {e}")
+            raise
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing the cached vector for repeated questions."""
+        try:
+            # Queries may be embedded differently from documents, so keep them apart.
+            namespace = f"{self.model}#query"
+            text_hash = content_hash(text)
+            if self.cache is not None:
+                cached = self.cache.get_many(namespace, [text_hash])
+                if text_hash in cached:
+                    return cached[text_hash]
+            # Query embeddings sit on the request path, so they share the request limiter.
+            with self.limiter.slot() if self.limiter is not None else nullcontext():
+                vector = self.base.embed_query(text)
+            if self.cache is not None:
+                self.cache.put_many(namespace, {text_hash: vector})
+            return vector
+        except Exception as e:
+            logger.error(f"Error embedding query: {e}")
+            raise
+
+    def _embed_batches(self, hashes: List[str], texts: List[str]) -> Dict[str, List[float]]:
+        """Embed texts in `batch_size` groups, at most `max_concurrency` at a time."""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            results = [self.base.embed_documents(batches[0])]
+        else:
+            results = list(self._executor.map(self.base.embed_documents, batches))
+        vectors = [vector for batch in results for vector in batch]
+        return dict(zip(hashes, vectors))
@@ -0,0 +1,127 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from app.utils.logger import logger
+
+MANIFEST_VERSION = 1
+
+
+def content_hash(text: str, metadata: Optional[Dict] = None) -> str:
+    """Return a stable hash of a document's content and metadata."""
+    digest = hashlib.sha256(text.encode("utf-8"))
+    if metadata:
+        digest.update(json.dumps(metadata, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """Record of the documents embedded into a persisted vector store."""
+
+    def __init__(self, path: Path, embedding_model: str,
+                 dataset_fingerprint: Optional[str] = None,
+                 documents: Optional[Dict[str, str]] = None):
+        self.path = Path(path)
+        self.embedding_model = embedding_model
+        self.dataset_fingerprint = dataset_fingerprint
+        self.documents = documents or {}
+
+    @classmethod
+    def load(cls, path: Path, embedding_model: str) -> "IndexManifest":
+        """Load a manifest, starting empty if it is missing or was built for another model."""
+        path = Path(path)
+        if not path.exists():
+            return cls(path, embedding_model)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable index manifest {path}: {e}")
+            return cls(path, embedding_model)
+
+        if data.get("version") != MANIFEST_VERSION or data.get("embedding_model") != embedding_model:
+            logger.info("Index manifest was built with different settings; rebuilding index.")
+            return cls(path, embedding_model)
+
+        return cls(
+            path,
+            embedding_model,
+            dataset_fingerprint=data.get("dataset_fingerprint"),
+            documents=data.get("documents", {}),
+        )
+
+    def save(self) -> None:
+        """Atomically write the manifest next to the vector store."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "embedding_model": self.embedding_model,
+                "dataset_fingerprint": self.dataset_fingerprint,
+                "documents": self.documents,
+            }, f)
+        tmp_path.replace(self.path)
+
+    def is_current(self, dataset_fingerprint: str) -> bool:
+        """Whether the index already reflects the given dataset."""
+        return bool(self.documents) and self.dataset_fingerprint == dataset_fingerprint
+
+
+def sync_index(vectorstore, documents: Iterable[Tuple[str, str, Dict]], manifest: IndexManifest,
+               dataset_fingerprint: str, batch_size: int = 256,
+               persist: Optional[Callable[[], None]] = None) -> Dict[str, int]:
+    """Bring a vector store in line with `documents`, embedding only new or changed ones.
+
+    `documents` yields `(doc_id, text, metadata)` triples. Unchanged documents
+    are reused, changed ones (text or metadata) are re-embedded and documents
+    no longer present are deleted.
+    `persist` is called before the manifest is saved, for stores that do not
+    write through to disk themselves.
+    """
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+    seen: Dict[str, str] = {}
+    batch_ids: List[str] = []
+    batch_texts: List[str] = []
+    batch_metadatas: List[Dict] = []
+
+    def flush():
+        if batch_ids:
+            vectorstore.add_texts(texts=batch_texts, metadatas=batch_metadatas, ids=batch_ids)
+            batch_ids.clear()
+            batch_texts.clear()
+            batch_metadatas.clear()
+
+    for doc_id, text, metadata in documents:
+        if doc_id in seen:
+            continue
+        digest = content_hash(text, metadata)
+        seen[doc_id] = digest
+        previous = manifest.documents.get(doc_id)
+        if previous == digest:
+            stats["unchanged"] += 1
+            continue
+        stats["updated" if previous else "added"] += 1
+        batch_ids.append(doc_id)
+        batch_texts.append(text)
+        batch_metadatas.append(metadata)
+        if len(batch_ids) >= batch_size:
+            flush()
+    flush()
+
+    stale = [doc_id for doc_id in manifest.documents if doc_id not in seen]
+    for start in range(0, len(stale), batch_size):
+        vectorstore.delete(ids=stale[start:start + batch_size])
+    stats["deleted"] = len(stale)
+
+    if persist is not None:
+        persist()
+    manifest.documents = seen
+    manifest.dataset_fingerprint = dataset_fingerprint
+    manifest.save()
+
+    logger.info(
+        f"Vector index synced: {stats['added']} added, {stats['updated']} updated, "
+        f"{stats['unchanged']} unchanged, {stats['deleted']} deleted."
+    )
+    return stats
@@ -0,0 +1,139 @@
+import math
+import re
+import threading
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.rag.partitions import PartitionIndex, normalize_filters
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does did for from has have how i in is it its me of on or
+our show tell the their there this to was were what when where which who whom whose why
+will with you your about give list much many any all
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index scoring documents with Okapi BM25.
+
+    Documents are added with `add()` and become searchable after `build()`,
+    which freezes the postings into NumPy arrays so a query is a handful of
+    vectorized scatter-adds, one per query term.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.texts: List[str] = []
+        self._lengths: List[int] = []
+        self._partitions = PartitionIndex()
+        self._building: Dict[str, List[Tuple[int, int]]] = {}
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._norms = np.empty(0, dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        position = len(self.doc_ids)
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            self._building.setdefault(token, []).append((position, tf))
+        self.doc_ids.append(doc_id)
+        self.texts.append(text)
+        self._lengths.append(len(tokens))
+        self._partitions.add(position, metadata)
+
+    def add_many(self, documents: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+        for doc_id, text, metadata in documents:
+            self.add(doc_id, text, metadata)
+
+    def build(self) -> None:
+        """Freeze postings into arrays and precompute length normalisation."""
+        with self._lock:
+            for token, entries in self._building.items():
+                positions = np.fromiter((p for p, _ in entries), dtype=np.int64, count=len(entries))
+                tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+                if token in self._postings:
+                    old_positions, old_tfs = self._postings[token]
+                    positions = np.concatenate([old_positions, positions])
+                    tfs = np.concatenate([old_tfs, tfs])
+                self._postings[token] = (positions, tfs)
+            self._building = {}
+            lengths = np.asarray(self._lengths, dtype=np.float32)
+            average = lengths.mean() if len(lengths) else 1.0
+            self._norms = self.k1 * (1 - self.b + self.b * lengths / max(average, 1e-6))
+
+    def idf(self, token: str) -> float:
+        postings = self._postings.get(token)
+        df = len(postings[0]) if postings else 0
+        n = len(self.doc_ids)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 5,
+               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[str, str, float]]:
+        """Return up to k `(doc_id, text, score)` matches, best first.
+
+        `filter` restricts the search to documents whose metadata matches it.
+        """
+        terms = [token for token in set(tokenize(query)) if token not in STOPWORDS and token in self._postings]
+        if not terms or not self.doc_ids:
+            return []
+
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term in terms:
+            positions, tfs = self._postings[term]
+            scores[positions] += self.idf(term) * tfs * (self.k1 + 1) / (tfs + self._norms[positions])
+        filters = normalize_filters(filter)
+        if filters:
+            allowed = np.zeros(len(scores), dtype=bool)
+            allowed[self._partitions.rows(filters)] = True
+            scores[~allowed] = 0
+
+        matched = np.flatnonzero(scores > 0)
+        if not len(matched):
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_ids[i], self.texts[i], float(scores[i])) for i in top]
+
+    def is_keyword_query(self, query: str, min_ratio: float = 0.5, max_df_ratio: float = 0.1) -> bool:
+        """Whether the query is dominated by rare, exactly matching tokens such as names.
+
+        Such queries are answered from the inverted index alone, which skips the
+        embedding call entirely.
+        """
+        content = [token for token in tokenize(query) if token not in STOPWORDS]
+        if not content or not self.doc_ids:
+            return False
+        max_df = max(1, int(len(self.doc_ids) * max_df_ratio))
+        specific = [
+            token for token in content
+            if token in self._postings and len(self._postings[token][0]) <= max_df
+        ]
+        return bool(specific) and len(specific) / len(content) >= min_ratio
+
+
+def fused_scores(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Merge ranked lists of keys into `(key, score)` pairs, scoring each by the sum of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    """Merge ranked lists of keys, best first."""
+    return [key for key, _ in fused_scores(rankings, k=k)]
@@ -1,89 +1,701 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
-from langchain_community.embeddings import OllamaEmbeddings
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from langchain_community.vectorstores import Chroma
-from langchain.chains import RetrievalQA
-from langchain_community.llms import Ollama
-from langchain.prompts import PromptTemplate
-from pandasai import PandasAI
-from pandasai.llm.openai import OpenAI
+from app.llm.adapters import OllamaEmbeddingModel, OllamaLLM
+from app.llm.client import get_client
+from app.llm.context import ContextStore
+from app.llm.scheduler import GenerationScheduler, LeasedIterator
+from app.rag.cache import ResponseCache, SemanticCache
+from app.rag.chunking import chunk_documents, estimate_tokens, pack_context, parent_of
+from app.rag.embeddings import CachedEmbeddings, EmbeddingCache
+from app.rag.index import IndexManifest, sync_index
+from app.rag.keyword import BM25Index, fused_scores
+from app.rag.numpy_store import NumpyVectorStore
+from app.rag.partitions import normalize_filters
+from app.rag.planner import StructuredQueryPlanner
+from app.utils.columnar_cache import ColumnarCache
+from app.utils.concurrency import ConcurrencyLimiter, file_lock
+from app.utils.data_processor import (
+    dataset_fingerprint, iter_documents, iter_merged, merge_tables, optimize_dtypes, source_stats
+)
 from app.utils.logger import logger
+from app.utils.metrics import LatencyTracker
 from app.config import Settings
+import hashlib
+import json
 import re
+import threading
+import time
+
+
+# Words that make a question lean on earlier turns ("what about its budget?").
+FOLLOW_UP_PATTERN = (
+    r"\b(it|its|they|them|their|theirs|that|those|these|this|he|him|his|she|her|same|also|too|"
+    r"else|again|instead|previous|earlier|above|what about|how about)\b|^\s*(and|but|so)\b"
+)
 
 
 class RAGManager:
+    # Bump when the document text layout changes so the index is re-synced.
+    DOCUMENT_FORMAT_VERSION = 4
+
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.embeddings = OllamaEmbeddings(model=settings.EMBEDDING_MODEL)
-        self.llm = Ollama(
+        # Bound concurrent Ollama calls so cheap requests are never starved by generations.
+        self.scheduler = GenerationScheduler(
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            max_queue=settings.LLM_QUEUE_MAX_DEPTH,
+            timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        )
+        self.embedding_limiter = ConcurrencyLimiter(
+            "embeddings", settings.EMBEDDING_MAX_CONCURRENCY, timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS
+        )
+        # One pooled client for generation, embeddings and health checks.
+        self.ollama = get_client(
+            settings.OLLAMA_BASE_URL,
+            connect_timeout=settings.OLLAMA_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=settings.OLLAMA_READ_TIMEOUT_SECONDS,
+            max_retries=settings.OLLAMA_MAX_RETRIES,
+            backoff=settings.OLLAMA_RETRY_BACKOFF_SECONDS,
+            pool_size=settings.OLLAMA_POOL_SIZE,
+        )
+        self.embeddings = CachedEmbeddings(
+            OllamaEmbeddingModel(self.ollama, settings.EMBEDDING_MODEL),
+            model=settings.EMBEDDING_MODEL,
+            cache=EmbeddingCache(
+                settings.EMBEDDING_CACHE_PATH,
+                max_bytes=settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+            ) if settings.EMBEDDING_CACHE_ENABLED else None,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            max_concurrency=settings.EMBEDDING_CONCURRENCY,
+            limiter=self.embedding_limiter,
+        )
+        self.context_store = ContextStore(
+            max_conversations=settings.LLM_CONTEXT_CACHE_SIZE,
+            max_tokens=settings.LLM_CONTEXT_REUSE_MAX_TOKENS or settings.LLM_NUM_CTX // 2,
+        ) if settings.LLM_CONTEXT_REUSE else None
+        self.llm = OllamaLLM(
+            client=self.ollama,
             model=settings.LLM_MODEL,
-            temperature=settings.LLM_TEMPERATURE,
-            top_p=settings.LLM_TOP_P,
-            top_k=settings.LLM_TOP_K,
-            repeat_penalty=settings.LLM_REPEAT_PENALTY,
-            stop=settings.LLM_STOP_SEQUENCES,
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,
+            context_store=self.context_store,
+            options={
+                "temperature": settings.LLM_TEMPERATURE,
+                "top_p": settings.LLM_TOP_P,
+                "top_k": settings.LLM_TOP_K,
+                "repeat_penalty": settings.LLM_REPEAT_PENALTY,
+                "stop": settings.LLM_STOP_SEQUENCES,
+                "num_ctx": settings.LLM_NUM_CTX,
+                "num_predict": settings.LLM_NUM_PREDICT,
+            },
         )
+        self.response_cache = ResponseCache(
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            shared_path=settings.RESPONSE_CACHE_SHARED_PATH,
+            shared_max_entries=settings.RESPONSE_CACHE_SHARED_MAX_ENTRIES,
+        ) if settings.RESPONSE_CACHE_ENABLED else None
+        self.semantic_cache = SemanticCache(
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        ) if settings.SEMANTIC_CACHE_ENABLED else None
         self.vectorstore = None
-        self.pandas_ai = PandasAI(OpenAI(api_token=settings.OPENAI_API_KEY))
+        self.timings = LatencyTracker()
+        self.data_cache = None
+        if settings.DATA_CACHE_ENABLED:
+            self.data_cache = ColumnarCache(settings.DATA_CACHE_DIR, settings.DATA_DIR)
+            if not self.data_cache.available:
+                logger.warning("pyarrow is not installed; columnar data cache disabled.")
+                self.data_cache = None
         self.dataframe = None
+        self.data_version = None
+        self._data_stats = None
+        self._data_version_lock = threading.Lock()
+        self.planner = None
+        self.keyword_index = None
+        self._follow_ups = 0
+        self._follow_up_lock = threading.Lock()
         self._initialize_rag_system()
 
     def _initialize_rag_system(self):
         """Initialize the RAG system by loading and preparing data."""
         try:
-            self.dataframe = self._load_and_merge_data()
-            self.vectorstore = Chroma.from_texts(
-                texts=self._format_documents(self.dataframe),
-                embedding=self.embeddings,
-                persist_directory=str(self.settings.CHROMA_DIR),
-            )
+            self.current_data_version()
+            if self.settings.STRUCTURED_QUERIES_ENABLED:
+                self.planner = self._build_planner()
+            if self.settings.HYBRID_RETRIEVAL_ENABLED:
+                self.keyword_index = BM25Index(k1=self.settings.BM25_K1, b=self.settings.BM25_B)
+            # Workers share the index directory: the first one in syncs it and the
+            # rest open it afterwards and find the manifest current.
+            with file_lock(self._index_dir() / "index.lock"):
+                self.vectorstore = self._create_vectorstore()
+                self._sync_vectorstore()
+            if self.keyword_index is not None:
+                self.keyword_index.build()
             logger.info("RAG system initialized successfully.")
         except Exception as e:
             logger.error(f"Error initializing RAG: {e}")
             raise
 
+    def current_data_version(self) -> str:
+        """Fingerprint of the source CSVs, rehashed only when a file's mtime or size changes.
+
+        Checked on every cache lookup, so editing the data while the server runs
+        invalidates cached answers. The index and planner are rebuilt on restart.
+        """
+        stats = source_stats(self.settings.DATA_DIR)
+        if stats != self._data_stats:
+            with self._data_version_lock:
+                if stats != self._data_stats:
+                    if self.data_cache is not None:
+                        version = self.data_cache.fingerprint()
+                    else:
+                        version = dataset_fingerprint(self.settings.DATA_DIR)
+                    if self.data_version is not None and version != self.data_version:
+                        logger.info("Source data changed; cached answers are invalidated.")
+                    self.data_version = version
+                    self._data_stats = stats
+        return self.data_version
+
+    def _create_vectorstore(self):
+        """Open the vector store backend selected by VECTOR_BACKEND."""
+        backend = self.settings.VECTOR_BACKEND
+        if backend == "numpy":
+            return NumpyVectorStore(
+                self.embeddings,
+                persist_directory=self.settings.NUMPY_INDEX_DIR,
+                quantization=self.settings.VECTOR_QUANTIZATION,
+            )
+        if backend == "chroma":
+            return Chroma(
+                embedding_function=self.embeddings,
+                persist_directory=str(self.settings.CHROMA_DIR),
+            )
+        raise ValueError(f"Unknown VECTOR_BACKEND '{backend}'")
+
+    def _index_dir(self) -> Path:
+        if self.settings.VECTOR_BACKEND == "numpy":
+            return self.settings.NUMPY_INDEX_DIR
+        return self.settings.CHROMA_DIR
+
+    def _sync_vectorstore(self):
+        """Embed only new or changed documents into the persisted vector store."""
+        try:
+            is_numpy = isinstance(self.vectorstore, NumpyVectorStore)
+            # Quantized vectors are not interchangeable, so they get their own manifest key.
+            index_key = self.settings.EMBEDDING_MODEL
+            if is_numpy:
+                index_key = f"{index_key}:{self.settings.VECTOR_QUANTIZATION}"
+            manifest = IndexManifest.load(self._index_dir() / self.settings.INDEX_MANIFEST_FILE, index_key)
+            if is_numpy and len(self.vectorstore) == 0:
+                manifest.documents = {}
+            # Chunking settings change the stored documents as much as the data does.
+            fingerprint = (f"{self.data_version}:{self.DOCUMENT_FORMAT_VERSION}:"
+                           f"{self.settings.CHUNK_SIZE}:{self.settings.CHUNK_OVERLAP}")
+            if manifest.is_current(fingerprint):
+                logger.info("Vector index is up to date; skipping embedding.")
+                if self.keyword_index is not None:
+                    self.keyword_index.add_many(self._iter_chunks())
+                return
+
+            if not manifest.documents:
+                # Vectors persisted without a manifest cannot be matched to rows.
+                existing = self.vectorstore.get(include=[])["ids"]
+                if existing:
+                    self.vectorstore.delete(ids=existing)
+
+            documents = self._iter_chunks()
+            if self.keyword_index is not None:
+                documents = self._index_keywords(documents)
+            sync_index(
+                self.vectorstore,
+                documents,
+                manifest,
+                fingerprint,
+                batch_size=self.settings.INDEX_BATCH_SIZE,
+                persist=self.vectorstore.save if is_numpy else None,
+            )
+        except Exception as e:
+            logger.error(f"Error syncing vector index: {e}")
+            raise
+
+    def _iter_chunks(self) -> Iterator[Tuple[str, str, Dict]]:
+        """Dataset documents split into CHUNK_SIZE pieces for indexing."""
+        return chunk_documents(
+            iter_documents(self.settings.DATA_DIR, chunksize=self.settings.INGEST_CHUNK_SIZE),
+            self.settings.CHUNK_SIZE,
+            self.settings.CHUNK_OVERLAP,
+        )
+
+    def _index_keywords(self, documents: Iterator[Tuple[str, str, Dict]]) -> Iterator[Tuple[str, str, Dict]]:
+        """Feed documents into the keyword index as they stream past to the vector store."""
+        for doc_id, text, metadata in documents:
+            self.keyword_index.add(doc_id, text, metadata)
+            yield doc_id, text, metadata
+
+    def _build_planner(self) -> StructuredQueryPlanner:
+        """The planner over only the columns it aggregates, mapped from the columnar cache when there is one."""
+        if self.data_cache is not None:
+            frame = self._cached_data(columns=StructuredQueryPlanner.MERGED_COLUMNS)
+            if frame is not None:
+                logger.info("Loaded merged dataset from columnar cache.")
+                return StructuredQueryPlanner.from_merged(frame)
+        return StructuredQueryPlanner.from_csv(self.settings.DATA_DIR)
+
+    def _cached_data(self, columns: Optional[List[str]] = None,
+                     filters: Optional[Dict] = None) -> Optional[pd.DataFrame]:
+        """Load from the columnar cache, building it from the CSVs in chunks on a miss."""
+        frame = self.data_cache.load(columns=columns, filters=filters)
+        if frame is not None:
+            return frame
+        # Workers share the cache directory: one builds it and the rest map the result.
+        with file_lock(self.data_cache.cache_dir / "cache.lock"):
+            frame = self.data_cache.load(columns=columns, filters=filters)
+            if frame is None:
+                chunks = (optimize_dtypes(merged) for merged in
+                          iter_merged(self.settings.DATA_DIR, chunksize=self.settings.INGEST_CHUNK_SIZE))
+                if self.data_cache.store_chunks(chunks):
+                    frame = self.data_cache.load(columns=columns, filters=filters)
+        return frame
+
     def _load_and_merge_data(self) -> pd.DataFrame:
-        """Load and merge all datasets into a single DataFrame."""
+        """Load and merge all datasets into a single DataFrame, for when there is no columnar cache."""
         try:
             employees = pd.read_csv(self.settings.DATA_DIR / "employees.csv")
             departments = pd.read_csv(self.settings.DATA_DIR / "departments.csv")
             financials = pd.read_csv(self.settings.DATA_DIR / "financials.csv")
-
-            # Merge datasets
-            emp_dept = pd.merge(employees, departments, left_on="department_id", right_on="id", suffixes=('_emp', '_dept'))
-            full_data = pd.merge(emp_dept, financials, left_on="department_id", right_on="department_id", how="left")
-            return full_data
+            return optimize_dtypes(merge_tables(employees, departments, financials))
         except Exception as e:
             logger.error(f"Error loading and merging data: {e}")
             raise
 
-    def _format_documents(self, data: pd.DataFrame) -> List[str]:
-        """Format the combined DataFrame into a list of document strings."""
+    def select_data(self, columns: Optional[List[str]] = None, department: Optional[Any] = None,
+                    year: Optional[Any] = None, quarter: Optional[Any] = None) -> pd.DataFrame:
+        """Project and filter the merged dataset, pushed down to the columnar cache when present.
+
+        Filters accept a single value or a list of values.
+        """
         try:
-            return [
-                f"Employee: {row['first_name']} {row['last_name']} ({row['position']}), "
-                f"Department: {row['name_dept']} (Location: {row['location']}), "
-                f"Salary: ${row['salary']:,}, Budget: ${row['budget']:,}, "
-                f"Financials: Q{row['quarter']} {row['year']}, Revenue: ${row['revenue']:,}, "
-                f"Expenses: ${row['expenses']:,}, Profit: ${row['profit']:,}"
-                for _, row in data.iterrows()
-            ]
+            filters = {
+                column: value
+                for column, value in (("name", department), ("year", year), ("quarter", quarter))
+                if value is not None
+            }
+            if self.data_cache is not None:
+                frame = self._cached_data(columns=columns, filters=filters)
+                if frame is not None:
+                    return frame
+
+            if self.dataframe is None:
+                self.dataframe = self._load_and_merge_data()
+            mask = pd.Series(True, index=self.dataframe.index)
+            for column, value in filters.items():
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                mask &= self.dataframe[column].isin(list(values))
+            frame = self.dataframe[mask]
+            return frame[columns] if columns else frame
         except Exception as e:
-            logger.error(f"Error formatting documents: {e}")
+            logger.error(f"Error selecting data: {e}")
             raise
 
-    def query(self, question: str) -> str:
-        """Query the unified DataFrame using Pandas AI."""
+    def query(self, question: str, query_type: Optional[str] = None,
+              filters: Optional[Dict[str, Any]] = None, conversation_id: Optional[Any] = None,
+              priority: int = 0, history: str = "", turn: Optional[int] = None, use_cache: bool = True) -> str:
+        """Answer a question from the local vector store and Ollama model.
+
+        `filters` restricts retrieval to documents whose metadata matches, e.g.
+        `{"department": "Sales", "year": 2023, "quarter": 2}`; without it the
+        departments and periods named in the question are used.
+        `conversation_id` and `priority` decide the generation's turn in the scheduler.
+        `history` is the conversation memory to include in the prompt; it is
+        left out when the conversation continues from Ollama's stored context.
+        `turn` is the number of messages stored in the conversation before this
+        question; a stored context is only continued when it was left at that
+        turn, and without a turn none is used.
+        With `use_cache=False` the structured planner and the answer caches are
+        skipped and the answer is not cached, so it is always generated.
+        """
         try:
-            result = self.pandas_ai.run(self.dataframe, question)
-            return self._format_response(result)
+            filters = normalize_filters(filters)
+            structured = None if filters or not use_cache else self._structured_answer(question)
+            if structured is not None:
+                self._forget_context(conversation_id)
+                return structured
+
+            query_type = query_type or self.classify_query(question)
+            cache_key, cached, query_vector = None, None, None
+            if use_cache:
+                cache_history = self._cache_history(question, history)
+                cache_key = self._response_cache_key(question, query_type, filters, cache_history)
+                cached, query_vector = self._lookup_cached_answer(question, cache_key, filters, cache_history)
+            if cached is not None:
+                self._forget_context(conversation_id)
+                return cached
+
+            context = self._reusable_context(conversation_id, turn, query_type)
+            system, prompt = self._build_prompt(question, query_type, filters, "" if context else history,
+                                                reserved=len(context or []))
+            with self.scheduler.slot(conversation_id, priority):
+                start = time.perf_counter()
+                kwargs = self._generation_kwargs(system, context, conversation_id, turn, query_type)
+                result = self.llm.invoke(prompt, **kwargs)
+            generation_time = time.perf_counter() - start
+            self.timings.record("generation", generation_time)
+            logger.info(f"Generated {query_type} answer in {generation_time * 1000:.0f} ms.")
+
+            response = self.format_response(result)
+            if use_cache:
+                self._store_answer(cache_key, query_vector, response)
+            return response
         except Exception as e:
             logger.error(f"Error querying data: {e}")
             raise
 
-    def _format_response(self, response: str) -> str:
+    def stream_query(self, question: str, query_type: Optional[str] = None,
+                     filters: Optional[Dict[str, Any]] = None, conversation_id: Optional[Any] = None,
+                     priority: int = 0, history: str = "", turn: Optional[int] = None) -> Iterator[str]:
+        """Stream answer tokens from the local Ollama model as they are generated.
+
+        Retrieval and admission to the scheduler happen before this returns, so
+        a full queue raises ComponentUnavailable here rather than mid-stream.
+        The slot is held until the returned iterator is exhausted or closed.
+        """
+        try:
+            filters = normalize_filters(filters)
+            structured = None if filters else self._structured_answer(question)
+            if structured is not None:
+                self._forget_context(conversation_id)
+                return iter([structured])
+
+            query_type = query_type or self.classify_query(question)
+            cache_history = self._cache_history(question, history)
+            cache_key = self._response_cache_key(question, query_type, filters, cache_history)
+            cached, query_vector = self._lookup_cached_answer(question, cache_key, filters, cache_history)
+            if cached is not None:
+                self._forget_context(conversation_id)
+                return iter([cached])
+
+            context = self._reusable_context(conversation_id, turn, query_type)
+            system, prompt = self._build_prompt(question, query_type, filters, "" if context else history,
+                                                reserved=len(context or []))
+            kwargs = self._generation_kwargs(system, context, conversation_id, turn, query_type)
+            lease = self.scheduler.acquire(conversation_id, priority)
+        except Exception as e:
+            logger.error(f"Error streaming query: {e}")
+            raise
+        tokens = self._stream_tokens(prompt, kwargs, cache_key, query_vector)
+        return LeasedIterator(tokens, lease)
+
+    def _stream_tokens(self, prompt: str, kwargs: Dict[str, Any], cache_key: str,
+                       query_vector: Optional[List[float]]) -> Iterator[str]:
+        tokens = []
+        try:
+            start = time.perf_counter()
+            for token in self.llm.stream(prompt, **kwargs):
+                if not tokens:
+                    self.timings.record("first_token", time.perf_counter() - start)
+                tokens.append(token)
+                yield token
+            self.timings.record("generation", time.perf_counter() - start)
+            self._store_answer(cache_key, query_vector, self.format_response("".join(tokens)))
+        except Exception as e:
+            logger.error(f"Error streaming query: {e}")
+            raise
+
+    def summarize(self, summary: str, transcript: str) -> str:
+        """Fold new conversation messages into a running summary, behind user-facing generations."""
+        prompt = self.settings.SUMMARY_PROMPT.format(summary=summary or "(none yet)", transcript=transcript)
+        with self.scheduler.slot(priority=5):
+            return self.llm.invoke(prompt, options={"num_predict": self.settings.MEMORY_SUMMARY_MAX_TOKENS})
+
+    def classify_query(self, question: str) -> str:
+        """Pick the prompt type that best matches the question."""
+        text = question.lower()
+        if re.search(r"\b(revenue|expenses?|profits?|financials?|quarter|q[1-4])\b", text):
+            return "financial"
+        if re.search(r"\b(employees?|salary|salaries|hired?|position|manager|who)\b", text):
+            return "employee"
+        if re.search(r"\b(departments?|budget|location|team)\b", text):
+            return "department"
+        return "general"
+
+    def _build_prompt(self, question: str, query_type: str, filters: Optional[Dict[str, List]] = None,
+                      history: str = "", reserved: int = 0) -> Tuple[str, str]:
+        """Retrieve context for the question and fill the prompt for its type.
+
+        Returns `(system, prompt)`: the template's static instructions, byte-identical
+        on every call so the server can reuse their evaluation, and the per-request rest.
+        `reserved` is the number of window tokens already taken by a reused context.
+        """
+        system, template = self._split_template(self.settings.get_prompt_for_type(query_type))
+        history = f"Conversation so far:\n{history}\n" if history else ""
+        budget = self._context_budget(system + template.format(context="", question=question, history=history),
+                                      reserved)
+        start = time.perf_counter()
+        context = self._retrieve_context(question, filters, budget)
+        retrieval_time = time.perf_counter() - start
+        self.timings.record("retrieval", retrieval_time)
+        logger.info(f"Retrieved context in {retrieval_time * 1000:.0f} ms.")
+        return system, template.format(context=context, question=question, history=history)
+
+    @staticmethod
+    def _split_template(template: str) -> Tuple[str, str]:
+        """Split a prompt template before the line holding its first placeholder."""
+        placeholder = template.find("{")
+        if placeholder == -1:
+            return template, ""
+        split = template.rfind("\n", 0, placeholder) + 1
+        return template[:split].rstrip(), template[split:]
+
+    def _reusable_context(self, conversation_id: Optional[Any], turn: Optional[int],
+                          query_type: str) -> Optional[List[int]]:
+        if self.context_store is None or conversation_id is None or turn is None:
+            return None
+        return self.context_store.get(conversation_id, turn, self._instructions_key(query_type))
+
+    def _instructions_key(self, query_type: str) -> str:
+        # A reused context carries the instructions of the turn that started it,
+        # so it only continues a turn whose template has the same ones.
+        system, _ = self._split_template(self.settings.get_prompt_for_type(query_type))
+        return hashlib.sha256(system.encode("utf-8")).hexdigest()[:16]
+
+    def _forget_context(self, conversation_id: Optional[Any]) -> None:
+        # A turn answered without the model is missing from its context, so the
+        # next turn has to start over from the full prompt and history.
+        if self.context_store is not None and conversation_id is not None:
+            self.context_store.discard(conversation_id)
+
+    def _generation_kwargs(self, system: str, context: Optional[List[int]], conversation_id: Optional[Any],
+                           turn: Optional[int], query_type: str) -> Dict[str, Any]:
+        # The returned context continues the turn after this question and its answer are stored.
+        kwargs = {"conversation_id": conversation_id, "next_turn": turn + 2 if turn is not None else None,
+                  "instructions": self._instructions_key(query_type)}
+        # A continued context already holds the instructions; sending them again
+        # would append a second copy.
+        if context:
+            return {**kwargs, "context": context}
+        return {**kwargs, "system": system}
+
+    def _context_budget(self, prompt: str, reserved: int = 0) -> int:
+        """Tokens left for retrieved context once the rest of the prompt and the answer are accounted for."""
+        settings = self.settings
+        budget = settings.LLM_NUM_CTX - settings.LLM_NUM_PREDICT - reserved - estimate_tokens(prompt)
+        if settings.CONTEXT_MAX_TOKENS is not None:
+            budget = min(budget, settings.CONTEXT_MAX_TOKENS)
+        return max(budget, 0)
+
+    def _structured_answer(self, question: str) -> Optional[str]:
+        """Answer pure aggregate questions from the DataFrame without the LLM."""
+        if self.planner is None:
+            return None
+        return self.planner.answer(question)
+
+    def is_follow_up(self, question: str) -> bool:
+        """Whether the question refers back to earlier turns rather than standing on its own."""
+        return re.search(FOLLOW_UP_PATTERN, question.lower()) is not None
+
+    def _cache_history(self, question: str, history: str) -> str:
+        """The part of the conversation an answer is cached under.
+
+        Only follow-ups depend on earlier turns, so only they are keyed on the
+        history (and kept out of the semantic cache). A standalone question
+        shares its cached answer across turns and conversations, even though
+        a freshly generated one would also have seen the history.
+        """
+        if not history or not self.is_follow_up(question):
+            return ""
+        with self._follow_up_lock:
+            self._follow_ups += 1
+        return history
+
+    def _lookup_cached_answer(self, question: str, cache_key: str, filters: Optional[Dict[str, List]] = None,
+                              history: str = "") -> Tuple[Optional[str], Optional[List[float]]]:
+        """Check the exact-match cache, then the semantic cache.
+
+        Returns the cached answer (or None) and the question embedding used for
+        the semantic lookup so a fresh answer can be stored under it.
+        """
+        if self.response_cache is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached, None
+
+        # Name and title lookups embed alike but have different answers, and the
+        # question vector knows nothing about explicit filters or earlier turns.
+        if self.semantic_cache is None or filters or history or self._is_keyword_query(question):
+            return None, None
+        query_vector = self.embeddings.embed_query(question)
+        cached = self.semantic_cache.lookup(query_vector, self.cache_version())
+        if cached is not None and self.response_cache is not None:
+            self.response_cache.put(cache_key, cached)
+        return cached, query_vector
+
+    def _store_answer(self, cache_key: str, query_vector: Optional[List[float]], response: str) -> None:
+        if self.response_cache is not None:
+            self.response_cache.put(cache_key, response)
+        if self.semantic_cache is not None and query_vector is not None:
+            self.semantic_cache.store(query_vector, response, self.cache_version())
+
+    def _response_cache_key(self, question: str, query_type: str,
+                            filters: Optional[Dict[str, List]] = None, history: str = "") -> str:
+        settings = self.settings
+        return ResponseCache.make_key(
+            question,
+            settings.LLM_MODEL,
+            settings.LLM_TEMPERATURE,
+            settings.LLM_TOP_P,
+            settings.LLM_TOP_K,
+            query_type,
+            self.current_data_version(),
+            filters,
+            history,
+        )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Counters for the answer caches."""
+        with self._follow_up_lock:
+            follow_ups = self._follow_ups
+        return {
+            "response_cache": self.response_cache.stats() if self.response_cache is not None else None,
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            # Follow-ups are cached per conversation history, so they rarely hit.
+            "follow_ups": follow_ups,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        """Cache counters plus retrieval and generation latency summaries."""
+        return {
+            **self.cache_stats(),
+            "latency": self.timings.summary(),
+            "scheduler": self.scheduler.stats(),
+            "concurrency": {"embeddings": self.embedding_limiter.stats()},
+            "embedding_cache": self.embeddings.cache.stats() if self.embeddings.cache is not None else None,
+            "ollama": self.ollama.stats(),
+            "context_reuse": self.context_store.stats() if self.context_store is not None else None,
+        }
+
+    def index_status(self) -> Dict[str, Any]:
+        """Cheap check that the vector index is loaded and not empty."""
+        if isinstance(self.vectorstore, NumpyVectorStore):
+            documents = len(self.vectorstore)
+        else:
+            documents = self.vectorstore._collection.count()
+        if not documents:
+            raise RuntimeError("vector index is empty")
+        status = {"backend": self.settings.VECTOR_BACKEND, "documents": documents}
+        if self.keyword_index is not None:
+            status["keyword_documents"] = len(self.keyword_index)
+        return status
+
+    def model_status(self, timeout: float = 2.0) -> Dict[str, Any]:
+        """Check that Ollama is reachable and lists the configured models, without generating."""
+        available = {model["name"] for model in self.ollama.tags(timeout=timeout).get("models", [])}
+        # Untagged model names are listed with an implicit ":latest".
+        missing = [
+            name for name in (self.settings.LLM_MODEL, self.settings.EMBEDDING_MODEL)
+            if name not in available and f"{name}:latest" not in available
+        ]
+        if missing:
+            raise RuntimeError(f"models not available in Ollama: {', '.join(missing)}")
+        return {"models": [self.settings.LLM_MODEL, self.settings.EMBEDDING_MODEL]}
+
+    def cache_version(self) -> str:
+        """Identify the dataset and LLM settings that cached answers were produced with."""
+        settings = self.settings
+        key = json.dumps([
+            self.current_data_version(),
+            settings.LLM_MODEL,
+            settings.LLM_TEMPERATURE,
+            settings.LLM_TOP_P,
+            settings.LLM_TOP_K,
+            settings.LLM_REPEAT_PENALTY,
+            settings.LLM_STOP_SEQUENCES,
+            settings.TOP_K,
+            settings.LLM_NUM_CTX,
+            settings.LLM_NUM_PREDICT,
+            settings.CHUNK_SIZE,
+            settings.CHUNK_OVERLAP,
+            settings.CONTEXT_MAX_TOKENS,
+            settings.SYSTEM_PROMPT,
+            settings.FINANCIAL_PROMPT,
+            settings.EMPLOYEE_PROMPT,
+            settings.DEPARTMENT_PROMPT,
+            settings.SUMMARY_PROMPT,
+        ])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _retrieve_context(self, question: str, filters: Optional[Dict[str, List]] = None,
+                          budget: Optional[int] = None) -> str:
+        """Retrieve the most relevant chunks and pack them into a context block of at most `budget` tokens."""
+        try:
+            filters = filters or self.infer_filters(question)
+            hits = self._retrieve_documents(question, filters)
+            if not hits and filters:
+                logger.info(f"No documents match {filters}; retrieving from the whole index.")
+                hits = self._retrieve_documents(question)
+            if budget is None:
+                budget = self._context_budget("")
+            documents = pack_context(hits, budget, max_overlap=self.settings.CHUNK_OVERLAP)
+            if len(documents) < len(hits):
+                logger.info(f"Packed {len(documents)} of {len(hits)} retrieved chunks into {budget} tokens.")
+            return "\n".join(documents)
+        except Exception as e:
+            logger.error(f"Error retrieving context: {e}")
+            raise
+
+    def infer_filters(self, question: str) -> Dict[str, List]:
+        """Partition filters for the departments, years and quarters a question names."""
+        if self.planner is None:
+            return {}
+        return normalize_filters(self.planner.scope(question))
+
+    def _retrieve_documents(self, question: str, filters: Optional[Dict[str, List]] = None
+                            ) -> List[Tuple[str, float, Optional[str]]]:
+        """Fuse vector and BM25 results, or use BM25 alone for keyword-dominated questions.
+
+        Returns up to TOP_K `(text, score, parent_id)` triples, best first,
+        scored by reciprocal rank; `parent_id` is set for chunks of a longer document.
+        """
+        k = self.settings.TOP_K
+        parents: Dict[str, Optional[str]] = {}
+        rankings = []
+        if self.keyword_index is not None:
+            keyword_hits = self.keyword_index.search(question, k=k * 2, filter=filters)
+            parents.update((text, parent_of(doc_id)) for doc_id, text, _ in keyword_hits)
+            rankings.append([text for _, text, _ in keyword_hits])
+            if keyword_hits and self._is_keyword_query(question):
+                logger.info("Keyword-dominated question; skipping the embedding call.")
+                return [(text, score, parents[text]) for text, score in fused_scores(rankings, k=self.settings.RRF_K)[:k]]
+
+        vector_hits = self._vector_search(question, k * 2 if rankings else k, filters)
+        parents.update((doc.page_content, doc.metadata.get("parent_id")) for doc in vector_hits)
+        rankings.insert(0, [doc.page_content for doc in vector_hits])
+        return [(text, score, parents.get(text)) for text, score in fused_scores(rankings, k=self.settings.RRF_K)[:k]]
+
+    def _vector_search(self, question: str, k: int, filters: Optional[Dict[str, List]] = None) -> List[Any]:
+        """Similarity search restricted to the partitions matching `filters`."""
+        if not filters:
+            return self.vectorstore.similarity_search(question, k=k)
+        if isinstance(self.vectorstore, NumpyVectorStore):
+            return self.vectorstore.similarity_search(question, k=k, filter=filters)
+        return self.vectorstore.similarity_search(question, k=k, filter=self._chroma_filter(filters))
+
+    @staticmethod
+    def _chroma_filter(filters: Dict[str, List]) -> Dict[str, Any]:
+        clauses = [
+            {key: values[0]} if len(values) == 1 else {key: {"$in": values}}
+            for key, values in filters.items()
+        ]
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def _is_keyword_query(self, question: str) -> bool:
+        return self.keyword_index is not None and self.keyword_index.is_keyword_query(
+            question, min_ratio=self.settings.KEYWORD_ONLY_RATIO
+        )
+
+    def format_response(self, response: str) -> str:
         """Format the response for presentation."""
         try:
             response = re.sub(r'\$(\d+)', lambda m: f"${int(m.group(1)):,}", response)
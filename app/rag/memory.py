@@ -0,0 +1,77 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Set
+from app.utils.logger import logger
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+
+def format_transcript(messages: List[Dict]) -> str:
+    return "\n".join(
+        f"{ROLE_LABELS.get(message['role'], message['role'].title())}: {message['content']}"
+        for message in messages
+    )
+
+
+class ConversationMemory:
+    """Bounded prompt history: a rolling summary plus the last few turns verbatim.
+
+    After each reply, `schedule_update()` folds the messages that have left the
+    verbatim window into the stored summary on a background thread, so the
+    history passed to the prompt stays the same size however long the
+    conversation runs.
+    """
+
+    def __init__(self, db, summarize: Callable[[str, str], str], turns: int = 4, batch_size: int = 20):
+        self.db = db
+        self.summarize = summarize
+        self.recent = max(0, turns) * 2
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+        self._pending: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def history(self, conversation_id: int) -> str:
+        """Summary and recent turns formatted for the prompt; empty for a new conversation."""
+        try:
+            memory = self.db.get_memory(conversation_id, self.recent)
+            parts = []
+            if memory["summary"]:
+                parts.append(f"Summary of earlier conversation: {memory['summary']}")
+            if memory["recent"]:
+                parts.append(format_transcript(memory["recent"]))
+            return "\n".join(parts)
+        except Exception as e:
+            logger.error(f"Error loading conversation memory: {e}")
+            return ""
+
+    def schedule_update(self, conversation_id: int) -> None:
+        """Fold older turns into the summary in the background; at most one update per conversation is queued."""
+        with self._lock:
+            if conversation_id in self._pending:
+                return
+            self._pending.add(conversation_id)
+        self._executor.submit(self._update, conversation_id)
+
+    def update(self, conversation_id: int) -> bool:
+        """Fold one batch of messages into the summary; returns whether anything changed."""
+        messages = self.db.get_unsummarized(conversation_id, self.recent, limit=self.batch_size)
+        if not messages:
+            return False
+        memory = self.db.get_memory(conversation_id, 0)
+        summary = self.summarize(memory["summary"] or "", format_transcript(messages))
+        self.db.update_summary(conversation_id, summary.strip(), messages[-1]["id"])
+        return True
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _update(self, conversation_id: int) -> None:
+        try:
+            with self._lock:
+                self._pending.discard(conversation_id)
+            # A long backlog is folded one batch at a time.
+            while self.update(conversation_id):
+                pass
+        except Exception as e:
+            logger.error(f"Error updating summary for conversation {conversation_id}: {e}")
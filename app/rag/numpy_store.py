@@ -0,0 +1,251 @@
+import json
+import threading
+import uuid
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from app.rag.partitions import PartitionIndex, normalize_filters
+from app.utils.logger import logger
+
+QUANTIZATIONS = ("float32", "float16", "int8")
+
+
+class NumpyVectorStore(VectorStore):
+    """In-process vector store keeping every embedding in one contiguous NumPy matrix.
+
+    Vectors are L2-normalized on insert so a dot product is cosine similarity,
+    and are optionally quantized to float16 or to int8 with a per-vector scale.
+    Top-k is one batched matrix product followed by `argpartition`. A `filter`
+    on metadata restricts scoring to the rows of the matching partitions.
+    `save()` writes `.npy` files that are memory-mapped on the next load.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    SCALES_FILE = "scales.npy"
+    DOCS_FILE = "docs.json"
+    # Rows scored per block, bounding the temporary float32 copy of the matrix.
+    BLOCK_ROWS = 65536
+
+    def __init__(self, embedding: Embeddings, persist_directory: Optional[Path] = None,
+                 quantization: str = "float32"):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization '{quantization}', expected one of {QUANTIZATIONS}")
+        self._embedding = embedding
+        self.persist_directory = Path(persist_directory) if persist_directory else None
+        self.quantization = quantization
+        self._dtype = np.dtype(quantization)
+        self._lock = threading.RLock()
+
+        self._matrix = np.empty((0, 0), dtype=self._dtype)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._positions: Dict[str, int] = {}
+        self._partitions = PartitionIndex()
+        self._pending: List[Tuple[np.ndarray, float]] = []
+        self._pending_deletes: List[int] = []
+
+        if self.persist_directory is not None and (self.persist_directory / self.DOCS_FILE).exists():
+            self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._positions)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """Embed and upsert texts."""
+        texts = list(texts)
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas=metadatas, ids=ids)
+
+    def add_vectors(self, vectors: List[List[float]], texts: List[str],
+                    metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None) -> List[str]:
+        """Upsert precomputed vectors; an existing ID is replaced."""
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        quantized, scales = self._quantize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            self.delete(ids)
+            for row, scale, doc_id, text, metadata in zip(quantized, scales, ids, texts, metadatas):
+                self._positions[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._texts.append(text)
+                self._metadatas.append(metadata or {})
+                self._partitions.add(len(self._ids) - 1, metadata)
+                self._pending.append((row, scale))
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Tombstone documents by ID; space is reclaimed on `save()`."""
+        with self._lock:
+            for doc_id in ids or []:
+                position = self._positions.pop(doc_id, None)
+                if position is None:
+                    continue
+                if position < len(self._alive):
+                    self._alive[position] = False
+                else:
+                    self._pending_deletes.append(position)
+        return True
+
+    def get(self, include: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """Chroma-compatible listing of the stored IDs."""
+        with self._lock:
+            return {"ids": list(self._positions)}
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        vector = self._embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(vector, k=k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.batch_search([embedding], k=k, filter=filter)[0]
+
+    def batch_search(self, embeddings: List[List[float]], k: int = 4,
+                     filter: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        """Score several queries against the matrix, or the filtered rows of it, in one matrix product."""
+        with self._lock:
+            self._consolidate()
+            if not self._positions:
+                return [[] for _ in embeddings]
+
+            rows = None
+            filters = normalize_filters(filter)
+            if filters:
+                rows = self._partitions.rows(filters)
+                rows = rows[self._alive[rows]]
+                if not len(rows):
+                    return [[] for _ in embeddings]
+
+            queries = np.asarray(embeddings, dtype=np.float32)
+            queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+            scores = self._score(queries, rows)
+            if rows is None:
+                scores[:, ~self._alive] = -np.inf
+                rows = np.arange(len(self._ids))
+                k = min(k, len(self._positions))
+            else:
+                k = min(k, len(rows))
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            results = []
+            for row, candidates in zip(scores, top):
+                ordered = candidates[np.argsort(-row[candidates])]
+                results.append([
+                    (Document(page_content=self._texts[rows[i]], metadata=self._metadatas[rows[i]]),
+                     float(row[i]))
+                    for i in ordered
+                ])
+            return results
+
+    def _score(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine scores of the queries against all rows, or the given ones, block by block."""
+        count = len(self._ids) if rows is None else len(rows)
+        scores = np.empty((len(queries), count), dtype=np.float32)
+        for start in range(0, count, self.BLOCK_ROWS):
+            if rows is None:
+                block = self._matrix[start:start + self.BLOCK_ROWS]
+            else:
+                block = self._matrix[rows[start:start + self.BLOCK_ROWS]]
+            scores[:, start:start + len(block)] = queries @ block.astype(np.float32, copy=False).T
+        if self.quantization == "int8":
+            scores *= self._scales if rows is None else self._scales[rows]
+        return scores
+
+    def save(self) -> None:
+        """Compact away deleted rows and write the index for memory-mapped loading."""
+        if self.persist_directory is None:
+            return
+        with self._lock:
+            self._consolidate()
+            keep = np.flatnonzero(self._alive)
+            self._matrix = np.ascontiguousarray(self._matrix[keep])
+            self._scales = self._scales[keep]
+            self._alive = np.ones(len(keep), dtype=bool)
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+            self._rebuild_partitions()
+
+            self.persist_directory.mkdir(parents=True, exist_ok=True)
+            for name, array in ((self.VECTORS_FILE, self._matrix), (self.SCALES_FILE, self._scales)):
+                tmp_path = self.persist_directory / f"{name}.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, array)
+                tmp_path.replace(self.persist_directory / name)
+            tmp_path = self.persist_directory / f"{self.DOCS_FILE}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "quantization": self.quantization,
+                    "ids": self._ids,
+                    "texts": self._texts,
+                    "metadatas": self._metadatas,
+                }, f)
+            tmp_path.replace(self.persist_directory / self.DOCS_FILE)
+        logger.info(f"Saved {len(self._ids)} vectors to {self.persist_directory}.")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   *, ids: Optional[List[str]] = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def _load(self) -> None:
+        with open(self.persist_directory / self.DOCS_FILE, "r", encoding="utf-8") as f:
+            docs = json.load(f)
+        if docs.get("quantization") != self.quantization:
+            logger.info("Persisted vectors use a different quantization; starting an empty index.")
+            return
+        self._matrix = np.load(self.persist_directory / self.VECTORS_FILE, mmap_mode="r")
+        self._scales = np.load(self.persist_directory / self.SCALES_FILE)
+        self._ids = docs["ids"]
+        self._texts = docs["texts"]
+        self._metadatas = docs["metadatas"]
+        self._alive = np.ones(len(self._ids), dtype=bool)
+        self._positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._rebuild_partitions()
+
+    def _rebuild_partitions(self) -> None:
+        self._partitions = PartitionIndex()
+        for position, metadata in enumerate(self._metadatas):
+            self._partitions.add(position, metadata)
+
+    def _consolidate(self) -> None:
+        """Append pending rows to the matrix in a single copy."""
+        if not self._pending:
+            return
+        rows = np.vstack([row for row, _ in self._pending])
+        scales = np.asarray([scale for _, scale in self._pending], dtype=np.float32)
+        self._matrix = rows if self._matrix.size == 0 else np.vstack([self._matrix, rows])
+        self._scales = np.concatenate([self._scales, scales])
+        self._alive = np.concatenate([self._alive, np.ones(len(rows), dtype=bool)])
+        self._alive[self._pending_deletes] = False
+        self._pending = []
+        self._pending_deletes = []
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        if self.quantization != "int8":
+            return vectors.astype(self._dtype), np.ones(len(vectors), dtype=np.float32)
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+        quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
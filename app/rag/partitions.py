@@ -0,0 +1,81 @@
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+PARTITION_KEYS = ("department_id", "department", "year", "quarter", "kind")
+INTEGER_KEYS = ("department_id", "year", "quarter")
+
+
+def _coerce(key: str, value: Any) -> Any:
+    """Cast a filter value to the type stored in document metadata."""
+    if key not in INTEGER_KEYS:
+        return str(value)
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid value {value!r} for filter '{key}'")
+    if isinstance(value, str):
+        text = value.strip()
+        # Quarters are also written the way questions name them, e.g. "Q3".
+        if key == "quarter" and text[:1] in ("q", "Q"):
+            text = text[1:]
+        try:
+            return int(text)
+        except ValueError:
+            raise ValueError(f"Invalid value {value!r} for filter '{key}'") from None
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"Invalid value {value!r} for filter '{key}'")
+    return int(value)
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Validate retrieval filters and turn every value into a list of accepted values.
+
+    Keys with a None or empty value are dropped. Years, quarters and department
+    ids are cast to int, so `{"year": "2023"}` matches the stored metadata.
+    Unknown keys and values that are not whole numbers raise ValueError.
+    """
+    normalized = {}
+    for key, value in (filters or {}).items():
+        if key not in PARTITION_KEYS:
+            raise ValueError(f"Unknown filter '{key}', expected one of {PARTITION_KEYS}")
+        if value is None:
+            continue
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        values = {_coerce(key, item) for item in values if item is not None}
+        if values:
+            normalized[key] = sorted(values)
+    return normalized
+
+
+class PartitionIndex:
+    """Inverted index from metadata values to document positions.
+
+    Filtering intersects the position lists of the requested values, so the
+    similarity search only has to score the rows inside the matching partitions.
+    """
+
+    def __init__(self):
+        self._positions: Dict[str, Dict[Any, List[int]]] = {}
+        self._frozen: Dict[tuple, np.ndarray] = {}
+
+    def add(self, position: int, metadata: Optional[Dict[str, Any]]) -> None:
+        for key in PARTITION_KEYS:
+            if metadata and metadata.get(key) is not None:
+                self._positions.setdefault(key, {}).setdefault(metadata[key], []).append(position)
+        self._frozen.clear()
+
+    def rows(self, filters: Dict[str, List[Any]]) -> np.ndarray:
+        """Sorted positions of the documents matching every filter."""
+        result = None
+        for key, values in filters.items():
+            rows = np.unique(np.concatenate([self._value_rows(key, value) for value in values]))
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return result if result is not None else np.empty(0, dtype=np.int64)
+
+    def _value_rows(self, key: str, value: Any) -> np.ndarray:
+        cached = self._frozen.get((key, value))
+        if cached is None:
+            positions = self._positions.get(key, {}).get(value, [])
+            cached = np.asarray(positions, dtype=np.int64)
+            self._frozen[(key, value)] = cached
+        return cached
@@ -0,0 +1,338 @@
+import re
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.logger import logger
+
+METRIC_PATTERNS = {
+    'headcount': r"\b(headcount|head count|how many (employees|people|staff)|number of (employees|people|staff)|employee count|staff count)\b",
+    'salary': r"\b(salary|salaries|payroll|compensation|pay)\b",
+    'budget': r"\bbudgets?\b",
+    'revenue': r"\b(revenue|revenues|income|turnover)\b",
+    'expenses': r"\b(expenses?|costs?|spend|spending)\b",
+    'profit': r"\b(profits?)\b",
+}
+
+AGGREGATE_PATTERNS = {
+    'mean': r"\b(average|avg|mean)\b",
+    'max': r"\b(highest|maximum|max|largest|most|top)\b",
+    'min': r"\b(lowest|minimum|min|smallest|least)\b",
+    'sum': r"\b(total|sum|combined|overall|aggregate)\b",
+    'count': r"\b(how many|number of|count)\b",
+}
+
+GROUP_PATTERNS = {
+    'department': r"\b(per|by|each|every|for all|across) departments?\b",
+    'position': r"\b(per|by|each|every) (position|role|title)s?\b",
+    'year': r"\b(per|by|each|every) year\b",
+    'quarter': r"\b(per|by|each|every) quarter\b",
+}
+
+# Comparisons, changes, ratios and "which/who" questions need more than one
+# aggregate (or a name), so they are left to retrieval and generation.
+UNSUPPORTED_PATTERN = (
+    r"\b(than|compared?|comparison|versus|vs|change[sd]?|growth|grow|grew|increased?|decreased?|"
+    r"declined?|trend|margins?|percent|percentage|ratio|rate|share|over budget|under budget|"
+    r"within budget|which)\b"
+)
+
+QUARTER_WORDS = {'first': 1, '1st': 1, 'second': 2, '2nd': 2, 'third': 3, '3rd': 3, 'fourth': 4, '4th': 4}
+
+# Which table each metric lives in and the groupings it supports.
+METRIC_TABLES = {
+    'headcount': ('employees', ('department', 'position')),
+    'salary': ('employees', ('department', 'position')),
+    'budget': ('departments', ('department',)),
+    'revenue': ('financials', ('department', 'year', 'quarter')),
+    'expenses': ('financials', ('department', 'year', 'quarter')),
+    'profit': ('financials', ('department', 'year', 'quarter')),
+}
+
+MONEY_METRICS = {'salary', 'budget', 'revenue', 'expenses', 'profit'}
+
+
+class StructuredQueryPlanner:
+    """Answer aggregate questions directly from the source tables.
+
+    Questions that name a metric (headcount, salary, budget, revenue, expenses,
+    profit) together with an explicit aggregate or grouping, optionally narrowed
+    by department, year or quarter, or that ask for one department's revenue,
+    expenses or profit in a period, are computed with NumPy over column arrays
+    prepared once up front. Anything else, including comparisons, changes and
+    ratios, returns None and falls through to retrieval and generation.
+    """
+
+    EMPLOYEE_COLUMNS = ['department_id', 'first_name', 'last_name', 'position', 'salary']
+    DEPARTMENT_COLUMNS = ['id', 'name', 'budget']
+    FINANCIAL_COLUMNS = ['department_id', 'year', 'quarter', 'revenue', 'expenses', 'profit']
+    # The same columns as named in the merged dataset, plus each table's id.
+    MERGED_COLUMNS = ['id_emp', *EMPLOYEE_COLUMNS, 'id_dept', 'name', 'budget', 'id', *FINANCIAL_COLUMNS[1:]]
+
+    def __init__(self, employees: pd.DataFrame, departments: pd.DataFrame, financials: pd.DataFrame):
+        # Rows are dropped where their department is unknown, as the join used for ingestion does.
+        employees = employees[employees['department_id'].isin(departments['id'])]
+        financials = financials[financials['department_id'].isin(departments['id'])]
+
+        self.department_names = np.asarray(sorted(departments['name'].astype(str).unique()))
+        self._department_lookup = {name.lower(): code for code, name in enumerate(self.department_names)}
+        department_codes = pd.Series(self._department_codes(departments['name']), index=departments['id'])
+        positions = pd.Categorical(employees['position'].astype(str))
+        self.positions = np.asarray(positions.categories)
+        self._position_lookup = {name.lower(): code for code, name in enumerate(self.positions)}
+        # Generic role nouns ("engineers", "managers") match every title ending in them.
+        self._role_lookup: Dict[str, List[int]] = {}
+        for code, name in enumerate(self.positions):
+            self._role_lookup.setdefault(name.lower().split()[-1], []).append(code)
+
+        first_names = pd.Categorical(employees['first_name'].astype(str))
+        last_names = pd.Categorical(employees['last_name'].astype(str))
+        self._person_names = {name.lower() for name in first_names.categories} | {
+            name.lower() for name in last_names.categories
+        }
+
+        self._tables: Dict[str, Dict[str, Any]] = {
+            'employees': {
+                'department': employees['department_id'].map(department_codes).to_numpy(dtype=np.int64),
+                'position': positions.codes.astype(np.int64),
+                'salary': employees['salary'].to_numpy(dtype=np.float64),
+                'first_name': first_names,
+                'last_name': last_names,
+            },
+            'departments': {
+                'department': department_codes.to_numpy(dtype=np.int64),
+                'budget': departments['budget'].to_numpy(dtype=np.float64),
+            },
+            'financials': {
+                'department': financials['department_id'].map(department_codes).to_numpy(dtype=np.int64),
+                'year': financials['year'].to_numpy(dtype=np.int64),
+                'quarter': financials['quarter'].to_numpy(dtype=np.int64),
+                'revenue': financials['revenue'].to_numpy(dtype=np.float64),
+                'expenses': financials['expenses'].to_numpy(dtype=np.float64),
+                'profit': financials['profit'].to_numpy(dtype=np.float64),
+            },
+        }
+
+    @classmethod
+    def from_csv(cls, data_dir: Path) -> "StructuredQueryPlanner":
+        """Build from the source CSVs, reading only the columns the planner aggregates.
+
+        Text columns are parsed straight into categoricals, so memory grows with
+        the distinct names and titles rather than with a merged copy of the data.
+        """
+        text_columns = {'first_name': 'category', 'last_name': 'category', 'position': 'category'}
+        return cls(
+            pd.read_csv(data_dir / "employees.csv", usecols=cls.EMPLOYEE_COLUMNS, dtype=text_columns),
+            pd.read_csv(data_dir / "departments.csv", usecols=cls.DEPARTMENT_COLUMNS),
+            pd.read_csv(data_dir / "financials.csv", usecols=cls.FINANCIAL_COLUMNS),
+        )
+
+    @classmethod
+    def from_merged(cls, data: pd.DataFrame) -> "StructuredQueryPlanner":
+        """Build from the merged dataset, such as the memory-mapped columnar cache.
+
+        The merge repeats each employee once per quarter and each department once
+        per employee, so every table is recovered by keeping the first row per id.
+        As in the indexed documents, departments without employees are left out.
+        """
+        employees = data.loc[~data['id_emp'].duplicated(), cls.EMPLOYEE_COLUMNS]
+        departments = data.loc[~data['id_dept'].duplicated(), ['id_dept', 'name', 'budget']]
+        financials = data[data['id'].notna()]
+        financials = financials.loc[~financials['id'].duplicated(), cls.FINANCIAL_COLUMNS]
+        return cls(employees, departments.rename(columns={'id_dept': 'id'}), financials)
+
+    def _department_codes(self, names: pd.Series) -> np.ndarray:
+        return np.searchsorted(self.department_names, names.astype(str).to_numpy())
+
+    def parse(self, question: str) -> Optional[Dict]:
+        """Turn a question into a plan, or None if it is not a recognised aggregate."""
+        text = question.lower()
+        if re.search(UNSUPPORTED_PATTERN, text):
+            return None
+
+        # Questions about a specific person need the retrieved context.
+        words = set(re.findall(r"[a-z']+", text))
+        if words & self._person_names:
+            return None
+
+        positions = [code for name, code in self._position_lookup.items()
+                     if re.search(rf"\b{re.escape(name)}s?\b", text)]
+        if not positions:
+            for role, codes in self._role_lookup.items():
+                if re.search(rf"\b{re.escape(role)}s?\b", text):
+                    positions.extend(codes)
+
+        metric = next((name for name, pattern in METRIC_PATTERNS.items() if re.search(pattern, text)), None)
+        if metric is None and positions and re.search(r"\bhow many\b", text):
+            metric = 'headcount'
+        if metric is None:
+            return None
+
+        aggregate = next((name for name, pattern in AGGREGATE_PATTERNS.items() if re.search(pattern, text)), None)
+        group_by = next((name for name, pattern in GROUP_PATTERNS.items() if re.search(pattern, text)), None)
+
+        departments, years, quarters = self._match_scope(text)
+
+        table, groupings = METRIC_TABLES[metric]
+        if group_by is not None and group_by not in groupings:
+            return None
+        if table != 'financials' and (years or quarters):
+            return None
+        if table != 'employees' and positions:
+            return None
+
+        if metric == 'headcount':
+            aggregate = 'count'
+        elif aggregate == 'count':
+            return None
+        elif aggregate is None:
+            # Without an aggregate word the question could be anything from a
+            # lookup to a comparison, so only a grouping implies a total, and
+            # one department's figure for a period is read as a single value.
+            if group_by is not None:
+                aggregate = 'sum'
+            elif table == 'financials' and len(set(departments)) == 1 and (years or quarters):
+                aggregate = 'value'
+            else:
+                return None
+
+        who = re.search(r"\bwho\b", text) is not None
+        # Only the highest or lowest salary has a person to name.
+        if who and not (metric == 'salary' and aggregate in ('max', 'min')):
+            return None
+
+        return {
+            'metric': metric,
+            'table': table,
+            'aggregate': aggregate,
+            'group_by': group_by,
+            'who': who,
+            'filters': {
+                'department': sorted(set(departments)),
+                'position': sorted(set(positions)),
+                'year': sorted(set(years)),
+                'quarter': sorted(set(quarters)),
+            },
+        }
+
+    def scope(self, question: str) -> Dict[str, List]:
+        """Departments, years and quarters a question mentions, as retrieval filters."""
+        departments, years, quarters = self._match_scope(question.lower())
+        return {
+            'department': sorted({str(self.department_names[code]) for code in departments}),
+            'year': sorted(set(years)),
+            'quarter': sorted(set(quarters)),
+        }
+
+    def _match_scope(self, text: str) -> Tuple[List[int], List[int], List[int]]:
+        departments = [code for name, code in self._department_lookup.items()
+                       if re.search(rf"\b{re.escape(name)}\b", text)]
+        years = [int(year) for year in re.findall(r"\b((?:19|20)\d{2})\b", text)]
+        quarters = [int(q) for q in re.findall(r"\bq([1-4])\b", text)]
+        quarters += [QUARTER_WORDS[word] for word in re.findall(r"\b(first|1st|second|2nd|third|3rd|fourth|4th) quarter\b", text)]
+        return departments, years, quarters
+
+    def answer(self, question: str) -> Optional[str]:
+        """Compute the answer to an aggregate question, or None to fall through."""
+        try:
+            plan = self.parse(question)
+            if plan is None:
+                return None
+            result = self.execute(plan)
+            if result is not None:
+                logger.info(f"Answered structured query: {plan['aggregate']} {plan['metric']}")
+            return result
+        except Exception as e:
+            logger.error(f"Error answering structured query: {e}")
+            return None
+
+    def execute(self, plan: Dict) -> Optional[str]:
+        columns = self._tables[plan['table']]
+        mask = np.ones(len(columns['department']), dtype=bool)
+        for field, values in plan['filters'].items():
+            if values:
+                mask &= np.isin(columns[field], values)
+        if not mask.any():
+            return "No matching records were found for that question."
+
+        metric, aggregate = plan['metric'], plan['aggregate']
+        # A lookup is only answered when the filters leave exactly one row,
+        # e.g. not a quarter named without its year across several years.
+        if aggregate == 'value' and mask.sum() != 1:
+            return None
+        values = np.ones(mask.sum()) if metric == 'headcount' else columns[metric][mask]
+
+        if plan['who']:
+            index = np.argmax(values) if aggregate == 'max' else np.argmin(values)
+            name = f"{columns['first_name'][mask][index]} {columns['last_name'][mask][index]}"
+            return f"{name} has the {'highest' if aggregate == 'max' else 'lowest'} salary: {self._format(values[index], metric, 'max')}"
+
+        label = self._describe(plan)
+        if plan['group_by'] is None:
+            return f"{label}: {self._format(self._reduce(values, aggregate), metric, aggregate)}"
+
+        keys = columns[plan['group_by']][mask]
+        groups, inverse = np.unique(keys, return_inverse=True)
+        reduced = self._reduce_groups(values, inverse, len(groups), aggregate)
+        lines = [f"{label} by {plan['group_by']}:"]
+        for key, value in zip(groups, reduced):
+            lines.append(f"- {self._group_label(plan['group_by'], key)}: {self._format(value, metric, aggregate)}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _reduce(values: np.ndarray, aggregate: str) -> float:
+        if aggregate in ('sum', 'count', 'value'):
+            return float(values.sum())
+        if aggregate == 'mean':
+            return float(values.mean())
+        if aggregate == 'max':
+            return float(values.max())
+        return float(values.min())
+
+    @staticmethod
+    def _reduce_groups(values: np.ndarray, inverse: np.ndarray, size: int, aggregate: str) -> np.ndarray:
+        if aggregate in ('sum', 'count'):
+            return np.bincount(inverse, weights=values, minlength=size)
+        if aggregate == 'mean':
+            return np.bincount(inverse, weights=values, minlength=size) / np.bincount(inverse, minlength=size)
+        if aggregate == 'max':
+            result = np.full(size, -np.inf)
+            np.maximum.at(result, inverse, values)
+            return result
+        result = np.full(size, np.inf)
+        np.minimum.at(result, inverse, values)
+        return result
+
+    def _group_label(self, group_by: str, key) -> str:
+        if group_by == 'department':
+            return str(self.department_names[key])
+        if group_by == 'position':
+            return str(self.positions[key])
+        if group_by == 'quarter':
+            return f"Q{key}"
+        return str(key)
+
+    def _describe(self, plan: Dict) -> str:
+        names = {'sum': 'Total', 'mean': 'Average', 'max': 'Highest', 'min': 'Lowest', 'count': 'Number of'}
+        metric = 'employees' if plan['metric'] == 'headcount' else plan['metric']
+        label = f"{names[plan['aggregate']]} {metric}" if plan['aggregate'] in names else metric.capitalize()
+
+        filters = plan['filters']
+        scope: List[str] = []
+        if filters['department']:
+            scope.append(", ".join(self.department_names[code] for code in filters['department']))
+        if filters['position']:
+            scope.append(", ".join(self.positions[code] for code in filters['position']))
+        if filters['quarter']:
+            scope.append(", ".join(f"Q{q}" for q in filters['quarter']))
+        if filters['year']:
+            scope.append(", ".join(str(y) for y in filters['year']))
+        return f"{label} ({' '.join(scope)})" if scope else label
+
+    @staticmethod
+    def _format(value: float, metric: str, aggregate: str) -> str:
+        if metric not in MONEY_METRICS:
+            return f"{value:,.0f}"
+        if aggregate == 'mean':
+            return f"${value:,.2f}"
+        return f"${value:,.0f}"
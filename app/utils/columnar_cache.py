@@ -0,0 +1,162 @@
+import json
+import os
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from app.utils.data_processor import DATA_TABLES, dataset_fingerprint, file_digest
+from app.utils.logger import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+
+class ColumnarCache:
+    """Arrow IPC cache of the merged dataset, memory-mapped on load.
+
+    The cache is keyed on the mtime, size and content hash of each source CSV.
+    Loading maps the file instead of reading it, and the resulting DataFrame
+    keeps its columns in Arrow buffers backed by that mapping, so worker
+    processes on the same host share the pages. Column projection and
+    equality/`isin` filters are pushed down to the Arrow scanner.
+    """
+
+    CACHE_FILE = "merged.arrow"
+    KEY_FILE = "merged.json"
+
+    def __init__(self, cache_dir: Path, data_dir: Path, tables: Iterable[str] = DATA_TABLES):
+        self.cache_dir = Path(cache_dir)
+        self.data_dir = Path(data_dir)
+        self.tables = tuple(tables)
+        self.path = self.cache_dir / self.CACHE_FILE
+        self.key_path = self.cache_dir / self.KEY_FILE
+        self._sources: Optional[Dict[str, Dict]] = None
+
+    @property
+    def available(self) -> bool:
+        return pa is not None
+
+    def fingerprint(self) -> str:
+        """Dataset version derived from the source hashes, without rehashing unchanged files."""
+        sources = self._current_sources()
+        return dataset_fingerprint(
+            self.data_dir, self.tables, digests={table: info["sha256"] for table, info in sources.items()}
+        )
+
+    def is_fresh(self) -> bool:
+        """Whether the cached table was built from the current source files."""
+        if not self.path.exists() or not self.key_path.exists():
+            return False
+        try:
+            with open(self.key_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return False
+        current = self._current_sources()
+        return all(stored.get(table, {}).get("sha256") == info["sha256"] for table, info in current.items())
+
+    def load(self, columns: Optional[List[str]] = None, filters: Optional[Dict] = None) -> Optional[pd.DataFrame]:
+        """Memory-map the cached table, or return None if it is missing or stale."""
+        if not self.available or not self.is_fresh():
+            return None
+        try:
+            if filters:
+                dataset = ds.dataset(
+                    str(self.path), format="ipc", filesystem=fs.LocalFileSystem(use_mmap=True)
+                )
+                table = dataset.to_table(columns=columns, filter=self._filter_expression(filters))
+            else:
+                source = pa.memory_map(str(self.path), "r")
+                table = pa.ipc.open_file(source).read_all()
+                if columns:
+                    table = table.select(columns)
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        except Exception as e:
+            logger.warning(f"Could not load columnar cache {self.path}: {e}")
+            return None
+
+    def store(self, frame: pd.DataFrame) -> bool:
+        """Write the merged table and the source key it was built from."""
+        return self.store_chunks([frame])
+
+    def store_chunks(self, frames: Iterable[pd.DataFrame]) -> bool:
+        """Write the merged table one piece at a time, so only one chunk is ever in memory.
+
+        Categorical columns are written as plain strings, since every chunk has
+        its own categories. Returns whether the cache was written.
+        """
+        if not self.available:
+            return False
+        tmp_path = self.path.with_suffix(".tmp")
+        writer = None
+        rows = 0
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Key on the sources as they were before reading, so an edit made
+            # during the build leaves the cache stale rather than mislabelled.
+            sources = self._current_sources()
+            for frame in frames:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    schema = pa.schema([
+                        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+                        for field in table.schema
+                    ])
+                    # Uncompressed IPC can be memory-mapped without decoding.
+                    writer = pa.ipc.new_file(str(tmp_path), schema)
+                writer.write_table(table.cast(schema))
+                rows += len(frame)
+            if writer is None:
+                return False
+            writer.close()
+            writer = None
+            tmp_path.replace(self.path)
+            with open(self.key_path, "w", encoding="utf-8") as f:
+                json.dump(sources, f)
+            logger.info(f"Wrote columnar cache with {rows} rows to {self.path}.")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not write columnar cache {self.path}: {e}")
+            return False
+        finally:
+            if writer is not None:
+                writer.close()
+            tmp_path.unlink(missing_ok=True)
+
+    def _current_sources(self) -> Dict[str, Dict]:
+        """Stat each source file, reusing the known hash when mtime and size are unchanged."""
+        known = self._sources
+        if known is None:
+            known = {}
+            if self.key_path.exists():
+                try:
+                    with open(self.key_path, "r", encoding="utf-8") as f:
+                        known = json.load(f)
+                except (OSError, ValueError):
+                    known = {}
+
+        sources = {}
+        for table in self.tables:
+            stat = os.stat(self.data_dir / f"{table}.csv")
+            previous = known.get(table, {})
+            if previous.get("mtime_ns") == stat.st_mtime_ns and previous.get("size") == stat.st_size:
+                sha256 = previous["sha256"]
+            else:
+                sha256 = file_digest(self.data_dir / f"{table}.csv")
+            sources[table] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}
+        self._sources = sources
+        return sources
+
+    @staticmethod
+    def _filter_expression(filters: Dict):
+        expression = None
+        for column, value in filters.items():
+            if isinstance(value, (list, tuple, set)):
+                condition = ds.field(column).isin(list(value))
+            else:
+                condition = ds.field(column) == value
+            expression = condition if expression is None else expression & condition
+        return expression
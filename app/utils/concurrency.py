@@ -0,0 +1,75 @@
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+from app.utils.logger import logger
+from app.utils.warmup import ComponentUnavailable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class ConcurrencyLimiter:
+    """Caps how many calls to a slow backend run at once.
+
+    Callers wait up to `timeout` seconds for a slot and are then turned away
+    with ComponentUnavailable (a 503 with Retry-After), so a burst of
+    generations cannot tie up every request thread the server has.
+    """
+
+    def __init__(self, name: str, limit: int, timeout: float = 30.0, retry_after: int = 5):
+        self.name = name
+        self.limit = max(1, limit)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self._counters = {"in_flight": 0, "waiting": 0, "completed": 0, "rejected": 0}
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            self._counters["waiting"] += 1
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self._counters["waiting"] -= 1
+            if acquired:
+                self._counters["in_flight"] += 1
+            else:
+                self._counters["rejected"] += 1
+        if not acquired:
+            raise ComponentUnavailable(self.name, "saturated", self.retry_after)
+        try:
+            yield
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._counters["in_flight"] -= 1
+                self._counters["completed"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"limit": self.limit, **self._counters}
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Hold an exclusive lock on `path` across processes for the duration of the block.
+
+    Server workers share the on-disk index, so only one of them may sync it at
+    a time. Where `fcntl` is unavailable the block runs unlocked.
+    """
+    if fcntl is None:
+        logger.warning(f"File locking is not supported here; {path} is not locked.")
+        yield
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -1,8 +1,128 @@
+import hashlib
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
 from app.utils.logger import logger
 
+DATA_TABLES = ('employees', 'departments', 'financials')
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_stats(data_dir: Path, tables: Iterable[str] = DATA_TABLES) -> Tuple[Tuple[int, int], ...]:
+    """(mtime_ns, size) of each source CSV, a cheap check for changes before rehashing"""
+    stats = []
+    for table in tables:
+        stat = (data_dir / f"{table}.csv").stat()
+        stats.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stats)
+
+def dataset_fingerprint(data_dir: Path, tables: Iterable[str] = DATA_TABLES,
+                        digests: Optional[Dict[str, str]] = None) -> str:
+    """Combine the per-file hashes of the source CSVs into a single dataset version"""
+    digest = hashlib.sha256()
+    for table in tables:
+        digest.update(table.encode('utf-8'))
+        if digests and table in digests:
+            digest.update(digests[table].encode('utf-8'))
+        else:
+            digest.update(file_digest(data_dir / f"{table}.csv").encode('utf-8'))
+    return digest.hexdigest()
+
+def merge_tables(employees: pd.DataFrame, departments: pd.DataFrame, financials: pd.DataFrame) -> pd.DataFrame:
+    """Join employees with their department and the department's quarterly financials"""
+    emp_dept = pd.merge(employees, departments, left_on="department_id", right_on="id", suffixes=('_emp', '_dept'))
+    return pd.merge(emp_dept, financials, left_on="department_id", right_on="department_id", how="left")
+
+def optimize_dtypes(data: pd.DataFrame) -> pd.DataFrame:
+    """Give the merged table compact, consistent column types"""
+    data = data.copy()
+    for column in ('id_emp', 'id_dept', 'id', 'department_id', 'manager_id', 'head_id', 'year', 'quarter'):
+        if column in data:
+            data[column] = data[column].astype('Int64')
+    for column in ('name', 'location', 'position'):
+        if column in data:
+            data[column] = data[column].astype('category')
+    return data
+
+def format_money(values: pd.Series) -> pd.Series:
+    """Format numbers as whole-dollar amounts with thousands separators, vectorized"""
+    whole = values.round().astype('Int64')
+    digits = whole.abs().astype('string')
+    grouped = digits.str.replace(r'(\d)(?=(\d{3})+$)', r'\1,', regex=True)
+    sign = pd.Series('', index=values.index).where(whole.ge(0).fillna(True), '-')
+    return (sign + '$' + grouped).fillna('n/a').astype(object)
+
+def format_documents(data: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+    """Build document IDs and texts for merged rows using column-wise string operations"""
+    emp_id = data['id_emp'].astype('Int64').astype('string')
+    fin_id = data['id'].astype('Int64').astype('string').fillna('none')
+    ids = 'emp-' + emp_id + '-fin-' + fin_id
+
+    has_financials = data['quarter'].notna()
+    quarter = data['quarter'].astype('Int64').astype('string')
+    year = data['year'].astype('Int64').astype('string')
+    financials = (
+        'Financials: Q' + quarter + ' ' + year
+        + ', Revenue: ' + format_money(data['revenue'])
+        + ', Expenses: ' + format_money(data['expenses'])
+        + ', Profit: ' + format_money(data['profit'])
+    ).where(has_financials, 'Financials: none')
+
+    texts = (
+        'Employee: ' + data['first_name'].astype(str) + ' ' + data['last_name'].astype(str)
+        + ' (' + data['position'].astype(str) + '), '
+        + 'Department: ' + data['name'].astype(str) + ' (Location: ' + data['location'].astype(str) + '), '
+        + 'Salary: ' + format_money(data['salary']) + ', Budget: ' + format_money(data['budget']) + ', '
+        + financials
+    )
+    return ids.astype(object), texts.astype(object)
+
+def document_metadata(data: pd.DataFrame) -> List[Dict]:
+    """Build the partition metadata stored alongside each document
+
+    Year and quarter are only present on rows joined to a financial record,
+    which are tagged with the kind "employee_financials".
+    """
+    department_ids = data['department_id'].astype('Int64').tolist()
+    departments = data['name'].astype(str).tolist()
+    years = data['year'].astype('Int64').tolist()
+    quarters = data['quarter'].astype('Int64').tolist()
+
+    metadatas = []
+    for department_id, department, year, quarter in zip(department_ids, departments, years, quarters):
+        metadata = {'department_id': int(department_id), 'department': department, 'kind': 'employee'}
+        if quarter is not pd.NA:
+            metadata.update(year=int(year), quarter=int(quarter), kind='employee_financials')
+        metadatas.append(metadata)
+    return metadatas
+
+def iter_merged(data_dir: Path, chunksize: int = 50_000) -> Iterator[pd.DataFrame]:
+    """Yield the merged table in pieces, reading employees in chunks
+
+    Departments and financials are small lookup tables and are loaded once;
+    the employee table is streamed so memory stays flat regardless of its size.
+    """
+    departments = pd.read_csv(data_dir / "departments.csv")
+    financials = pd.read_csv(data_dir / "financials.csv")
+    for employees in pd.read_csv(data_dir / "employees.csv", chunksize=chunksize):
+        yield merge_tables(employees, departments, financials)
+
+def iter_documents(data_dir: Path, chunksize: int = 50_000) -> Iterator[Tuple[str, str, Dict]]:
+    """Yield (doc_id, text, metadata) for every merged row, one employee chunk at a time"""
+    try:
+        for merged in iter_merged(data_dir, chunksize):
+            ids, texts = format_documents(merged)
+            yield from zip(ids, texts, document_metadata(merged))
+    except Exception as e:
+        logger.error(f"Error streaming documents: {str(e)}")
+        raise
+
 def create_sample_data(data_dir: Path):
     """Create sample CSV files if they don't exist"""
     
@@ -58,74 +178,3 @@ def create_sample_data(data_dir: Path):
     financials_df.to_csv(data_dir / 'financials.csv', index=False)
     
     logger.info("Sample data created successfully")
-
-def process_data_for_rag(data_dir: Path) -> List[str]:
-    """Process CSV data into documents for RAG"""
-    try:
-        employees = pd.read_csv(data_dir / "employees.csv")
-        departments = pd.read_csv(data_dir / "departments.csv")
-        financials = pd.read_csv(data_dir / "financials.csv")
-        
-        documents = []
-        
-        # Process employees with departments
-        emp_dept = pd.merge(
-            employees,
-            departments,
-            left_on='department_id',
-            right_on='id',
-            suffixes=('_emp', '_dept')
-        )
-        
-        # Group by department
-        for dept_name, group in emp_dept.groupby('name'):
-            emp_list = []
-            for _, emp in group.iterrows():
-                emp_list.append(f"""
-                    {emp['first_name']} {emp['last_name']}:
-                    - Position: {emp['position']}
-                    - Salary: ${emp['salary']:,}
-                    - Hire Date: {emp['hire_date']}
-                    """)
-            
-            doc = f"""
-            Department: {dept_name}
-            Location: {group.iloc[0]['location']}
-            Employees:
-            {''.join(emp_list)}
-            """
-            documents.append(doc)
-        
-        # Process financials by department and quarter
-        fin_dept = pd.merge(
-            financials,
-            departments,
-            left_on='department_id',
-            right_on='id'
-        )
-        
-        for dept_name, group in fin_dept.groupby('name'):
-            for year in group['year'].unique():
-                year_data = group[group['year'] == year]
-                quarters_info = []
-                for _, quarter in year_data.iterrows():
-                    quarters_info.append(f"""
-                    Q{quarter['quarter']}:
-                    - Revenue: ${quarter['revenue']:,}
-                    - Expenses: ${quarter['expenses']:,}
-                    - Profit: ${quarter['profit']:,}
-                    """)
-                
-                doc = f"""
-                Department: {dept_name}
-                Year: {year}
-                Financial Results:
-                {''.join(quarters_info)}
-                """
-                documents.append(doc)
-        
-        return documents
-    
-    except Exception as e:
-        logger.error(f"Error processing data: {str(e)}")
-        raise
\ No newline at end of file
@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+import markdown
+import bleach
+from app.config import settings
+
+class MessageFormatter:
+    ALLOWED_TAGS = [
+        'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'hr',
+        'ul', 'ol', 'li', 'strong', 'em', 'code', 'pre',
+        'table', 'thead', 'tbody', 'tr', 'th', 'td',
+        'div', 'span', 'a'
+    ]
+    ALLOWED_ATTRIBUTES = {
+        '*': ['class'],
+        'a': ['href', 'title', 'target'],
+        'code': ['class'],
+        'pre': ['class']
+    }
+    
+    # Rendered HTML of stored messages, keyed by message_uuid (messages never change)
+    MAX_CACHED = settings.HTML_CACHE_MAX_ENTRIES
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def format_message(cls, content: str) -> str:
+        """Format message content with proper HTML"""
+        # Convert markdown to HTML
+        html_content = markdown.markdown(content, extensions=['fenced_code', 'tables'])
+        
+        # Clean HTML
+        clean_html = bleach.clean(
+            html_content,
+            tags=cls.ALLOWED_TAGS,
+            attributes=cls.ALLOWED_ATTRIBUTES
+        )
+        
+        return clean_html
+
+    @classmethod
+    def format_stored(cls, message_uuid: str, content: str) -> str:
+        """Format a stored message, memoized by its uuid in a bounded LRU"""
+        with cls._lock:
+            if message_uuid in cls._cache:
+                cls._cache.move_to_end(message_uuid)
+                return cls._cache[message_uuid]
+        
+        html = cls.format_message(content)
+        with cls._lock:
+            cls._cache[message_uuid] = html
+            while len(cls._cache) > cls.MAX_CACHED:
+                cls._cache.popitem(last=False)
+        return html
@@ -0,0 +1,97 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+from app.utils.logger import logger
+from app.utils.warmup import ComponentUnavailable
+
+
+class HealthMonitor:
+    """Runs cheap component probes on a background schedule and serves the cached results.
+
+    A probe is a callable that returns an optional detail dict and raises on
+    failure. ComponentUnavailable is reported with the component's warm-up
+    state instead of as unhealthy.
+    """
+
+    def __init__(self, interval: float = 30.0):
+        self.interval = interval
+        self._probes: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, probe: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        self._probes[name] = probe
+
+    def start(self) -> None:
+        """Run the probes every `interval` seconds in a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> None:
+        for name, probe in self._probes.items():
+            result = self._check(probe)
+            with self._lock:
+                self._results[name] = result
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Latest result per probe with its age, probing inline if no fresh result exists."""
+        with self._lock:
+            stale = set(self._probes) - set(self._results) or any(
+                time.monotonic() - result["_monotonic"] > self.interval * 2
+                for result in self._results.values()
+            )
+        if stale:
+            self.run_once()
+
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    **{key: value for key, value in result.items() if key != "_monotonic"},
+                    "age_seconds": round(now - result["_monotonic"], 1),
+                }
+                for name, result in self._results.items()
+            }
+
+    @staticmethod
+    def overall(components: Dict[str, Dict[str, Any]]) -> str:
+        statuses = {component["status"] for component in components.values()}
+        if "unhealthy" in statuses:
+            return "unhealthy"
+        if statuses - {"healthy"}:
+            return "degraded"
+        return "healthy"
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error running health probes: {str(e)}")
+            self._stop.wait(self.interval)
+
+    @staticmethod
+    def _check(probe: Callable[[], Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            detail = probe() or {}
+            result = {"status": "healthy", **detail}
+        except ComponentUnavailable as e:
+            status = "unhealthy" if e.state == "failed" else e.state
+            result = {"status": status, "error": e.error} if e.error else {"status": status}
+        except Exception as e:
+            logger.warning(f"Health probe failed: {str(e)}")
+            result = {"status": "unhealthy", "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        result["checked_at"] = datetime.now(timezone.utc).isoformat()
+        result["_monotonic"] = time.monotonic()
+        return result
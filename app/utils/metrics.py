@@ -0,0 +1,51 @@
+import threading
+import time
+import numpy as np
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+
+
+class LatencyTracker:
+    """Rolling window of latency samples per named stage."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+            self._samples[name].append(seconds)
+            self._counts[name] += 1
+
+    @contextmanager
+    def time(self, name: str):
+        """Record how long the wrapped block takes under `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count and mean/p50/p95/p99 latency in milliseconds for each stage."""
+        with self._lock:
+            snapshot = {name: (list(samples), self._counts[name]) for name, samples in self._samples.items()}
+
+        result = {}
+        for name, (samples, total) in snapshot.items():
+            values = np.asarray(samples) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[name] = {
+                "count": total,
+                "mean_ms": round(float(values.mean()), 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+            }
+        return result
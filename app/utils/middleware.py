@@ -1,6 +1,7 @@
 from functools import wraps
 from flask import jsonify
 from app.utils.logger import logger
+from app.utils.warmup import ComponentUnavailable
 
 def handle_errors(f):
     """Error handling decorator for API routes"""
@@ -8,6 +9,11 @@ def handle_errors(f):
     def decorated_function(*args, **kwargs):
         try:
             return f(*args, **kwargs)
+        except ComponentUnavailable as e:
+            logger.warning(f"{f.__name__} unavailable: {str(e)}")
+            response = jsonify({"error": str(e), "status": e.state})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
         except Exception as e:
             logger.error(f"Error in {f.__name__}: {str(e)}")
             return jsonify({"error": str(e)}), 500
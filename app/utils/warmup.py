@@ -0,0 +1,104 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from app.utils.logger import logger
+
+
+class ComponentUnavailable(Exception):
+    """Raised when a component is requested before it has finished warming up."""
+
+    def __init__(self, name: str, state: str, retry_after: int = 5, error: Optional[str] = None):
+        self.name = name
+        self.state = state
+        self.retry_after = retry_after
+        self.error = error
+        message = f"{name} is {state}"
+        super().__init__(f"{message}: {error}" if error else message)
+
+
+class LazyComponent:
+    """An expensive component built on first use or by a background warm-up thread.
+
+    The state goes from "cold" to "warming" to "ready" (or "failed", in which
+    case the next request starts another attempt). Concurrent callers share a
+    single build.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], retry_after: int = 5):
+        self.name = name
+        self.retry_after = retry_after
+        self._factory = factory
+        self._instance = None
+        self._error: Optional[str] = None
+        self._state = "cold"
+        self._started_at: Optional[float] = None
+        self._build_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def start(self) -> None:
+        """Start building in the background unless the component is already built or building."""
+        with self._lock:
+            if self._instance is not None or self._state == "warming":
+                return
+            self._state = "warming"
+            self._error = None
+            self._started_at = time.monotonic()
+            self._done.clear()
+            threading.Thread(target=self._build, name=f"warmup-{self.name}", daemon=True).start()
+
+    def get(self, wait: bool = True, timeout: Optional[float] = None) -> Any:
+        """Return the component, building it if needed.
+
+        With `wait=False` a component that is not ready raises
+        ComponentUnavailable immediately instead of blocking the caller.
+        """
+        if self._instance is not None:
+            return self._instance
+        self.start()
+        if wait:
+            self._done.wait(timeout)
+        if self._instance is not None:
+            return self._instance
+        raise ComponentUnavailable(self.name, self._state, self.retry_after, self._error)
+
+    def peek(self) -> Any:
+        """Return the component if it is built, else raise ComponentUnavailable; never starts a build."""
+        if self._instance is not None:
+            return self._instance
+        raise ComponentUnavailable(self.name, self._state, self.retry_after, self._error)
+
+    def status(self) -> Dict[str, Any]:
+        status = {"state": self._state}
+        if self._build_seconds is not None:
+            status["build_seconds"] = round(self._build_seconds, 2)
+        elif self._started_at is not None:
+            status["warming_seconds"] = round(time.monotonic() - self._started_at, 2)
+        if self._error:
+            status["error"] = self._error
+        return status
+
+    def _build(self) -> None:
+        logger.info(f"Warming up {self.name}...")
+        try:
+            instance = self._factory()
+            with self._lock:
+                self._instance = instance
+                self._build_seconds = time.monotonic() - self._started_at
+                self._state = "ready"
+            logger.info(f"{self.name} ready after {self._build_seconds:.1f}s.")
+        except Exception as e:
+            logger.error(f"Error warming up {self.name}: {str(e)}")
+            with self._lock:
+                self._error = str(e)
+                self._state = "failed"
+        finally:
+            self._done.set()
@@ -1,5 +1,5 @@
 from flask import Flask, request, jsonify, render_template
-import requests
+from app.llm.client import get_client
 from langchain.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -19,21 +19,9 @@ documents = [
     "Do you offer gift wrapping? Yes, we offer gift wrapping for an additional fee. You can select this option during checkout."
 ]
 
-# Define the LLaMa API call
+# Define the LLaMa API call, through the shared pooled Ollama client
 def call_llama(prompt):
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "model": "llama3.2:1b",
-        "prompt": prompt,
-        "stream": False,
-    }
-
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        headers=headers,
-        json=payload
-    )
-    return response.json()["response"]
+    return get_client("http://localhost:11434").generate("llama3.2:1b", prompt)["response"]
 
 # Create a custom LLaMa class
 class LLaMa(LLM):
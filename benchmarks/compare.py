@@ -0,0 +1,78 @@
+"""Compare two benchmark suite reports and flag regressions.
+
+Timings (keys ending in `_ms`, `_s` or `seconds`) regress when they grow and
+throughputs (keys ending in `_per_s`) when they shrink, by more than
+`--threshold`. Exits with status 1 if anything regressed:
+
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/latest.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+
+def flatten(report: Dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in report.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, float(value)
+
+
+def direction(metric: str) -> Optional[int]:
+    """+1 if larger is better, -1 if smaller is better, None for counts and settings."""
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("_per_s"):
+        return 1
+    if name.endswith(("_ms", "_s")) or name == "seconds":
+        return -1
+    return None
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> Tuple[list, list]:
+    before = dict(flatten(baseline.get("sizes", {})))
+    after = dict(flatten(current.get("sizes", {})))
+    rows, regressions = [], []
+    for metric in sorted(before.keys() & after.keys()):
+        sign = direction(metric)
+        if sign is None or before[metric] == 0:
+            continue
+        change = (after[metric] - before[metric]) / before[metric]
+        regressed = change * sign < -threshold
+        rows.append((metric, before[metric], after[metric], change, regressed))
+        if regressed:
+            regressions.append(metric)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change tolerated (default 0.10)")
+    parser.add_argument("--all", action="store_true", help="show unchanged metrics too")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    rows, regressions = compare(baseline, current, args.threshold)
+
+    print(f"{baseline['meta']['revision']} -> {current['meta']['revision']} (threshold {args.threshold:.0%})")
+    changed = sorted(key for key in baseline["config"].keys() | current["config"].keys()
+                     if baseline["config"].get(key) != current["config"].get(key))
+    if changed:
+        print(f"warning: runs used different settings ({', '.join(changed)}); differences may not be regressions")
+    for metric, before, after, change, regressed in rows:
+        if not args.all and abs(change) <= args.threshold:
+            continue
+        marker = "REGRESSED" if regressed else "improved"
+        print(f"{metric:<45} {before:>12.3f} {after:>12.3f} {change:>+8.1%}  {marker}")
+    print(f"{len(regressions)} regression(s) in {len(rows)} metrics")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
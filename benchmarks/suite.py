@@ -0,0 +1,256 @@
+"""Time ingestion, retrieval, chat and persistence against a local Ollama stub.
+
+Every dataset size runs in a fresh interpreter with its own data, index and
+database directories, so cold start is measured honestly and sizes do not
+share caches. Generation and embedding latency come from the stub's
+synthetic delays. Run from the repository root:
+
+    python -m benchmarks.suite --sizes 100,1000,5000 --output benchmarks/results/baseline.json
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/latest.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentiles(samples) -> dict:
+    values = np.asarray(samples) * 1000
+    p50, p99 = np.percentile(values, [50, 99])
+    return {"p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3), "mean_ms": round(float(values.mean()), 3)}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def questions(data_dir: Path, count: int, seed: int):
+    """A mix of name lookups and department questions drawn from the dataset."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    departments = pd.read_csv(data_dir / "departments.csv", usecols=["name"])["name"].tolist()
+    employees = pd.read_csv(data_dir / "employees.csv", usecols=["first_name", "last_name"])
+    rows = employees.sample(n=count, replace=True, random_state=seed)
+    templates = (
+        "What is {first} {last}'s salary?",
+        "Which department does {first} {last} work in?",
+        "Who works in {department} and what are their positions?",
+        "Tell me about the {department} team",
+    )
+    return [
+        templates[i % len(templates)].format(first=first, last=last,
+                                             department=departments[rng.integers(len(departments))])
+        for i, (first, last) in enumerate(zip(rows["first_name"], rows["last_name"]))
+    ]
+
+
+def bench_rag(data_dir: Path, queries: int, seed: int) -> dict:
+    from app.config import Settings
+    from app.rag.manager import RAGManager
+
+    settings = Settings()
+    rag, ingest = timed(RAGManager, settings)
+    documents = rag.index_status()["documents"]
+    _, cold_start = timed(RAGManager, settings)
+
+    samples = []
+    for question in questions(data_dir, queries, seed):
+        _, elapsed = timed(rag._retrieve_context, question)
+        samples.append(elapsed)
+    return {
+        "ingest": {"seconds": round(ingest, 3), "documents": documents,
+                   "docs_per_s": round(documents / ingest, 1)},
+        "cold_start_s": round(cold_start, 3),
+        "retrieval": percentiles(samples),
+    }
+
+
+def bench_chat(data_dir: Path, requests: int, conversations: int, seed: int) -> dict:
+    from main import create_app
+
+    client = create_app().test_client()
+    ids = [client.post("/api/conversation", json={"title": f"bench {i}"}).get_json()["id"]
+           for i in range(conversations)]
+    # The first request builds the database and RAG components; it is timed as startup.
+    response, startup = timed(client.post, f"/api/conversation/{ids[0]}/chat", json={"message": "Hello"})
+    if response.status_code != 200:
+        raise RuntimeError(f"chat failed: {response.get_data(as_text=True)}")
+
+    samples = []
+    for i, question in enumerate(questions(data_dir, requests, seed + 1)):
+        response, elapsed = timed(client.post, f"/api/conversation/{ids[i % conversations]}/chat",
+                                  json={"message": question})
+        if response.status_code != 200:
+            raise RuntimeError(f"chat failed: {response.get_data(as_text=True)}")
+        samples.append(elapsed)
+    return {"first_request_s": round(startup, 3), **percentiles(samples)}
+
+
+def bench_database(directory: Path, conversations: int, messages: int, fetches: int, seed: int) -> dict:
+    from app.database.manager import DatabaseManager
+    from app.utils.formatting import MessageFormatter
+
+    db = DatabaseManager(f"sqlite:///{directory / 'bench.db'}")
+    ids = [db.create_conversation(f"bench {i}")["id"] for i in range(conversations)]
+    body = "Revenue for **Engineering** in Q2 2023 was $350000.\n\n- Expenses: $280000\n- Profit: $70000"
+
+    start = time.perf_counter()
+    for conversation_id in ids:
+        for i in range(messages):
+            db.add_message(conversation_id, "user" if i % 2 == 0 else "assistant", body)
+    insert = time.perf_counter() - start
+
+    list_samples, cursor = [], None
+    while True:
+        page, elapsed = timed(db.get_conversations, limit=50, cursor=cursor)
+        list_samples.append(elapsed)
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    rng = np.random.default_rng(seed)
+    fetch_samples = [timed(db.get_conversation, int(ids[i]), limit=100)[1]
+                     for i in rng.integers(0, len(ids), fetches)]
+    format_samples = [timed(MessageFormatter.format_message, f"{body} {i}")[1] for i in range(fetches)]
+    db.close()
+    return {
+        "conversations": conversations,
+        "messages": conversations * messages,
+        "insert": {"seconds": round(insert, 3), "messages_per_s": round(conversations * messages / insert, 1)},
+        "list": percentiles(list_samples),
+        "fetch": percentiles(fetch_samples),
+        "format": percentiles(format_samples),
+    }
+
+
+def run_size(args) -> dict:
+    """Benchmark one dataset size; runs in the child interpreter configured by `bench_env`."""
+    start = time.perf_counter()
+    import main  # noqa: F401  (the app's import cost is part of cold start)
+    import_s = time.perf_counter() - start
+    logging.getLogger().setLevel(logging.WARNING)
+
+    directory = Path(args.directory)
+    data_dir = directory / "data"
+    return {
+        "import_s": round(import_s, 3),
+        **bench_rag(data_dir, args.queries, args.seed),
+        "chat": bench_chat(data_dir, args.chat_requests, args.conversations, args.seed),
+        "database": bench_database(directory, max(10, args.employees // 10), args.messages,
+                                   args.queries, args.seed),
+    }
+
+
+def bench_env(directory: Path, ollama_url: str, backend: str) -> dict:
+    """Settings for a child run: everything under `directory`, answer caches off so every chat generates."""
+    return {
+        "OLLAMA_BASE_URL": ollama_url,
+        "DATA_DIR": str(directory / "data"),
+        "DATA_CACHE_DIR": str(directory / "data_cache"),
+        "CHROMA_DIR": str(directory / "chroma"),
+        "NUMPY_INDEX_DIR": str(directory / "numpy_index"),
+        "EMBEDDING_CACHE_PATH": str(directory / "embedding_cache.sqlite3"),
+        "DB_URL": f"sqlite:///{directory / 'conversations.db'}",
+        "VECTOR_BACKEND": backend,
+        "RESPONSE_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "WARMUP_IN_BACKGROUND": "false",
+        "SERVE_DEGRADED": "false",
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> dict:
+    from app.llm.stub import StubOllamaServer
+    from generate import generate_dataset
+
+    stub = StubOllamaServer(first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+                            embed_delay=args.embed_delay, prompt_token_delay=args.prompt_token_delay,
+                            tokens=args.tokens).start()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "child", "directory")},
+        "sizes": {},
+    }
+    try:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory(prefix="rag-bench-") as directory:
+                directory = Path(directory)
+                generate_dataset(directory / "data", size, args.departments, seed=args.seed)
+                command = [sys.executable, "-m", "benchmarks.suite", "--child", "--directory", str(directory),
+                           "--employees", str(size), "--queries", str(args.queries),
+                           "--chat-requests", str(args.chat_requests), "--conversations", str(args.conversations),
+                           "--messages", str(args.messages), "--seed", str(args.seed)]
+                print(f"Benchmarking {size} employees...", file=sys.stderr)
+                child = subprocess.run(command, env={**os.environ, **bench_env(directory, stub.url, args.backend)},
+                                       capture_output=True, text=True)
+                if child.returncode != 0:
+                    raise RuntimeError(f"benchmark for {size} employees failed:\n{child.stderr}")
+                report["sizes"][str(size)] = json.loads(child.stdout.strip().splitlines()[-1])
+    finally:
+        stub.stop()
+    report["stub_requests"] = dict(stub.requests)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[100, 1000, 5000], help="comma-separated employee counts")
+    parser.add_argument("--departments", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200, help="retrieval queries and DB fetches per size")
+    parser.add_argument("--chat-requests", type=int, default=50)
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=20, help="messages stored per benchmark conversation")
+    parser.add_argument("--backend", choices=["numpy", "chroma"], default="numpy")
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--prompt-token-delay", type=float, default=0.0001)
+    parser.add_argument("--embed-delay", type=float, default=0.005)
+    parser.add_argument("--tokens", type=int, default=32, help="answer length produced by the stub")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="where to write the JSON report (default: benchmarks/results/)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    parser.add_argument("--employees", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_size(args)))
+        return
+
+    report = run(args)
+    output = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['meta']['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print(f"Wrote {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
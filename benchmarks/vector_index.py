@@ -0,0 +1,106 @@
+"""Compare top-k retrieval latency of the Chroma and NumPy vector store backends.
+
+Random unit vectors stand in for document embeddings so no embedding model is
+needed. Run from the repository root:
+
+    python -m benchmarks.vector_index --rows 50000 --dim 1024
+"""
+import argparse
+import json
+import tempfile
+import time
+import uuid
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from app.rag.numpy_store import NumpyVectorStore, QUANTIZATIONS
+
+
+def random_unit_vectors(rng: np.random.Generator, rows: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((rows, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def percentiles(samples) -> dict:
+    values = np.asarray(samples) * 1000
+    p50, p99 = np.percentile(values, [50, 99])
+    return {"p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3), "mean_ms": round(float(values.mean()), 3)}
+
+
+def time_queries(search, queries: np.ndarray, k: int):
+    samples, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        docs = search(query.tolist(), k)
+        samples.append(time.perf_counter() - start)
+        results.append([doc.page_content for doc in docs])
+    return samples, results
+
+
+def recall(results, truth) -> float:
+    hits = sum(len(set(found) & set(expected)) for found, expected in zip(results, truth))
+    return round(hits / sum(len(expected) for expected in truth), 4)
+
+
+def run(rows: int, dim: int, queries: int, k: int, seed: int, with_chroma: bool) -> dict:
+    rng = np.random.default_rng(seed)
+    vectors = random_unit_vectors(rng, rows, dim)
+    query_vectors = random_unit_vectors(rng, queries, dim)
+    texts = [f"doc-{i}" for i in range(rows)]
+    exact = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :k]
+    truth = [[texts[i] for i in row] for row in exact]
+
+    report = {"rows": rows, "dim": dim, "queries": queries, "k": k, "backends": {}}
+
+    for quantization in QUANTIZATIONS:
+        with tempfile.TemporaryDirectory() as directory:
+            store = NumpyVectorStore(None, persist_directory=directory, quantization=quantization)
+            start = time.perf_counter()
+            store.add_vectors(vectors, texts, ids=texts)
+            store.save()
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            store = NumpyVectorStore(None, persist_directory=directory, quantization=quantization)
+            load = time.perf_counter() - start
+
+            samples, results = time_queries(store.similarity_search_by_vector, query_vectors, k)
+            report["backends"][f"numpy-{quantization}"] = {
+                "build_s": round(build, 3),
+                "load_s": round(load, 3),
+                "matrix_mb": round(store._matrix.nbytes / 1e6, 2),
+                "recall": recall(results, truth),
+                **percentiles(samples),
+            }
+
+    if with_chroma:
+        store = Chroma(collection_name=f"bench-{uuid.uuid4().hex}", embedding_function=None)
+        start = time.perf_counter()
+        batch = 5000
+        for offset in range(0, rows, batch):
+            store._collection.add(
+                ids=texts[offset:offset + batch],
+                embeddings=vectors[offset:offset + batch].tolist(),
+                documents=texts[offset:offset + batch],
+            )
+        build = time.perf_counter() - start
+        samples, results = time_queries(store.similarity_search_by_vector, query_vectors, k)
+        report["backends"]["chroma"] = {"build_s": round(build, 3), "recall": recall(results, truth), **percentiles(samples)}
+        store.delete_collection()
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-chroma", action="store_true", help="only benchmark the NumPy backend")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.dim, args.queries, args.k, args.seed, not args.skip_chroma), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,119 +1,181 @@
-import pandas as pd
+"""Generate synthetic departments, employees and financials in the app's schema.
+
+Every column is drawn with vectorized NumPy operations and employees are
+written in chunks, so memory stays flat at any row count. Output is
+reproducible for a given seed and chunk size.
+
+    python generate.py --employees 1000000 --years 2021-2024 --format parquet --output-dir data_large
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Sequence
 import numpy as np
-from datetime import datetime, timedelta
-import random
-from faker import Faker
-
-def generate_sample_data(num_departments=5, num_employees=50):
-    fake = Faker()
-    
-    # Generate Departments
-    departments = {
-        'dept_id': range(1, num_departments + 1),
-        'dept_name': [
-            'Engineering',
-            'Marketing',
-            'Human Resources',
-            'Finance',
-            'Operations'
-        ][:num_departments],  # Handle cases where fewer departments are needed
-        'location': [
-            'New York',
-            'San Francisco',
-            'Chicago',
-            'Boston',
-            'Austin'
-        ][:num_departments],
-        'budget': [
-            random.randint(500_000, 2_000_000) 
-            for _ in range(num_departments)
-        ],
-        'dept_head': [
-            fake.name() 
-            for _ in range(num_departments)
-        ]
-    }
-    
-    df_departments = pd.DataFrame(departments)
-    
-    # Generate Employees
-    employees = {
-        'emp_id': range(1, num_employees + 1),
-        'first_name': [fake.first_name() for _ in range(num_employees)],
-        'last_name': [fake.last_name() for _ in range(num_employees)],
-        'dept_id': [random.randint(1, num_departments) for _ in range(num_employees)],
-        'date_hire': [
-            (datetime.now() - timedelta(days=random.randint(0, 3650))).strftime('%Y-%m-%d')
-            for _ in range(num_employees)
-        ],
-        'salary': [
-            random.randint(50_000, 150_000) 
-            for _ in range(num_employees)
-        ],
-        'performance_rating': [
-            round(random.uniform(3.0, 5.0), 2) 
-            for _ in range(num_employees)
-        ],
-        'bonus_percentage': [
-            round(random.uniform(0.05, 0.15), 2) 
-            for _ in range(num_employees)
-        ],
-        'vacation_days': [
-            random.randint(10, 25) 
-            for _ in range(num_employees)
-        ],
-        'remote_work': [
-            random.choice(['Full Remote', 'Hybrid', 'Office']) 
-            for _ in range(num_employees)
-        ]
-    }
-    
-    df_employees = pd.DataFrame(employees)
-    
-    # Positions based on departments
-    positions = {
-        'Engineering': ['Software Engineer', 'DevOps Engineer', 'QA Engineer', 'Tech Lead', 'System Architect'],
-        'Marketing': ['Marketing Specialist', 'Content Writer', 'SEO Specialist', 'Marketing Manager', 'Brand Manager'],
-        'Human Resources': ['HR Specialist', 'Recruiter', 'HR Manager', 'Training Coordinator', 'HR Assistant'],
-        'Finance': ['Financial Analyst', 'Accountant', 'Finance Manager', 'Auditor', 'Financial Controller'],
-        'Operations': ['Operations Manager', 'Project Manager', 'Business Analyst', 'Operations Coordinator', 'Process Specialist']
-    }
-    
-    # Email, Username, and Position Assignment
-    for index, row in df_employees.iterrows():
-        first = row['first_name'].lower()
-        last = row['last_name'].lower()
-        email = f"{first[0]}{last}@company.com"
-        username = f"{first[0]}{last[:7]}"
-        df_employees.at[index, 'email'] = email
-        df_employees.at[index, 'username'] = username
-        
-        dept_name = df_departments.loc[df_departments['dept_id'] == row['dept_id'], 'dept_name'].iloc[0]
-        position = random.choice(positions.get(dept_name, ['General Employee']))
-        df_employees.at[index, 'position'] = position
-    
-    # Assign Managers
-    potential_managers = df_employees.sample(n=max(1, num_employees // 5))['emp_id'].tolist()
-    for index, row in df_employees.iterrows():
-        if row['emp_id'] not in potential_managers:
-            same_dept_managers = df_employees[
-                (df_employees['emp_id'].isin(potential_managers)) & 
-                (df_employees['dept_id'] == row['dept_id'])
-            ]['emp_id'].tolist()
-            if same_dept_managers:
-                df_employees.at[index, 'manager_id'] = random.choice(same_dept_managers)
+import pandas as pd
+
+DEPARTMENT_NAMES = ('Engineering', 'Sales', 'Marketing', 'HR', 'Finance', 'Operations', 'Support', 'Legal')
+POSITIONS = {
+    'Engineering': ('Software Engineer', 'Senior Engineer', 'DevOps Engineer', 'QA Engineer', 'Tech Lead'),
+    'Sales': ('Sales Representative', 'Account Executive', 'Sales Manager', 'Sales Engineer', 'Sales Analyst'),
+    'Marketing': ('Marketing Specialist', 'Content Writer', 'SEO Specialist', 'Marketing Manager', 'Brand Manager'),
+    'HR': ('HR Specialist', 'Recruiter', 'HR Manager', 'Training Coordinator', 'HR Assistant'),
+    'Finance': ('Financial Analyst', 'Accountant', 'Finance Manager', 'Auditor', 'Financial Controller'),
+    'Operations': ('Operations Manager', 'Project Manager', 'Business Analyst', 'Operations Coordinator',
+                   'Process Specialist'),
+    'Support': ('Support Engineer', 'Support Specialist', 'Support Manager', 'Technical Writer', 'Support Analyst'),
+    'Legal': ('Counsel', 'Paralegal', 'Compliance Officer', 'Contracts Manager', 'Legal Analyst'),
+}
+HEAD_TITLES = {'Engineering': 'Lead Engineer', 'Sales': 'Sales Director', 'Marketing': 'Marketing Head',
+               'HR': 'HR Director', 'Finance': 'CFO', 'Operations': 'COO', 'Support': 'Support Director',
+               'Legal': 'General Counsel'}
+FIRST_NAMES = ('John', 'Jane', 'Bob', 'Alice', 'Charlie', 'David', 'Eve', 'Frank', 'Grace', 'Henry', 'Ivy',
+               'Jack', 'Karen', 'Liam', 'Mia', 'Noah', 'Olivia', 'Paul', 'Quinn', 'Ruth', 'Sam', 'Tara',
+               'Uma', 'Victor', 'Wendy', 'Xavier', 'Yara', 'Zoe')
+LAST_NAMES = ('Smith', 'Doe', 'Johnson', 'Williams', 'Brown', 'Davis', 'Wilson', 'Moore', 'Taylor', 'Anderson',
+              'Thomas', 'Jackson', 'White', 'Harris', 'Martin', 'Garcia', 'Clark', 'Lewis', 'Lee', 'Walker',
+              'Hall', 'Young', 'King', 'Wright', 'Lopez', 'Hill', 'Scott', 'Green')
+HIRE_EPOCH = np.datetime64('2010-01-01')
+
+
+def department_name(index: int) -> str:
+    """Base names first, then numbered divisions of them, e.g. 'Sales 2'."""
+    base = DEPARTMENT_NAMES[index % len(DEPARTMENT_NAMES)]
+    return base if index < len(DEPARTMENT_NAMES) else f"{base} {index // len(DEPARTMENT_NAMES) + 1}"
+
+
+def generate_departments(num_departments: int, seed: int = 0) -> pd.DataFrame:
+    """Departments; employee `id` N is the head of department N."""
+    rng = np.random.default_rng([seed, 0])
+    ids = np.arange(1, num_departments + 1)
+    return pd.DataFrame({
+        'id': ids,
+        'name': [department_name(i) for i in range(num_departments)],
+        'head_id': ids,
+        'budget': rng.integers(4, 41, num_departments) * 50_000,
+        'location': np.char.add('Floor ', rng.integers(1, 11, num_departments).astype(str)),
+    })
+
+
+def generate_employees(num_employees: int, num_departments: int, seed: int = 0,
+                       chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Yield employees `chunk_size` rows at a time.
+
+    The first `num_departments` employees head their departments; everyone
+    else reports to their department's head.
+    """
+    base = [DEPARTMENT_NAMES[i % len(DEPARTMENT_NAMES)] for i in range(num_departments)]
+    positions = np.array([POSITIONS[name] for name in base])
+    heads = np.array([HEAD_TITLES[name] for name in base])
+    first_names = np.array(FIRST_NAMES)
+    last_names = np.array(LAST_NAMES)
+
+    for chunk, start in enumerate(range(0, num_employees, chunk_size)):
+        rng = np.random.default_rng([seed, 1, chunk])
+        ids = np.arange(start + 1, min(start + chunk_size, num_employees) + 1)
+        count = len(ids)
+        is_head = ids <= num_departments
+        department_ids = np.where(is_head, ids, rng.integers(1, num_departments + 1, count))
+        department_index = department_ids - 1
+        position = positions[department_index, rng.integers(0, positions.shape[1], count)]
+        salary = rng.lognormal(np.log(85_000), 0.3, count).clip(40_000, 300_000)
+        manager_ids = pd.array(department_ids, dtype='Int64')
+        manager_ids[is_head] = pd.NA
+        yield pd.DataFrame({
+            'id': ids,
+            'first_name': first_names[rng.integers(0, len(first_names), count)],
+            'last_name': last_names[rng.integers(0, len(last_names), count)],
+            'department_id': department_ids,
+            'position': np.where(is_head, heads[department_index], position),
+            'salary': np.where(is_head, salary * 1.5, salary).round(-3).astype(np.int64),
+            'hire_date': (HIRE_EPOCH + rng.integers(0, 5000, count).astype('timedelta64[D]')).astype(str),
+            'manager_id': manager_ids,
+        })
+
+
+def generate_financials(num_departments: int, years: Sequence[int], seed: int = 0) -> pd.DataFrame:
+    """One row per department per quarter of `years`, with revenue trending up year over year."""
+    rng = np.random.default_rng([seed, 2])
+    periods = len(years) * 4
+    base = rng.integers(100, 601, (num_departments, 1)) * 1_000
+    growth = (1 + rng.normal(0.02, 0.05, (num_departments, periods))).cumprod(axis=1)
+    revenue = (base * growth).round(-3).astype(np.int64)
+    expenses = (revenue * rng.uniform(0.6, 1.05, revenue.shape)).round(-3).astype(np.int64)
+    financials = pd.DataFrame({
+        'id': np.arange(1, num_departments * periods + 1),
+        'department_id': np.repeat(np.arange(1, num_departments + 1), periods),
+        'year': np.tile(np.repeat(np.asarray(years), 4), num_departments),
+        'quarter': np.tile(np.arange(1, 5), num_departments * len(years)),
+        'revenue': revenue.ravel(),
+        'expenses': expenses.ravel(),
+    })
+    financials['profit'] = financials['revenue'] - financials['expenses']
+    return financials
+
+
+def write_table(frames: Iterator[pd.DataFrame], path: Path, fmt: str = 'csv') -> int:
+    """Stream DataFrames to one CSV or Parquet file; returns the rows written."""
+    rows = 0
+    writer = None
+    try:
+        for frame in frames:
+            if fmt == 'parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
             else:
-                df_employees.at[index, 'manager_id'] = random.choice(potential_managers)
-    
-    # Save to CSV
-    df_departments.to_csv('departments.csv', index=False)
-    df_employees.to_csv('employees.csv', index=False)
-    
-    return df_departments, df_employees
+                frame.to_csv(path, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def generate_dataset(output_dir: Path, num_employees: int, num_departments: int = 8,
+                     years: Sequence[int] = (2022, 2023), seed: int = 0, chunk_size: int = 100_000,
+                     fmt: str = 'csv') -> Dict[str, int]:
+    """Write departments, employees and financials tables to `output_dir`; returns row counts."""
+    if num_employees < num_departments:
+        raise ValueError("need at least one employee per department to head it")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    suffix = 'parquet' if fmt == 'parquet' else 'csv'
+    return {
+        'departments': write_table(iter([generate_departments(num_departments, seed)]),
+                                   output_dir / f"departments.{suffix}", fmt),
+        'employees': write_table(generate_employees(num_employees, num_departments, seed, chunk_size),
+                                 output_dir / f"employees.{suffix}", fmt),
+        'financials': write_table(iter([generate_financials(num_departments, years, seed)]),
+                                  output_dir / f"financials.{suffix}", fmt),
+    }
+
+
+def parse_years(value: str) -> Sequence[int]:
+    first, _, last = value.partition('-')
+    return list(range(int(first), int(last or first) + 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=50)
+    parser.add_argument('--departments', type=int, default=5)
+    parser.add_argument('--years', type=parse_years, default=[2022, 2023], help="e.g. 2023 or 2020-2024")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="employee rows generated per chunk")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--output-dir', type=Path, default=Path('.'))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = generate_dataset(args.output_dir, args.employees, args.departments, args.years, args.seed,
+                              args.chunk_size, args.format)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {', '.join(f'{rows:,} {table}' for table, rows in counts.items())} "
+          f"to {args.output_dir} in {elapsed:.1f}s")
+
 
 if __name__ == "__main__":
-    dept_df, emp_df = generate_sample_data()
-    print("\nDepartments Sample:")
-    print(dept_df.head())
-    print("\nEmployees Sample:")
-    print(emp_df.head())
+    main()
@@ -0,0 +1,25 @@
+from app.config import settings
+
+# Threaded workers: a request waiting on Ollama holds a thread, not a process, and
+# LLM_MAX_CONCURRENCY keeps generations from taking every thread, so cheap
+# endpoints stay responsive while answers stream.
+bind = f"{settings.HOST}:{settings.PORT}"
+worker_class = "gthread"
+workers = settings.SERVER_WORKERS
+threads = settings.SERVER_THREADS
+timeout = settings.SERVER_TIMEOUT_SECONDS
+graceful_timeout = 30
+keepalive = 5
+
+# Each worker warms up its own RAG system in the background after forking;
+# preloading would start those threads in the master instead. Workers take a
+# file lock around the shared vector index, so only one of them syncs it.
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+def on_starting(server):
+    """Create the data files and database tables once, in the master, before any worker starts"""
+    from main import initialize_application
+    initialize_application()
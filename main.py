@@ -1,5 +1,6 @@
 from flask import Flask, render_template
-from app.api.routes import api
+from app.api.routes import api, warmup
+from app.database.manager import create_schema
 from app.config import settings
 from app.utils.logger import logger
 from app.utils.data_processor import create_sample_data
@@ -12,6 +13,10 @@ def create_app():
     # Register blueprints
     app.register_blueprint(api, url_prefix='/api')
     
+    # Build the database and RAG components off the request path so the port binds immediately
+    if settings.WARMUP_IN_BACKGROUND:
+        warmup()
+    
     @app.route('/')
     def index():
         return render_template('index.html')
@@ -32,6 +37,9 @@ def initialize_application():
             logger.info("Creating sample data files...")
             create_sample_data(settings.DATA_DIR)
         
+        # Tables are created here, before any worker opens the database
+        create_schema(settings.DB_URL)
+        
         # Initialize ChromaDB directory
         if not os.path.exists(settings.CHROMA_DIR):
             logger.info("Initializing ChromaDB directory...")
@@ -48,4 +56,5 @@ if __name__ == "__main__":
     
     # Create and run Flask app
     app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
+    # Development server; use `gunicorn -c gunicorn.conf.py wsgi:app` in production
+    app.run(debug=settings.DEBUG, host=settings.HOST, port=settings.PORT, threaded=True)
\ No newline at end of file
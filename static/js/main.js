@@ -1,6 +1,10 @@
 class ChatApp {
     constructor() {
         this.currentConversationId = null;
+        this.conversations = [];
+        this.conversationsCursor = null;  // next page of the sidebar, null once all are shown
+        this.olderMessagesCursor = null;  // older messages of the open conversation, null at its start
+        this.loadingOlderMessages = false;
         this.setupElements();
         this.setupEventListeners();
         this.initialize();
@@ -22,6 +26,13 @@ class ChatApp {
         this.startChatButton.addEventListener('click', () => this.startNewChat());
         this.chatForm.addEventListener('submit', (e) => this.handleSubmit(e));
         
+        // Fetch older messages when the user scrolls to the top of the conversation
+        this.chatMessages.addEventListener('scroll', () => {
+            if (this.chatMessages.scrollTop < 50) {
+                this.loadOlderMessages();
+            }
+        });
+        
         // Listen for URL changes
         window.addEventListener('popstate', (event) => {
             if (event.state && event.state.conversationId) {
@@ -42,11 +53,17 @@ class ChatApp {
         }
     }
 
-    async loadConversations() {
+    // Load the newest page of conversations, or with `more` the page after those shown
+    async loadConversations(more = false) {
         try {
-            const response = await fetch('/conversations');
+            const params = more && this.conversationsCursor
+                ? `?cursor=${encodeURIComponent(this.conversationsCursor)}`
+                : '';
+            const response = await fetch(`/api/conversations${params}`);
             const data = await response.json();
-            this.updateChatHistory(data.conversations);
+            this.conversations = more ? this.conversations.concat(data.conversations) : data.conversations;
+            this.conversationsCursor = data.next_cursor;
+            this.updateChatHistory(this.conversations);
         } catch (error) {
             console.error('Error loading conversations:', error);
         }
@@ -62,6 +79,15 @@ class ChatApp {
                 </div>
             </div>
         `).join('');
+
+        if (this.conversationsCursor) {
+            this.chatHistory.insertAdjacentHTML('beforeend', `
+                <button class="w-full px-4 py-2 text-sm text-muted-foreground hover:bg-accent"
+                        onclick="chatApp.loadConversations(true)">
+                    Load more
+                </button>
+            `);
+        }
     }
 
     toggleThinkingIndicator(show) {
@@ -82,7 +108,7 @@ class ChatApp {
         });
 
         try {
-            const response = await fetch('/conversation', {
+            const response = await fetch('/api/conversation', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ title: 'New Chat: ' + formattedDate })
@@ -99,6 +125,7 @@ class ChatApp {
             );
 
             this.chatMessages.innerHTML = '';
+            this.olderMessagesCursor = null;
             await this.loadConversations();
         } catch (error) {
             console.error('Error creating new chat:', error);
@@ -107,7 +134,8 @@ class ChatApp {
 
     async loadConversation(conversationId) {
         try {
-            const response = await fetch(`/conversation/${conversationId}`);
+            // The newest page; older messages are fetched on scroll
+            const response = await fetch(`/api/conversation/${conversationId}`);
             if (!response.ok) {
                 throw new Error('Failed to fetch conversation');
             }
@@ -127,6 +155,7 @@ class ChatApp {
 
             this.welcomeMessage.style.display = 'none';
             this.chatMessages.innerHTML = '';
+            this.olderMessagesCursor = data.hasMore ? data.before : null;
             
             // Render messages
             data.conversation.forEach(msg => {
@@ -144,9 +173,42 @@ class ChatApp {
         }
     }
 
+    // Prepend the page of messages before the oldest one shown, keeping the scroll position
+    async loadOlderMessages() {
+        if (!this.olderMessagesCursor || this.loadingOlderMessages) return;
+        this.loadingOlderMessages = true;
+        const conversationId = this.currentConversationId;
+        try {
+            const response = await fetch(
+                `/api/conversation/${conversationId}?before=${encodeURIComponent(this.olderMessagesCursor)}`
+            );
+            if (!response.ok) {
+                throw new Error('Failed to fetch older messages');
+            }
+            const data = await response.json();
+            if (conversationId !== this.currentConversationId) return;
+
+            const previousHeight = this.chatMessages.scrollHeight;
+            this.chatMessages.insertAdjacentHTML(
+                'afterbegin',
+                data.conversation.map(msg => this.messageHTML(msg)).join('')
+            );
+            this.chatMessages.scrollTop += this.chatMessages.scrollHeight - previousHeight;
+            this.olderMessagesCursor = data.hasMore ? data.before : null;
+        } catch (error) {
+            console.error('Error loading older messages:', error);
+        } finally {
+            this.loadingOlderMessages = false;
+        }
+    }
+
     appendMessage(message) {
+        this.chatMessages.insertAdjacentHTML('beforeend', this.messageHTML(message));
+    }
+
+    messageHTML(message) {
         const isUser = message.role === 'user';
-        const messageHTML = `
+        return `
             <div class="chat-message ${isUser ? 'user' : 'assistant'}">
                 <div class="message-content">
                     ${message.content}
@@ -156,7 +218,6 @@ class ChatApp {
                 </div>
             </div>
         `;
-        this.chatMessages.insertAdjacentHTML('beforeend', messageHTML);
     }
 
     async handleSubmit(event) {
@@ -178,30 +239,82 @@ class ChatApp {
         this.toggleThinkingIndicator(true);
 
         try {
-            const response = await fetch(`/conversation/${this.currentConversationId}/chat`, {
+            const response = await fetch(`/api/conversation/${this.currentConversationId}/chat/stream`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    query: message,
-                    conversation_id: this.currentConversationId
-                })
+                body: JSON.stringify({ message })
             });
 
-            const data = await response.json();
-            this.toggleThinkingIndicator(false);
+            if (response.status === 503) {
+                // Still warming up; the user can retry once the assistant is ready
+                const retryAfter = response.headers.get('Retry-After') || 'a few';
+                this.appendMessage({
+                    role: 'assistant',
+                    content: `The assistant is still starting up. Please try again in ${retryAfter} seconds.`,
+                    timestamp: new Date()
+                });
+                this.toggleThinkingIndicator(false);
+                return;
+            }
 
+            if (!response.ok) {
+                throw new Error('Failed to send message');
+            }
+
+            // Render tokens into the assistant message as they arrive
             this.appendMessage({
                 role: 'assistant',
-                content: data.html,
+                content: '',
                 timestamp: new Date()
             });
+            const contentElement = this.chatMessages.lastElementChild.querySelector('.message-content');
+            let answer = '';
 
-            this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+            await this.readEventStream(response, (event, data) => {
+                if (event === 'token') {
+                    this.toggleThinkingIndicator(false);
+                    answer += data.token;
+                    contentElement.textContent = answer;
+                } else if (event === 'done') {
+                    contentElement.innerHTML = data.html;
+                } else if (event === 'error') {
+                    contentElement.textContent = `Error: ${data.error}`;
+                }
+                this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+            });
+
+            this.toggleThinkingIndicator(false);
         } catch (error) {
             console.error('Error sending message:', error);
             this.toggleThinkingIndicator(false);
         }
     }
+
+    async readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    }
 }
 
 // Initialize the chat application
@@ -0,0 +1,31 @@
+import pytest
+from flask import Flask
+from app.api import routes
+from app.database.manager import DatabaseManager
+from app.rag.manager import RAGManager
+from app.rag.memory import ConversationMemory
+from app.utils.warmup import LazyComponent
+
+
+@pytest.fixture
+def components(monkeypatch, rag_settings):
+    """Route components built from the test settings instead of the process-wide ones"""
+    db = LazyComponent("database", lambda: DatabaseManager(rag_settings.DB_URL))
+    rag = LazyComponent("rag", lambda: RAGManager(rag_settings))
+    memory = LazyComponent("memory", lambda: ConversationMemory(db.get(), rag.get().summarize))
+    monkeypatch.setattr(routes, "db_component", db)
+    monkeypatch.setattr(routes, "rag_component", rag)
+    monkeypatch.setattr(routes, "memory_component", memory)
+    return {"db": db, "rag": rag, "memory": memory}
+
+
+@pytest.fixture
+def client(components):
+    app = Flask(__name__)
+    app.register_blueprint(routes.api, url_prefix='/api')
+    # Build synchronously so requests never see a warming component.
+    components["db"].get()
+    components["rag"].get()
+    yield app.test_client()
+    components["memory"].get().close()
+    components["db"].get().close()
@@ -0,0 +1,64 @@
+import json
+import pytest
+
+
+def sse_events(body: str):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def new_conversation(client):
+    return client.post("/api/conversation", json={"title": "test"}).get_json()["id"]
+
+
+def test_chat_stream_sends_tokens_then_done(client):
+    conversation_id = new_conversation(client)
+    response = client.post(f"/api/conversation/{conversation_id}/chat/stream",
+                           json={"message": "Tell me about the Engineering team"})
+    assert response.status_code == 200
+    events = sse_events(response.get_data(as_text=True))
+    assert {name for name, _ in events[:-1]} == {"token"}
+    name, payload = events[-1]
+    assert name == "done"
+    assert payload["response"] == "".join(data["token"] for _, data in events[:-1]).strip()
+
+
+@pytest.mark.parametrize("route", ["chat", "chat/stream"])
+def test_full_queue_is_a_503(client, components, route):
+    scheduler = components["rag"].get().scheduler
+    scheduler.max_queue = 0
+    leases = [scheduler.acquire() for _ in range(scheduler.max_concurrency)]
+    conversation_id = new_conversation(client)
+    try:
+        response = client.post(f"/api/conversation/{conversation_id}/{route}",
+                               json={"message": "Tell me about the Engineering team"})
+    finally:
+        for lease in leases:
+            lease.release()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    # The rejected question is not stored.
+    assert client.get(f"/api/conversation/{conversation_id}").get_json()["conversation"] == []
+
+
+def test_chat_stream_releases_its_slot(client, components):
+    scheduler = components["rag"].get().scheduler
+    conversation_id = new_conversation(client)
+    for _ in range(scheduler.max_concurrency + 1):
+        response = client.post(f"/api/conversation/{conversation_id}/chat/stream",
+                               json={"message": "Tell me about the Engineering team"})
+        response.get_data()
+        response.close()
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_chat_rejects_unknown_filter_keys(client):
+    conversation_id = new_conversation(client)
+    response = client.post(f"/api/conversation/{conversation_id}/chat",
+                           json={"message": "What was revenue?", "filters": {"region": "EMEA"}})
+    assert response.status_code == 400
+    assert "region" in response.get_json()["error"]
+    assert client.get(f"/api/conversation/{conversation_id}").get_json()["conversation"] == []
@@ -0,0 +1,58 @@
+def add_messages(components, conversation_id, count):
+    db = components["db"].get()
+    for index in range(count):
+        db.add_message(conversation_id, "user", f"message {index}")
+
+
+def new_conversation(client):
+    return client.post("/api/conversation", json={"title": "test"}).get_json()["id"]
+
+
+def test_unchanged_conversation_is_a_304(client, components):
+    conversation_id = new_conversation(client)
+    add_messages(components, conversation_id, 2)
+
+    first = client.get(f"/api/conversation/{conversation_id}")
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+
+    second = client.get(f"/api/conversation/{conversation_id}",
+                        headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+    assert second.get_data() == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_new_message_changes_the_etag(client, components):
+    conversation_id = new_conversation(client)
+    add_messages(components, conversation_id, 1)
+    etag = client.get(f"/api/conversation/{conversation_id}").headers["ETag"]
+
+    add_messages(components, conversation_id, 1)
+    response = client.get(f"/api/conversation/{conversation_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.get_json()["conversation"]) == 2
+
+
+def test_each_page_has_its_own_etag(client, components):
+    conversation_id = new_conversation(client)
+    add_messages(components, conversation_id, 5)
+
+    newest = client.get(f"/api/conversation/{conversation_id}?limit=2")
+    page = newest.get_json()
+    assert page["hasMore"]
+    older = client.get(f"/api/conversation/{conversation_id}?limit=2&before={page['before']}",
+                       headers={"If-None-Match": newest.headers["ETag"]})
+    assert older.status_code == 200
+    assert older.headers["ETag"] != newest.headers["ETag"]
+    assert [m["content"] for m in older.get_json()["conversation"]] == ["<p>message 1</p>", "<p>message 2</p>"]
+
+
+def test_messages_stored_without_html_are_rendered(client, components):
+    conversation_id = new_conversation(client)
+    components["db"].get().add_message(conversation_id, "assistant", "**bold** <script>x</script>")
+
+    message = client.get(f"/api/conversation/{conversation_id}").get_json()["conversation"][0]
+    assert "<strong>bold</strong>" in message["content"]
+    assert "<script>" not in message["content"]
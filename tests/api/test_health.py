@@ -0,0 +1,21 @@
+from app.api import routes
+from app.rag.cache import ResponseCache
+from app.utils.health import HealthMonitor
+
+
+def test_deep_check_reaches_ollama_every_time(client, components, ollama_stub):
+    rag = components["rag"].get()
+    rag.response_cache = ResponseCache()
+    for _ in range(2):
+        response = client.get("/api/health?deep=1")
+        assert response.get_json()["components"]["end_to_end"]["status"] == "healthy"
+    assert ollama_stub.requests["/api/generate"] == 2
+    assert rag.response_cache.stats()["hits"] == 0
+
+
+def test_probes_do_not_start_a_build(components):
+    for name in ("database", "index", "ollama"):
+        result = HealthMonitor._check(routes.health_monitor._probes[name])
+        assert result["status"] == "cold"
+    assert components["db"].state == "cold"
+    assert components["rag"].state == "cold"
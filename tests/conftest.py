@@ -0,0 +1,37 @@
+import pytest
+from app.config import Settings
+from app.llm.stub import StubOllamaServer
+from app.utils.data_processor import create_sample_data
+
+
+@pytest.fixture
+def sample_data_dir(tmp_path):
+    """The sample employees, departments and financials CSVs in a fresh directory"""
+    data_dir = tmp_path / "data"
+    create_sample_data(data_dir)
+    return data_dir
+
+
+@pytest.fixture
+def ollama_stub():
+    with StubOllamaServer() as stub:
+        yield stub
+
+
+@pytest.fixture
+def rag_settings(tmp_path, sample_data_dir, ollama_stub):
+    """Settings with every file under tmp_path, the NumPy index, the Ollama stub and no answer caches"""
+    return Settings(
+        _env_file=None,
+        OLLAMA_BASE_URL=ollama_stub.url,
+        OLLAMA_MAX_RETRIES=0,
+        DATA_DIR=sample_data_dir,
+        DATA_CACHE_DIR=tmp_path / "data_cache",
+        CHROMA_DIR=tmp_path / "chroma",
+        NUMPY_INDEX_DIR=tmp_path / "numpy_index",
+        EMBEDDING_CACHE_PATH=tmp_path / "embedding_cache.sqlite3",
+        DB_URL=f"sqlite:///{tmp_path / 'conversations.db'}",
+        VECTOR_BACKEND="numpy",
+        RESPONSE_CACHE_ENABLED=False,
+        SEMANTIC_CACHE_ENABLED=False,
+    )
@@ -0,0 +1,97 @@
+import sqlite3
+import pytest
+from app.database.manager import DatabaseManager, create_schema
+
+
+def test_reopening_keeps_conversations(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'conversations.db'}"
+    create_schema(db_url)
+    first = DatabaseManager(db_url)
+    conversation = first.create_conversation("kept")
+    first.add_message(conversation["id"], "user", "hello")
+
+    # A second worker, or a restarted one, opens the same database.
+    second = DatabaseManager(db_url)
+    assert [conv["title"] for conv in second.get_conversations()["conversations"]] == ["kept"]
+    assert [msg["content"] for msg in second.get_conversation(conversation["id"])["messages"]] == ["hello"]
+    first.close()
+    second.close()
+
+
+def test_conversations_page_newest_first(tmp_path):
+    db = DatabaseManager(f"sqlite:///{tmp_path / 'conversations.db'}")
+    created = [db.create_conversation(f"c{i}")["id"] for i in range(5)]
+
+    seen, cursor = [], None
+    while True:
+        page = db.get_conversations(limit=2, cursor=cursor)
+        seen.extend(conv["id"] for conv in page["conversations"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == list(reversed(created))
+    db.close()
+
+
+def test_messages_page_back_and_forward(tmp_path):
+    db = DatabaseManager(f"sqlite:///{tmp_path / 'conversations.db'}")
+    conversation_id = db.create_conversation("paged")["id"]
+    for i in range(5):
+        db.add_message(conversation_id, "user", f"m{i}")
+
+    latest = db.get_conversation(conversation_id, limit=2)
+    assert [msg["content"] for msg in latest["messages"]] == ["m3", "m4"]
+    assert latest["has_more"]
+
+    older = db.get_conversation(conversation_id, limit=2, before=latest["before"])
+    assert [msg["content"] for msg in older["messages"]] == ["m1", "m2"]
+    oldest = db.get_conversation(conversation_id, limit=2, before=older["before"])
+    assert [msg["content"] for msg in oldest["messages"]] == ["m0"]
+    assert not oldest["has_more"] and oldest["before"] is None
+
+    db.add_message(conversation_id, "assistant", "m5")
+    delta = db.get_conversation(conversation_id, limit=10, since=latest["since"])
+    assert [msg["content"] for msg in delta["messages"]] == ["m5"]
+    db.close()
+
+
+def test_invalid_cursor_is_rejected(tmp_path):
+    db = DatabaseManager(f"sqlite:///{tmp_path / 'conversations.db'}")
+    with pytest.raises(ValueError):
+        db.get_conversations(cursor="not-a-cursor")
+    db.close()
+
+
+BASELINE_SCHEMA = """
+CREATE TABLE conversations (
+    id INTEGER NOT NULL, uuid VARCHAR(36) NOT NULL, start_time DATETIME NOT NULL,
+    end_time DATETIME, title VARCHAR(200) NOT NULL, PRIMARY KEY (id), UNIQUE (uuid)
+);
+CREATE TABLE messages (
+    id INTEGER NOT NULL, message_uuid VARCHAR(36) NOT NULL, conversation_id INTEGER NOT NULL,
+    timestamp DATETIME NOT NULL, role VARCHAR(50) NOT NULL, content TEXT NOT NULL,
+    PRIMARY KEY (id), UNIQUE (message_uuid), FOREIGN KEY(conversation_id) REFERENCES conversations (id)
+);
+INSERT INTO conversations VALUES (1, 'c-1', '2024-01-01 10:00:00', NULL, 'old');
+INSERT INTO messages VALUES (1, 'm-1', 1, '2024-01-01 10:00:01', 'user', 'hello');
+"""
+
+
+def test_database_with_the_original_schema_is_upgraded(tmp_path):
+    path = tmp_path / "conversations.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+
+    db_url = f"sqlite:///{path}"
+    create_schema(db_url)
+    db = DatabaseManager(db_url)
+    assert [conv["title"] for conv in db.get_conversations()["conversations"]] == ["old"]
+    assert [msg["content"] for msg in db.get_conversation(1)["messages"]] == ["hello"]
+    db.add_message(1, "assistant", "hi", html="<p>hi</p>")
+    db.update_summary(1, "greeted", 1)
+    assert db.get_memory(1, 1) == {"summary": "greeted", "summary_through": 1,
+                                   "recent": [{"id": 2, "role": "assistant", "content": "hi"}]}
+    db.close()
+
+    indexes = {row[0] for row in sqlite3.connect(path).execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"ix_conversations_start_time_id", "ix_messages_conversation_timestamp_id"} <= indexes
@@ -0,0 +1,28 @@
+from app.database.manager import DatabaseManager
+
+
+def test_write_behind_messages_are_read_back_in_order(tmp_path):
+    db = DatabaseManager(f"sqlite:///{tmp_path / 'conversations.db'}", write_behind=True, flush_interval=0.01)
+    conversation_id = db.create_conversation("queued")["id"]
+    for n in range(50):
+        db.add_message(conversation_id, "user", f"message {n}")
+
+    # Reads wait for the queue to drain.
+    messages = db.get_conversation(conversation_id)["messages"]
+    assert [msg["content"] for msg in messages] == [f"message {n}" for n in range(50)]
+    stats = db.writer.stats()
+    assert stats["written"] == 50 and stats["pending"] == 0 and stats["failed"] == 0
+    assert stats["batches"] < 50
+    db.close()
+
+
+def test_close_drains_the_queue(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'conversations.db'}"
+    db = DatabaseManager(db_url, write_behind=True, flush_interval=1.0)
+    conversation_id = db.create_conversation("queued")["id"]
+    db.add_message(conversation_id, "user", "last words")
+    db.close()
+
+    reopened = DatabaseManager(db_url)
+    assert [msg["content"] for msg in reopened.get_conversation(conversation_id)["messages"]] == ["last words"]
+    reopened.close()
@@ -0,0 +1,96 @@
+import socket
+import threading
+import time
+import pytest
+import requests
+from app.llm.client import OllamaClient, SingleFlight
+from app.llm.stub import StubOllamaServer
+
+
+def test_single_flight_shares_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flight.coalesced < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == ["result"] * 5
+
+    # Once finished, the same key runs again.
+    assert flight.do("key", lambda: "again") == "again"
+
+
+def test_single_flight_shares_the_error():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        release.wait(5)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flight.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.coalesced < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3 and len({id(error) for error in errors}) == 1
+
+
+def test_identical_concurrent_generations_reach_the_server_once():
+    with StubOllamaServer(first_token_delay=0.2) as stub:
+        client = OllamaClient(stub.url, max_retries=0)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(client.generate("llama3.2:1b", "same prompt")))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert stub.requests["/api/generate"] == 1
+        assert len({result["response"] for result in results}) == 1
+        assert client.stats()["coalesced"] == 3
+        client.close()
+
+
+def test_stream_and_embed_against_the_stub(ollama_stub):
+    client = OllamaClient(ollama_stub.url, max_retries=0)
+    chunks = list(client.stream_generate("llama3.2:1b", "hello"))
+    assert chunks[-1]["done"] and not any(chunk["done"] for chunk in chunks[:-1])
+    vectors = client.embed("mxbai-embed-large:latest", ["a", "b"])
+    assert len(vectors) == 2 and len(vectors[0]) == ollama_stub.dim
+    client.close()
+
+
+def test_connection_failures_are_retried_then_raised():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    client = OllamaClient(f"http://127.0.0.1:{port}", max_retries=2, backoff=0)
+    with pytest.raises(requests.ConnectionError):
+        client.generate("llama3.2:1b", "hello")
+    assert client.stats() == {"requests": 3, "retries": 2, "errors": 1, "coalesced": 0}
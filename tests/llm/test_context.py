@@ -0,0 +1,38 @@
+from app.llm.context import ContextStore
+
+
+def test_context_continues_only_at_its_turn():
+    store = ContextStore(max_conversations=4, max_tokens=100)
+    store.put("a", [1, 2, 3], turn=2)
+    assert store.get("a", 2) == [1, 2, 3]
+    assert store.get("a", 4) is None
+    # A stale context is dropped, not kept for later.
+    assert store.get("a", 2) is None
+    assert store.stats()["stale"] == 1
+
+
+def test_context_continues_only_under_its_instructions():
+    store = ContextStore()
+    store.put("a", [1, 2, 3], turn=2, instructions="financial")
+    assert store.get("a", 2, instructions="employee") is None
+    assert store.stats()["stale"] == 1
+    store.put("a", [1, 2, 3], turn=2, instructions="financial")
+    assert store.get("a", 2, instructions="financial") == [1, 2, 3]
+
+
+def test_long_contexts_start_over():
+    store = ContextStore(max_tokens=2)
+    store.put("a", [1, 2, 3], turn=2)
+    assert store.get("a", 2) is None
+    assert store.stats()["resets"] == 1
+
+
+def test_least_recently_used_conversations_are_evicted():
+    store = ContextStore(max_conversations=2)
+    store.put("a", [1], turn=2)
+    store.put("b", [2], turn=2)
+    store.get("a", 2)
+    store.put("c", [3], turn=2)
+    assert store.get("b", 2) is None
+    assert store.get("a", 2) == [1]
+    assert store.get("c", 2) == [3]
@@ -0,0 +1,90 @@
+import threading
+import time
+import pytest
+from app.llm.scheduler import GenerationScheduler, LeasedIterator
+from app.utils.warmup import ComponentUnavailable
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def admission_order(scheduler, requests):
+    """Queue (conversation_id, priority) requests behind a held slot, in order, and record who runs when"""
+    order = []
+    order_lock = threading.Lock()
+
+    def generate(conversation_id, priority, label):
+        with scheduler.slot(conversation_id, priority):
+            with order_lock:
+                order.append(label)
+
+    blocker = scheduler.acquire("blocker")
+    threads = []
+    for label, (conversation_id, priority) in enumerate(requests):
+        thread = threading.Thread(target=generate, args=(conversation_id, priority, label))
+        thread.start()
+        threads.append(thread)
+        wait_for(lambda: scheduler.stats()["queue_depth"] == len(threads))
+    blocker.release()
+    for thread in threads:
+        thread.join(5)
+    return order
+
+
+def test_round_robin_across_conversations():
+    scheduler = GenerationScheduler(max_concurrency=1, max_queue=10, timeout=5)
+    order = admission_order(scheduler, [("a", 0), ("a", 0), ("a", 0), ("b", 0), ("c", 0)])
+    # A busy conversation gets one turn per rotation instead of draining first.
+    assert order == [0, 3, 4, 1, 2]
+
+
+def test_lower_priority_value_runs_first():
+    scheduler = GenerationScheduler(max_concurrency=1, max_queue=10, timeout=5)
+    assert admission_order(scheduler, [("summary", 5), ("user", 0)]) == [1, 0]
+
+
+def test_full_queue_is_rejected():
+    scheduler = GenerationScheduler(max_concurrency=1, max_queue=0, timeout=5)
+    lease = scheduler.acquire()
+    with pytest.raises(ComponentUnavailable) as error:
+        scheduler.acquire()
+    assert error.value.state == "saturated"
+    lease.release()
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_wait_times_out():
+    scheduler = GenerationScheduler(max_concurrency=1, max_queue=5, timeout=0.05)
+    lease = scheduler.acquire()
+    with pytest.raises(ComponentUnavailable):
+        scheduler.acquire()
+    lease.release()
+    stats = scheduler.stats()
+    assert stats["timed_out"] == 1 and stats["queue_depth"] == 0 and stats["in_flight"] == 0
+
+
+def test_lease_release_is_idempotent():
+    scheduler = GenerationScheduler(max_concurrency=1)
+    lease = scheduler.acquire()
+    lease.release()
+    lease.release()
+    assert scheduler.stats()["in_flight"] == 0
+    scheduler.acquire().release()
+
+
+def test_leased_iterator_releases_when_exhausted_or_closed():
+    scheduler = GenerationScheduler(max_concurrency=1)
+    tokens = LeasedIterator(iter(["a", "b"]), scheduler.acquire())
+    assert list(tokens) == ["a", "b"]
+    assert scheduler.stats()["in_flight"] == 0
+
+    def never_started():
+        yield "a"
+
+    tokens = LeasedIterator(never_started(), scheduler.acquire())
+    tokens.close()
+    assert scheduler.stats()["in_flight"] == 0
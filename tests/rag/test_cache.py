@@ -0,0 +1,65 @@
+from app.rag.cache import ResponseCache, SemanticCache
+
+
+def test_semantic_cache_matches_similar_questions():
+    cache = SemanticCache(threshold=0.9, max_entries=4)
+    cache.store([1.0, 0.0, 0.0], "answer", version="v1")
+    assert cache.lookup([0.99, 0.05, 0.0], version="v1") == "answer"
+    assert cache.lookup([0.0, 1.0, 0.0], version="v1") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_semantic_cache_clears_on_a_new_version():
+    cache = SemanticCache(threshold=0.9)
+    cache.store([1.0, 0.0], "stale", version="v1")
+    assert cache.lookup([1.0, 0.0], version="v2") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_semantic_cache_evicts_least_recently_used():
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    cache.store([1.0, 0.0, 0.0], "a", version="v")
+    cache.store([0.0, 1.0, 0.0], "b", version="v")
+    cache.lookup([1.0, 0.0, 0.0], version="v")
+    cache.store([0.0, 0.0, 1.0], "c", version="v")
+    assert cache.lookup([0.0, 1.0, 0.0], version="v") is None
+    assert cache.lookup([1.0, 0.0, 0.0], version="v") == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_response_cache_key_normalizes_the_question():
+    key = ResponseCache.make_key("What is the  total budget?", "m", 0.7, 0.9, 10, "department", "v1")
+    assert key == ResponseCache.make_key("what is the total budget", "m", 0.7, 0.9, 10, "department", "v1")
+    assert key != ResponseCache.make_key("what is the total budget", "m", 0.7, 0.9, 10, "department", "v2")
+
+
+def test_response_cache_counts_each_tier(tmp_path):
+    shared_path = tmp_path / "responses.sqlite3"
+    worker = ResponseCache(max_entries=1, shared_path=shared_path, shared_max_entries=2)
+    other = ResponseCache(max_entries=1, shared_path=shared_path, shared_max_entries=2)
+
+    worker.put("a", "A")
+    worker.put("b", "B")  # pushes "a" out of the local tier
+    worker.put("c", "C")  # and out of the shared one
+    assert worker.get("c") == "C"
+    assert other.get("b") == "B"  # answered by the shared tier
+    assert other.get("a") is None
+
+    stats = worker.stats()
+    assert stats["local"]["evictions"] == 2 and stats["shared"]["evictions"] == 1
+    assert stats["local"]["hits"] == 1 and stats["hit_rate"] == 1.0
+
+    stats = other.stats()
+    assert stats["shared"]["hits"] == 1 and stats["local"]["hits"] == 0
+    assert stats["shared"]["hit_rate"] == 0.5 and stats["hit_rate"] == 0.5
+    assert stats["shared"]["entries"] == 2
+
+
+def test_response_cache_without_a_shared_tier():
+    cache = ResponseCache(max_entries=4)
+    assert cache.get("a") is None
+    cache.put("a", "A")
+    assert cache.get("a") == "A"
+    assert cache.stats()["shared"] is None
+    assert cache.stats()["hit_rate"] == 0.5
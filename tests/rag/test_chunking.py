@@ -0,0 +1,55 @@
+from app.rag.chunking import chunk_documents, estimate_tokens, pack_context, parent_of, split_text
+
+TEXT = " ".join(f"word{n:02d}" for n in range(20))  # 20 words of 6 characters
+
+
+def test_split_respects_size_and_word_boundaries():
+    chunks = split_text(TEXT, chunk_size=20)
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert " ".join(chunks) == TEXT
+
+
+def test_split_overlaps_whole_words():
+    chunks = split_text(TEXT, chunk_size=20, overlap=6)
+    assert chunks[0] == "word00 word01 word02"
+    assert chunks[1] == "word02 word03 word04"
+
+
+def test_long_word_is_its_own_chunk():
+    assert split_text("a " + "x" * 30 + " b", chunk_size=10) == ["a", "x" * 30, "b"]
+
+
+def test_short_documents_pass_through_unchanged():
+    documents = [("emp-1", "short text", {"department": "Sales"})]
+    assert list(chunk_documents(documents, chunk_size=100)) == documents
+
+
+def test_long_documents_become_numbered_chunks():
+    chunks = list(chunk_documents([("emp-1", TEXT, {"department": "Sales"})], chunk_size=20))
+    assert [doc_id for doc_id, _, _ in chunks] == [f"emp-1#{n}" for n in range(len(chunks))]
+    assert all(meta == {"department": "Sales", "parent_id": "emp-1", "chunk": n}
+               for n, (_, _, meta) in enumerate(chunks))
+    assert parent_of(chunks[1][0]) == "emp-1"
+    assert parent_of("emp-1") is None
+
+
+def test_pack_prefers_the_best_hits_within_budget():
+    hits = [("low " * 10, 0.1, None), ("best", 0.9, None), ("long " * 50, 0.5, None), ("middle", 0.4, None)]
+    packed = pack_context(hits, budget=20)
+    # The long chunk does not fit; the lower-scored short ones still do.
+    assert packed == ["best", "middle", ("low " * 10).strip()]
+    assert sum(estimate_tokens(text) + 1 for text in packed) <= 20
+
+
+def test_pack_drops_duplicates_and_contained_chunks():
+    hits = [("alpha beta gamma", 0.9, None), ("alpha beta gamma", 0.8, None), ("beta", 0.7, None)]
+    assert pack_context(hits, budget=100) == ["alpha beta gamma"]
+
+
+def test_pack_trims_overlap_between_siblings():
+    first, second = split_text(TEXT, chunk_size=20, overlap=6)[:2]
+    packed = pack_context([(second, 0.9, "emp-1"), (first, 0.8, "emp-1")], budget=100, max_overlap=6)
+    assert packed == [second, "word00 word01"]
+    # Chunks of different documents are never trimmed.
+    packed = pack_context([(second, 0.9, "emp-1"), (first, 0.8, "emp-2")], budget=100, max_overlap=6)
+    assert packed == [second, first]
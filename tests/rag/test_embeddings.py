@@ -0,0 +1,54 @@
+from app.rag.embeddings import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.texts = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.texts.append(text)
+        return [float(len(text)), 1.0]
+
+
+def test_replacing_vectors_does_not_grow_the_cache(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite3", max_bytes=1 << 20)
+    cache.put_many("m", {"a": [1.0, 2.0], "b": [3.0, 4.0]})
+    cache.put_many("m", {"a": [5.0, 6.0], "c": [7.0, 8.0]})
+    assert cache.stats()["entries"] == 3
+    assert cache.stats()["bytes"] == 3 * 8
+    assert cache.get_many("m", ["a"]) == {"a": [5.0, 6.0]}
+    cache.close()
+
+    # The counters are rebuilt from the table on reopen.
+    reopened = EmbeddingCache(tmp_path / "embeddings.sqlite3", max_bytes=1 << 20)
+    assert reopened.stats()["entries"] == 3 and reopened.stats()["bytes"] == 3 * 8
+    reopened.close()
+
+
+def test_least_recently_used_vectors_are_evicted(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite3", max_bytes=10 * 8)
+    cache.put_many("m", {f"v{i}": [float(i), 0.0] for i in range(10)})
+    assert cache.stats()["evictions"] == 0
+    cache.put_many("m", {"v9": [9.0, 1.0]})
+    assert cache.stats()["evictions"] == 0
+    cache.put_many("m", {"new": [1.0, 1.0]})
+    stats = cache.stats()
+    assert stats["evictions"] > 0 and stats["bytes"] <= 9 * 8
+    cache.close()
+
+
+def test_only_cache_misses_are_embedded(tmp_path):
+    base = CountingEmbeddings()
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite3", max_bytes=1 << 20)
+    embeddings = CachedEmbeddings(base, model="m", cache=cache, batch_size=2, max_concurrency=2)
+
+    first = embeddings.embed_documents(["one", "two", "three", "two"])
+    assert sorted(base.texts) == ["one", "three", "two"]
+    second = embeddings.embed_documents(["two", "four", "one"])
+    assert base.texts[3:] == ["four"]
+    assert second[0] == first[1] and second[2] == first[0]
+    cache.close()
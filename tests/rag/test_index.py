@@ -0,0 +1,90 @@
+import json
+import re
+from app.rag.index import IndexManifest, content_hash, sync_index
+from app.rag.manager import RAGManager
+
+
+class FakeStore:
+    """Records what sync_index writes, in place of a vector store."""
+
+    def __init__(self):
+        self.texts = {}
+        self.added = []
+
+    def add_texts(self, texts, metadatas, ids):
+        self.added.extend(ids)
+        self.texts.update(zip(ids, texts))
+
+    def delete(self, ids):
+        for doc_id in ids:
+            del self.texts[doc_id]
+
+
+def documents(**texts):
+    return [(doc_id, text, {"kind": "employee"}) for doc_id, text in texts.items()]
+
+
+def test_resync_embeds_only_changes(tmp_path):
+    store = FakeStore()
+    manifest = IndexManifest(tmp_path / "manifest.json", "model")
+    stats = sync_index(store, documents(a="one", b="two", c="three"), manifest, "v1")
+    assert stats == {"added": 3, "updated": 0, "unchanged": 0, "deleted": 0}
+
+    store.added.clear()
+    manifest = IndexManifest.load(tmp_path / "manifest.json", "model")
+    stats = sync_index(store, documents(a="one", b="TWO", d="four"), manifest, "v2", batch_size=1)
+    assert stats == {"added": 1, "updated": 1, "unchanged": 1, "deleted": 1}
+    assert sorted(store.added) == ["b", "d"]
+    assert store.texts == {"a": "one", "b": "TWO", "d": "four"}
+
+
+def test_manifest_round_trip(tmp_path):
+    path = tmp_path / "manifest.json"
+    sync_index(FakeStore(), documents(a="one"), IndexManifest(path, "model"), "v1")
+
+    manifest = IndexManifest.load(path, "model")
+    assert manifest.is_current("v1")
+    assert not manifest.is_current("v2")
+    assert manifest.documents == {"a": content_hash("one", {"kind": "employee"})}
+    assert json.loads(path.read_text())["dataset_fingerprint"] == "v1"
+
+
+def test_manifest_for_another_model_starts_empty(tmp_path):
+    path = tmp_path / "manifest.json"
+    sync_index(FakeStore(), documents(a="one"), IndexManifest(path, "model"), "v1")
+    assert IndexManifest.load(path, "other-model").documents == {}
+
+    path.write_text("{not json")
+    assert IndexManifest.load(path, "model").documents == {}
+
+
+def test_restart_resyncs_only_changed_rows(rag_settings, ollama_stub, caplog):
+    caplog.set_level("INFO")
+    RAGManager(rag_settings)
+    assert "Vector index synced: " in caplog.text
+
+    caplog.clear()
+    rag = RAGManager(rag_settings)
+    assert "Vector index is up to date" in caplog.text
+    size = len(rag.vectorstore)
+
+    with open(rag_settings.DATA_DIR / "financials.csv", "a") as f:
+        f.write("13,1,2023,4,390000,310000,80000\n")
+    caplog.clear()
+    rag = RAGManager(rag_settings)
+    # The new row's documents are embedded; every existing one is left alone.
+    added = int(re.search(r"Vector index synced: (\d+) added, 0 updated, (\d+) unchanged, 0 deleted",
+                          caplog.text).group(1))
+    assert added > 0
+    assert len(rag.vectorstore) == size + added
+
+
+def test_changing_the_chunk_size_rechunks_the_index(rag_settings, ollama_stub):
+    whole = RAGManager(rag_settings)
+    assert not any("#" in doc_id for doc_id in whole.vectorstore.get()["ids"])
+
+    rag = RAGManager(rag_settings.model_copy(update={"CHUNK_SIZE": 80, "CHUNK_OVERLAP": 10}))
+    vector_ids = set(rag.vectorstore.get()["ids"])
+    assert vector_ids and all("#" in doc_id for doc_id in vector_ids)
+    # Both retrievers see the same documents.
+    assert vector_ids == set(rag.keyword_index.doc_ids)
@@ -0,0 +1,46 @@
+import pytest
+from app.rag.keyword import BM25Index, fused_scores, reciprocal_rank_fusion
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.add_many([
+        ("a", "Jane Doe is a Senior Engineer in Engineering", {"department": "Engineering", "year": 2023}),
+        ("b", "John Smith is a Sales Manager in Sales", {"department": "Sales", "year": 2023}),
+        ("c", "Sales revenue in Q3 was high", {"department": "Sales", "year": 2022}),
+        ("d", "Engineering revenue in Q3 was low", {"department": "Engineering", "year": 2022}),
+    ])
+    index.build()
+    return index
+
+
+def test_exact_terms_rank_first(index):
+    assert [doc_id for doc_id, _, _ in index.search("John Smith")] == ["b"]
+    doc_ids = [doc_id for doc_id, _, _ in index.search("sales revenue")]
+    assert doc_ids[0] == "c"
+    assert set(doc_ids) == {"b", "c", "d"}
+
+
+def test_filter_and_unknown_terms(index):
+    assert [doc_id for doc_id, _, _ in index.search("revenue", filter={"year": "2022", "department": "Sales"})] == ["c"]
+    assert index.search("kubernetes") == []
+
+
+def test_documents_added_after_build_become_searchable(index):
+    index.add("e", "Kubernetes migration plan", {"department": "Engineering"})
+    assert index.search("kubernetes") == []
+    index.build()
+    assert [doc_id for doc_id, _, _ in index.search("kubernetes")] == ["e"]
+
+
+def test_names_are_keyword_queries(index):
+    assert index.is_keyword_query("Jane Doe")
+    assert not index.is_keyword_query("what about the revenue in Q3")
+
+
+def test_reciprocal_rank_fusion():
+    rankings = [["a", "b", "c"], ["b", "c", "a"], ["b"]]
+    assert reciprocal_rank_fusion(rankings) == ["b", "a", "c"]
+    scores = dict(fused_scores(rankings, k=0))
+    assert scores["b"] == pytest.approx(1 / 2 + 1 + 1)
@@ -0,0 +1,78 @@
+from app.rag.manager import RAGManager
+
+
+def test_context_reuse_against_the_stub(rag_settings, ollama_stub):
+    rag = RAGManager(rag_settings)
+    store = rag.context_store
+
+    rag.query("Tell me about the Engineering team", conversation_id=1, turn=0)
+    first = store.stats()
+    assert first["turns"] == 1 and first["reused_turns"] == 0
+
+    # The next turn continues from the returned context: the instructions are
+    # not sent again, so far fewer prompt tokens are evaluated.
+    rag.query("And the Sales team?", conversation_id=1, history="User: ...\nAssistant: ...", turn=2)
+    second = store.stats()
+    assert second["reused_turns"] == 1
+    assert second["reused_tokens"] > 0
+    assert second["evaluated_tokens"] - first["evaluated_tokens"] < first["evaluated_tokens"]
+
+
+def test_stale_context_is_not_reused(rag_settings, ollama_stub):
+    rag = RAGManager(rag_settings)
+    rag.query("Tell me about the Engineering team", conversation_id=1, turn=0)
+
+    # Another worker answered turn 2, so this process's context misses it.
+    rag.query("And the Marketing team?", conversation_id=1, turn=4)
+    stats = rag.context_store.stats()
+    assert stats["stale"] == 1
+    assert stats["reused_turns"] == 0
+
+
+def test_context_is_not_reused_under_other_instructions(rag_settings, ollama_stub):
+    rag = RAGManager(rag_settings)
+    rag.query("Tell me about the Engineering team", query_type="department", conversation_id=1, turn=0)
+    rag.query("And its salaries?", query_type="employee", conversation_id=1, turn=2)
+    stats = rag.context_store.stats()
+    assert stats["stale"] == 1
+    assert stats["reused_turns"] == 0
+
+
+def test_no_reuse_without_a_turn(rag_settings, ollama_stub):
+    rag = RAGManager(rag_settings)
+    rag.query("Tell me about the Engineering team", conversation_id=1)
+    rag.query("And the Sales team?", conversation_id=1)
+    assert rag.context_store.stats()["reused_turns"] == 0
+
+
+def test_editing_the_data_invalidates_cached_answers(rag_settings, ollama_stub):
+    settings = rag_settings.model_copy(update={"RESPONSE_CACHE_ENABLED": True, "SEMANTIC_CACHE_ENABLED": True})
+    rag = RAGManager(settings)
+    question = "Tell me about the Engineering team"
+
+    rag.query(question)
+    rag.query(question)
+    assert ollama_stub.requests["/api/generate"] == 1
+
+    with open(settings.DATA_DIR / "financials.csv", "a") as f:
+        f.write("13,1,2023,4,390000,310000,80000\n")
+    rag.query(question)
+    assert ollama_stub.requests["/api/generate"] == 2
+    assert rag.semantic_cache.stats()["entries"] == 1
+
+
+def test_standalone_questions_are_cached_across_conversations(rag_settings, ollama_stub):
+    settings = rag_settings.model_copy(update={"RESPONSE_CACHE_ENABLED": True, "SEMANTIC_CACHE_ENABLED": True})
+    rag = RAGManager(settings)
+    question = "Tell me about the Engineering team"
+
+    first = rag.query(question, conversation_id=1, turn=0)
+    # A later turn of another conversation has history, but the question stands on its own.
+    assert rag.query(question, conversation_id=2, history="User: hi\nAssistant: hello", turn=2) == first
+    assert ollama_stub.requests["/api/generate"] == 1
+
+    follow_up = "What about its budget?"
+    rag.query(follow_up, conversation_id=1, history="User: Tell me about Sales\nAssistant: ...", turn=2)
+    rag.query(follow_up, conversation_id=2, history="User: Tell me about HR\nAssistant: ...", turn=4)
+    assert ollama_stub.requests["/api/generate"] == 3
+    assert rag.cache_stats()["follow_ups"] == 2
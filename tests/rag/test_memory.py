@@ -0,0 +1,58 @@
+import pytest
+from app.database.manager import DatabaseManager
+from app.rag.memory import ConversationMemory
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(f"sqlite:///{tmp_path / 'conversations.db'}")
+    yield db
+    db.close()
+
+
+def fill(db, turns):
+    conversation_id = db.create_conversation("memory")["id"]
+    for n in range(turns):
+        db.add_message(conversation_id, "user", f"question {n}")
+        db.add_message(conversation_id, "assistant", f"answer {n}")
+    return conversation_id
+
+
+class Summarizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, summary, transcript):
+        self.calls.append(transcript)
+        return f"{summary} +{transcript.count('User:')}".strip()
+
+
+def test_new_conversation_has_no_history(db):
+    memory = ConversationMemory(db, Summarizer())
+    assert memory.history(db.create_conversation("empty")["id"]) == ""
+    memory.close()
+
+
+def test_history_keeps_only_the_recent_turns_verbatim(db):
+    conversation_id = fill(db, 5)
+    memory = ConversationMemory(db, Summarizer(), turns=2)
+    assert memory.history(conversation_id) == (
+        "User: question 3\nAssistant: answer 3\nUser: question 4\nAssistant: answer 4"
+    )
+    memory.close()
+
+
+def test_older_turns_are_folded_into_the_summary_in_batches(db):
+    conversation_id = fill(db, 5)
+    summarize = Summarizer()
+    memory = ConversationMemory(db, summarize, turns=2, batch_size=4)
+    memory.schedule_update(conversation_id)
+    memory.close()
+
+    # Three turns left the window: two in the first batch, one in the second.
+    assert len(summarize.calls) == 2
+    assert summarize.calls[0].startswith("User: question 0")
+    history = memory.history(conversation_id)
+    assert history.startswith("Summary of earlier conversation: +2 +1\nUser: question 3")
+    # Nothing new left the window, so there is nothing to fold.
+    assert memory.update(conversation_id) is False
@@ -0,0 +1,68 @@
+import pytest
+from app.rag.numpy_store import NumpyVectorStore
+
+WORDS = ("sales", "engineering", "revenue", "salary")
+
+
+class WordEmbeddings:
+    """One dimension per known word, so nearest neighbours are predictable."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        words = text.lower().split()
+        return [float(words.count(word)) + 0.01 for word in WORDS]
+
+
+def build(quantization="float32", directory=None):
+    store = NumpyVectorStore(WordEmbeddings(), persist_directory=directory, quantization=quantization)
+    store.add_texts(
+        ["sales revenue", "engineering salary", "sales salary", "engineering revenue"],
+        metadatas=[{"department": "Sales", "year": 2023}, {"department": "Engineering"},
+                   {"department": "Sales"}, {"department": "Engineering", "year": 2023}],
+        ids=["a", "b", "c", "d"],
+    )
+    return store
+
+
+def top_texts(store, query, **kwargs):
+    return [doc.page_content for doc in store.similarity_search(query, k=2, **kwargs)]
+
+
+@pytest.mark.parametrize("quantization", ["float32", "float16", "int8"])
+def test_nearest_neighbours(quantization):
+    store = build(quantization)
+    assert top_texts(store, "sales revenue")[0] == "sales revenue"
+    assert top_texts(store, "engineering salary")[0] == "engineering salary"
+
+
+def test_filter_restricts_the_rows_scored():
+    store = build()
+    assert top_texts(store, "sales revenue", filter={"department": "Engineering"}) == [
+        "engineering revenue", "engineering salary"]
+    assert set(top_texts(store, "salary", filter={"year": "2023"})) == {"sales revenue", "engineering revenue"}
+
+
+def test_upsert_and_delete():
+    store = build()
+    store.add_texts(["engineering salary"], ids=["a"])
+    store.delete(ids=["b"])
+    assert len(store) == 3
+    assert sorted(store.get()["ids"]) == ["a", "c", "d"]
+    assert top_texts(store, "sales revenue")[0] != "sales revenue"
+
+
+def test_save_and_reload(tmp_path):
+    store = build("int8", tmp_path)
+    store.delete(ids=["c"])
+    store.save()
+
+    reloaded = NumpyVectorStore(WordEmbeddings(), persist_directory=tmp_path, quantization="int8")
+    assert sorted(reloaded.get()["ids"]) == ["a", "b", "d"]
+    assert top_texts(reloaded, "sales salary") == top_texts(store, "sales salary")
+
+
+def test_unknown_quantization_is_rejected():
+    with pytest.raises(ValueError):
+        NumpyVectorStore(WordEmbeddings(), quantization="int4")
@@ -0,0 +1,36 @@
+import pytest
+from app.rag.partitions import PartitionIndex, normalize_filters
+
+
+def test_numeric_filters_are_coerced_to_int():
+    assert normalize_filters({"year": "2023", "quarter": ["Q3", "4", 1.0], "department_id": " 2 "}) == {
+        "year": [2023],
+        "quarter": [1, 3, 4],
+        "department_id": [2],
+    }
+
+
+def test_empty_values_are_dropped():
+    assert normalize_filters({"department": None, "year": [], "quarter": [None]}) == {}
+    assert normalize_filters(None) == {}
+
+
+@pytest.mark.parametrize("filters", [
+    {"region": "EMEA"},
+    {"year": "last year"},
+    {"quarter": 2.5},
+    {"year": True},
+])
+def test_invalid_filters_raise(filters):
+    with pytest.raises(ValueError):
+        normalize_filters(filters)
+
+
+def test_coerced_filters_match_stored_metadata():
+    index = PartitionIndex()
+    index.add(0, {"department": "Sales", "year": 2023, "quarter": 3})
+    index.add(1, {"department": "Sales", "year": 2022, "quarter": 3})
+    index.add(2, {"department": "Engineering", "year": 2023, "quarter": 3})
+
+    rows = index.rows(normalize_filters({"department": "Sales", "year": "2023", "quarter": "Q3"}))
+    assert rows.tolist() == [0]
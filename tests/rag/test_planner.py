@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+from app.rag.planner import StructuredQueryPlanner
+from app.utils.columnar_cache import ColumnarCache
+from app.utils.data_processor import iter_merged, optimize_dtypes
+
+
+def from_cache(data_dir, cache_dir):
+    pytest.importorskip("pyarrow")
+    cache = ColumnarCache(cache_dir, data_dir)
+    cache.store_chunks(optimize_dtypes(merged) for merged in iter_merged(data_dir, chunksize=4))
+    return StructuredQueryPlanner.from_merged(cache.load(columns=StructuredQueryPlanner.MERGED_COLUMNS))
+
+
+@pytest.fixture(params=["csv", "cache"])
+def planner(request, sample_data_dir, tmp_path):
+    """The planner built from the CSVs and from the memory-mapped merged dataset"""
+    if request.param == "csv":
+        return StructuredQueryPlanner.from_csv(sample_data_dir)
+    return from_cache(sample_data_dir, tmp_path / "cache")
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What is the total budget?", "Total budget: $2,800,000"),
+    ("What is the average salary in Engineering?", "Average salary (Engineering): $100,000.00"),
+    ("How many employees are in Sales?", "Number of employees (Sales): 3"),
+    ("What was the total revenue in Q3 2023?", "Total revenue (Q3 2023): $1,280,000"),
+    ("Who has the highest salary?", "Jane Doe has the highest salary: $150,000"),
+    ("Q3 profit for Sales", "Profit (Sales Q3): $130,000"),
+    ("What was the Q3 profit for Sales?", "Profit (Sales Q3): $130,000"),
+    ("What was Engineering revenue in the second quarter of 2023?", "Revenue (Engineering Q2 2023): $350,000"),
+])
+def test_answers_aggregates(planner, question, expected):
+    assert planner.answer(question) == expected
+
+
+def test_grouping_implies_total(planner):
+    answer = planner.answer("Profit by quarter")
+    assert answer.splitlines() == ["Total profit by quarter:", "- Q1: $220,000", "- Q2: $300,000", "- Q3: $330,000"]
+
+
+@pytest.mark.parametrize("question", [
+    "Does Sales have a bigger budget than Marketing?",
+    "How did Sales revenue change from Q1 to Q2 2023?",
+    "What was the profit margin in Q2?",
+    "Is Engineering over budget?",
+    "Which department had the highest profit in Q3?",
+    "Who has the highest budget?",
+    "What is the Engineering budget?",
+    "What were Sales expenses in 2023?",
+    "What was the Q3 profit for Sales and Marketing?",
+    "What was the profit in Q3?",
+    "What is John Smith's salary?",
+])
+def test_falls_through_without_an_explicit_aggregate(planner, question):
+    assert planner.answer(question) is None
+
+
+def test_scope_names_departments_and_periods(planner):
+    assert planner.scope("Sales revenue in the second quarter of 2023") == {
+        "department": ["Sales"], "year": [2023], "quarter": [2],
+    }
+
+
+def test_rows_of_unknown_departments_are_ignored(sample_data_dir, tmp_path):
+    employees = pd.read_csv(sample_data_dir / "employees.csv")
+    orphan = employees.iloc[[0]].assign(department_id=999, salary=1_000_000)
+    pd.concat([employees, orphan]).to_csv(sample_data_dir / "employees.csv", index=False)
+
+    for planner in (StructuredQueryPlanner.from_csv(sample_data_dir), from_cache(sample_data_dir, tmp_path / "cache")):
+        assert planner.answer("What is the highest salary?") == "Highest salary: $150,000"
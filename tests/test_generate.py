@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from app.rag.planner import StructuredQueryPlanner
+from app.utils.data_processor import iter_documents
+from generate import generate_dataset, parse_years
+
+
+def read(directory):
+    return {table: (directory / f"{table}.csv").read_bytes() for table in ("departments", "employees", "financials")}
+
+
+def test_same_seed_same_dataset(tmp_path):
+    counts = generate_dataset(tmp_path / "a", 250, 6, years=[2022, 2023], seed=7, chunk_size=100)
+    generate_dataset(tmp_path / "b", 250, 6, years=[2022, 2023], seed=7, chunk_size=100)
+    generate_dataset(tmp_path / "c", 250, 6, years=[2022, 2023], seed=8, chunk_size=100)
+    assert counts == {"departments": 6, "employees": 250, "financials": 6 * 8}
+    assert read(tmp_path / "a") == read(tmp_path / "b")
+    assert read(tmp_path / "a") != read(tmp_path / "c")
+
+
+def test_output_matches_the_app_schema(tmp_path):
+    generate_dataset(tmp_path, 120, 10, years=[2023], chunk_size=50)
+    employees = pd.read_csv(tmp_path / "employees.csv")
+    assert employees["id"].is_unique and len(employees) == 120
+    # Employee N heads department N; everyone else reports to their head.
+    heads = employees[employees["manager_id"].isna()]
+    assert sorted(heads["id"]) == sorted(heads["department_id"]) == list(range(1, 11))
+    others = employees[employees["manager_id"].notna()]
+    assert (others["manager_id"] == others["department_id"]).all()
+
+    # The app ingests and plans over it unchanged.
+    assert len(list(iter_documents(tmp_path, chunksize=40))) > 120
+    planner = StructuredQueryPlanner.from_csv(tmp_path)
+    assert planner.answer("How many employees are there?") == "Number of employees: 120"
+
+
+def test_too_few_employees_to_head_every_department(tmp_path):
+    with pytest.raises(ValueError):
+        generate_dataset(tmp_path, 3, 5)
+
+
+def test_parse_years():
+    assert parse_years("2023") == [2023]
+    assert parse_years("2020-2022") == [2020, 2021, 2022]
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from app.rag.manager import RAGManager
+from app.utils.columnar_cache import ColumnarCache
+from app.utils.data_processor import iter_merged, merge_tables, optimize_dtypes
+
+pytest.importorskip("pyarrow")
+
+
+def merged(data_dir):
+    return optimize_dtypes(merge_tables(*(pd.read_csv(data_dir / f"{table}.csv")
+                                          for table in ("employees", "departments", "financials"))))
+
+
+def test_round_trip_with_projection_and_filters(tmp_path, sample_data_dir):
+    cache = ColumnarCache(tmp_path / "cache", sample_data_dir)
+    assert cache.load() is None
+    frame = merged(sample_data_dir)
+    cache.store(frame)
+
+    assert len(cache.load()) == len(frame)
+    selected = cache.load(columns=["name", "year", "revenue"], filters={"name": "Sales", "year": [2023]})
+    assert list(selected.columns) == ["name", "year", "revenue"]
+    expected = frame[(frame["name"] == "Sales") & (frame["year"] == 2023)]
+    assert len(selected) == len(expected) > 0
+
+
+def test_editing_a_source_makes_the_cache_stale(tmp_path, sample_data_dir):
+    cache = ColumnarCache(tmp_path / "cache", sample_data_dir)
+    cache.store(merged(sample_data_dir))
+    version = cache.fingerprint()
+    # A fresh instance, as in another worker, trusts the stored key.
+    assert ColumnarCache(tmp_path / "cache", sample_data_dir).is_fresh()
+
+    with open(sample_data_dir / "financials.csv", "a") as f:
+        f.write("13,1,2023,4,390000,310000,80000\n")
+    assert cache.load() is None
+    assert cache.fingerprint() != version
+
+
+def test_select_data_is_served_without_the_merged_frame(rag_settings):
+    rag = RAGManager(rag_settings)
+    first = rag.select_data(columns=["name", "quarter", "profit"], department="Engineering", year=2023)
+    # The first call loads and caches the merged dataset; later ones are served from the cache.
+    rag.dataframe = None
+    second = rag.select_data(columns=["name", "quarter", "profit"], department="Engineering", year=2023)
+    assert rag.dataframe is None
+    assert set(first["quarter"]) == set(second["quarter"]) == {1, 2, 3}
+    assert set(second["name"]) == {"Engineering"}
+
+
+def test_chunks_with_different_categories_are_written_as_one_table(tmp_path, sample_data_dir):
+    cache = ColumnarCache(tmp_path / "cache", sample_data_dir)
+    assert cache.store_chunks(optimize_dtypes(merged) for merged in iter_merged(sample_data_dir, chunksize=2))
+    assert len(cache.load()) == len(merged(sample_data_dir))
+    assert set(cache.load(columns=["name"])["name"]) == set(pd.read_csv(sample_data_dir / "departments.csv")["name"])
+
+
+def test_startup_builds_the_cache_once_and_maps_it(rag_settings, caplog):
+    caplog.set_level("INFO")
+    first = RAGManager(rag_settings)
+    assert (rag_settings.DATA_CACHE_DIR / ColumnarCache.CACHE_FILE).exists()
+    assert caplog.text.count("Wrote columnar cache") == 1
+
+    caplog.clear()
+    second = RAGManager(rag_settings)
+    assert "Wrote columnar cache" not in caplog.text
+    assert "Loaded merged dataset from columnar cache." in caplog.text
+    question = "What is the average salary in Engineering?"
+    assert second.planner.answer(question) == first.planner.answer(question) is not None
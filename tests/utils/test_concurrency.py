@@ -0,0 +1,18 @@
+import threading
+from app.utils.concurrency import file_lock
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = tmp_path / "index" / "index.lock"
+    acquired = threading.Event()
+
+    def contend():
+        with file_lock(path):
+            acquired.set()
+
+    with file_lock(path):
+        thread = threading.Thread(target=contend)
+        thread.start()
+        assert not acquired.wait(0.2)
+    assert acquired.wait(5)
+    thread.join()
@@ -0,0 +1,28 @@
+from app.utils.health import HealthMonitor
+from app.utils.warmup import ComponentUnavailable
+
+
+def test_snapshot_reports_each_probe():
+    monitor = HealthMonitor(interval=60)
+    monitor.register("ok", lambda: {"documents": 3})
+    monitor.register("broken", lambda: 1 / 0)
+
+    def cold():
+        raise ComponentUnavailable("rag", "warming")
+
+    monitor.register("cold", cold)
+    components = monitor.snapshot()
+    assert components["ok"]["status"] == "healthy" and components["ok"]["documents"] == 3
+    assert components["broken"]["status"] == "unhealthy"
+    assert components["cold"]["status"] == "warming"
+    assert HealthMonitor.overall(components) == "unhealthy"
+    assert HealthMonitor.overall({"ok": components["ok"], "cold": components["cold"]}) == "degraded"
+
+
+def test_snapshot_serves_cached_results():
+    calls = []
+    monitor = HealthMonitor(interval=60)
+    monitor.register("counted", lambda: calls.append(1))
+    monitor.snapshot()
+    monitor.snapshot()
+    assert len(calls) == 1
@@ -0,0 +1,43 @@
+import threading
+import pytest
+from app.utils.warmup import ComponentUnavailable, LazyComponent
+
+
+def test_peek_never_starts_a_build():
+    builds = []
+    component = LazyComponent("thing", lambda: builds.append(1) or object())
+    with pytest.raises(ComponentUnavailable) as error:
+        component.peek()
+    assert error.value.state == "cold"
+    assert builds == [] and component.state == "cold"
+
+    instance = component.get()
+    assert component.peek() is instance
+    assert builds == [1]
+
+
+def test_get_without_waiting_reports_warming():
+    release = threading.Event()
+    component = LazyComponent("slow", lambda: release.wait(5) and object())
+    with pytest.raises(ComponentUnavailable) as error:
+        component.get(wait=False)
+    assert error.value.state == "warming"
+    release.set()
+    assert component.get(timeout=5) is not None
+    assert component.status()["state"] == "ready"
+
+
+def test_failed_build_is_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    component = LazyComponent("flaky", factory)
+    with pytest.raises(ComponentUnavailable) as error:
+        component.get()
+    assert error.value.state == "failed" and error.value.error == "boom"
+    assert component.get() == "ok"
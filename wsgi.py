@@ -0,0 +1,5 @@
+from main import create_app, initialize_application
+
+# Entry point for production WSGI servers, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`
+initialize_application()
+app = create_app()